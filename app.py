@@ -3,27 +3,37 @@ StudyBuddy - Dokümandan Sınav Modu
 Flask Web Uygulaması
 """
 
+import hmac
+import json
 import os
 import time
 from datetime import datetime
 from urllib.parse import urlparse, urljoin
 import logging
-from flask import Flask, render_template, request, redirect, url_for, flash, abort, send_file, session, make_response
-from flask_socketio import SocketIO, emit
+from flask import Flask, render_template, request, redirect, url_for, flash, abort, send_file, session, make_response, jsonify
+from flask_socketio import SocketIO, emit, join_room
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_mail import Mail, Message
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_wtf.csrf import CSRFProtect, CSRFError
-from flask_babel import Babel, gettext, lazy_gettext, get_locale
+from flask_babel import Babel, gettext, lazy_gettext, get_locale, force_locale
 from werkzeug.utils import secure_filename
 from config import Config
 from services.document_reader import DocumentReader
-from services.ai_generator import AIGenerator
-from models import db, Document, Result, UsageStats, User, Subscription, UserUsageStats, Payment
+from services.ai_generator import get_shared_generator, resolve_generation_counts, RESULT_KEYS
+from services.job_queue import JobQueue, new_job_id, update_job_progress, fail_job, remove_job_payload, complete_claimed_job
+from services.extraction_pool import ExtractionPool
+from services.progress_broadcaster import ProgressBroadcaster, user_room, job_room
+from services.text_selection import select_text, STRATEGY_BALANCED
+from services.llm_cache import get_llm_cache
+from services.llm_rate_limiter import get_rate_limiter
+from models import db, Document, Result, SharedResultCache, ExtractedTextCache, UsageStats, User, Subscription, UserUsageStats, Payment, ProcessingJob
 from utils import (
-    get_file_hash, check_cache, save_to_cache, parse_cached_result, estimate_tokens, 
-    get_user_documents, validate_email_address, validate_file_signature, 
+    check_cache, save_to_cache, parse_cached_result, estimate_tokens, 
+    get_text_hash, build_shared_cache_key, check_shared_cache, register_shared_cache, 
+    get_extracted_text, store_extracted_text, 
+    get_user_documents, validate_email_address, spool_upload, remove_spooled_file, 
     check_user_upload_limit, increment_user_upload, increment_user_cache_hit, get_user_stats_summary,
     generate_invoice_pdf, send_payment_confirmation_email, activate_user_subscription, 
     get_user_payment_history, format_currency,
@@ -68,6 +78,9 @@ except ValueError as e:
 # SocketIO'yu başlat
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+# İlerleme olayları oda bazında ve arka planda gönderilir (pipeline soket gönderimini beklemez)
+progress_broadcaster = ProgressBroadcaster(socketio, flush_interval=Config.SOCKET_PROGRESS_FLUSH_INTERVAL)
+
 # Database'i başlat
 db.init_app(app)
 
@@ -205,15 +218,47 @@ def load_user(user_id):
     return User.query.get(int(user_id))
 
 
-def emit_progress(progress, message):
-    """SocketIO ile ilerleme gönder"""
+def emit_progress(progress, message, job_id=None):
+    """
+    SocketIO ile ilerleme gönder (bloklamaz)
+    
+    Olay tüm istemcilere değil, sadece işin odasına (job_id verilirse) veya
+    isteği yapan kullanıcının odasına gönderilir.
+    """
     try:
-        socketio.emit('progress', {'progress': progress, 'message': message})
-        socketio.sleep(0.1)  # Socket'in göndermesi için kısa bekleme
-    except:
+        payload = {'progress': progress, 'message': message}
+        if job_id is not None:
+            payload['job_id'] = job_id
+            room = job_room(job_id)
+        elif current_user.is_authenticated:
+            room = user_room(current_user.id)
+        else:
+            return
+        progress_broadcaster.publish('progress', payload, room)
+    except Exception:
         pass  # SocketIO hatalarını sessizce geç
 
 
+@socketio.on('connect')
+def handle_socket_connect():
+    """Giriş yapmış kullanıcıyı kendi odasına al (ilerleme olayları sadece ona gider)"""
+    if current_user.is_authenticated:
+        join_room(user_room(current_user.id))
+
+
+@socketio.on('join_job')
+def handle_join_job(data):
+    """İş sayfasındaki istemciyi işin odasına al (sadece işin sahibi)"""
+    job_id = (data or {}).get('job_id')
+    if not job_id or not current_user.is_authenticated:
+        return False
+    job = db.session.get(ProcessingJob, str(job_id))
+    if job is None or job.user_id != current_user.id:
+        return False
+    join_room(job_room(job.id))
+    return True
+
+
 def send_reset_email(to_email, reset_link):
     """Şifre sıfırlama email'i gönder"""
     try:
@@ -541,7 +586,11 @@ def dashboard():
 @limiter.limit(Config.UPLOAD_RATE_LIMIT)
 def process():
     """
-    Dosya yükleme ve işleme route'u - Cache destekli
+    Dosya yükleme route'u - Cache destekli
+    
+    Hızlı kontroller (dosya, imza, önbellek, plan ve fiş limitleri) istek içinde yapılır.
+    Metin çıkarma ve AI üretimi arka plan iş kuyruğunda çalışır; kullanıcı iş sayfasına
+    yönlendirilir (JSON isteyen istemcilere iş ID'si 202 ile döner).
     """
     # Dosya kontrolü
     if 'file' not in request.files:
@@ -563,29 +612,31 @@ def process():
     # Profil ve seviye bilgilerini al
     user_level = request.form.get('level', 'high_school')
     user_type = request.form.get('user_type', 'student')
+    is_private = request.form.get('private_upload') in ('1', 'on', 'true')
     short_settings = Config.LEVEL_SETTINGS.get(user_level, Config.LEVEL_SETTINGS['high_school']).get('short_answer', {})
     short_answer_max_words = short_settings.get('max_words', 4)
     
+    # Yükleme iş spool klasörüne parça parça yazılır; iş oluşturulursa aynı dosya işe devredilir
+    job_id = new_job_id()
+    spool_folder = app.config.get('JOB_SPOOL_FOLDER') or os.path.join(app.config['UPLOAD_FOLDER'], 'jobs')
+    spool_path = None
+    
     try:
         emit_progress(5, gettext('Dosya yükleniyor...'))
         
-        # Dosyayı oku
-        file_content = file.read()
-        file_size = len(file_content)
         filename = secure_filename(file.filename)
         file_extension = filename.rsplit('.', 1)[1].lower()
         
-        emit_progress(15, gettext('Dosya kontrol ediliyor...'))
-        
-        # Dosya imza doğrulaması (Magic Number Validation)
-        if app.config.get('VALIDATE_FILE_SIGNATURES', True):
-            is_valid, error_msg = validate_file_signature(file_content, file_extension)
-            if not is_valid:
-                flash(error_msg, 'error')
-                return redirect(url_for('upload'))
-        
-        # Dosya hash'ini hesapla
-        file_hash = get_file_hash(file_content)
+        # Dosyayı diske akıt: hash ve imza doğrulaması (Magic Number Validation) aynı geçişte yapılır
+        os.makedirs(spool_folder, exist_ok=True)
+        spool_path = os.path.join(spool_folder, f'{job_id}.{file_extension}.part')
+        file_hash, file_size, error_msg = spool_upload(
+            file.stream, spool_path, file_extension,
+            validate_signature=app.config.get('VALIDATE_FILE_SIGNATURES', True)
+        )
+        if error_msg:
+            flash(error_msg, 'error')
+            return redirect(url_for('upload'))
         
         emit_progress(20, gettext('Önbellek kontrol ediliyor...'))
         
@@ -658,182 +709,481 @@ def process():
             user_plan=plan_type
         )
         
-        # Kullanıcının yeterli fişi var mı kontrol et
-        can_afford, token_error_msg, available_tokens = check_user_tokens(current_user, required_tokens)
+        # Fiş iş kuyruğa alınırken düşülür (iş başarısız olursa iade edilir). Kullanıcı satırı kilitlenir:
+        # aynı anda kuyruğa alınan işler aynı bakiyeyle kontrolden geçemez
+        locked_user = User.query.filter_by(id=current_user.id).with_for_update().populate_existing().first()
+        can_afford, token_error_msg, available_tokens = check_user_tokens(locked_user, required_tokens)
         
         if not can_afford:
             flash(token_error_msg, 'error')
             return redirect(url_for('pricing'))
         
+        # Kullanıcı başına bekleyen iş sınırı (kuyruğun tek kullanıcı tarafından doldurulmasını önler)
+        pending_jobs = ProcessingJob.query.filter(
+            ProcessingJob.user_id == current_user.id,
+            ProcessingJob.status.in_([ProcessingJob.STATUS_QUEUED, ProcessingJob.STATUS_RUNNING])
+        ).count()
+        if pending_jobs >= Config.JOB_QUEUE_MAX_PENDING_PER_USER:
+            flash(gettext('Devam eden işlemleriniz var. Lütfen bunlar tamamlandıktan sonra tekrar deneyin.'), 'error')
+            return redirect(url_for('upload'))
+        
         emit_progress(25, gettext('Dosya kaydediliyor...'))
         
-        # Geçici dosyayı kaydet
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        with open(file_path, 'wb') as f:
-            f.write(file_content)
+        # İşi oluştur: yükleme dosyası iş bitene kadar spool klasöründe saklanır (yeniden yazılmaz)
+        payload_path = os.path.join(spool_folder, f'{job_id}.{file_extension}')
+        os.replace(spool_path, payload_path)
+        spool_path = None
         
-        emit_progress(30, gettext('Metin çıkartılıyor...'))
+        job = ProcessingJob(
+            id=job_id,
+            user_id=current_user.id,
+            status=ProcessingJob.STATUS_QUEUED,
+            progress=25,
+            message=gettext('Sırada bekliyor...'),
+            original_filename=filename,
+            file_type=file_extension,
+            file_size=file_size,
+            file_hash=file_hash,
+            payload_path=payload_path,
+            user_level=user_level,
+            user_type=user_type,
+            language=str(get_locale()),
+            is_private=is_private,
+            tokens_reserved=required_tokens
+        )
+        deduct_tokens(locked_user, required_tokens)
+        db.session.add(job)
+        db.session.commit()
         
-        # Dosyadan metin çıkar
-        text, error = DocumentReader.extract_text_from_file(file_path, file_extension)
+        job_queue.submit(job_id, inline=app.config.get('JOB_QUEUE_INLINE', False))
         
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({**job.to_dict(), 'status_url': url_for('job_status', job_id=job_id)}), 202
+        return redirect(url_for('view_job', job_id=job_id))
+    
+    except Exception as e:
+        flash(gettext('Bir hata oluştu: %(error)s', error=str(e)), 'error')
+        return redirect(url_for('upload'))
+    
+    finally:
+        # İşe devredilmeyen yüklemeler (önbellek hit, limit, hata) diskte bırakılmaz
+        remove_spooled_file(spool_path)
+
+
+def process_upload_job(job_id):
+    """
+    Arka plan işi: metin çıkarma, AI üretimi, sonuç kaydı ve fiş düşümü
+    
+    JobQueue worker thread'inde app context içinde çalışır. Kullanıcıya gösterilecek
+    hatalar işe yazılır (fail_job), beklenmeyen hatalar JobQueue tarafından yakalanır.
+    """
+    job = db.session.get(ProcessingJob, job_id)
+    if job is None:
+        return
+    
+    # İstek dışında çalıştığı için dil işin oluşturulduğu istekten alınır
+    try:
+        with force_locale(job.language):
+            _run_upload_job(job)
+    except BaseException:
+        # Beklenmeyen hatada işe ait havuzda bekleyen çıkarma görevleri de iptal edilir
+        extraction_pool.cancel(job.id)
+        raise
+    
+    # İş sayfasındaki istemciyi bilgilendir (tamamlandı veya başarısız)
+    progress_broadcaster.publish('job_status', job.to_dict(), job_room(job.id))
+
+
+def extract_job_text(job, max_tokens=None, info=None):
+    """
+    İşin yükleme dosyasından metin çıkarır; aynı dosya daha önce çıkarıldıysa depodan alır
+    
+    Çıkarılmış metin deposu dosya hash'i ve çıkarıcı sürümüyle anahtarlanır; aynı dosya farklı
+    seviye veya kullanıcı tipiyle tekrar işlendiğinde dosya yeniden ayrıştırılmaz.
+    
+    Args:
+        job: ProcessingJob
+        max_tokens: Token bütçesi (None ise metnin tamamı)
+        info: Verilirse çıkarma bilgisiyle doldurulur (from_text_cache, okunan/atlanan sayfa)
+    
+    Returns:
+        Tuple[str, Optional[str]]: (metin, hata mesajı)
+    """
+    info = {} if info is None else info
+    use_text_cache = app.config.get('EXTRACTED_TEXT_CACHE_ENABLED', True)
+    
+    if use_text_cache:
+        cached = get_extracted_text(job.file_hash, job.file_type, max_tokens)
+        if cached is not None:
+            text, cached_info = cached
+            info.update(cached_info)
+            info['from_text_cache'] = True
+            logger.info(f"[TEXT CACHE HIT] {job.id}: {job.file_hash[:12]}")
+            return text, None
+    
+    # CPU yoğun ayrıştırma sınırlı işlem havuzunda çalışır (worker bloklanmaz)
+    if app.config.get('EXTRACTION_POOL_ENABLED', True):
+        text, error = extraction_pool.extract(job.payload_path, job.file_type, key=job.id,
+                                              max_tokens=max_tokens, info=info)
         if error:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            flash(gettext('Dosya işleme hatası: %(error)s', error=error), 'error')
-            return redirect(url_for('upload'))
+            # Zaman aşımı veya hata: iş başarısız olacak, bu işe ait kuyruktaki sayfa aralıkları çalışmasın
+            extraction_pool.cancel(job.id)
+    else:
+        # Okuyucuya açık dosya verilir; ek kopya veya geçici dosya oluşmaz
+        try:
+            with open(job.payload_path, 'rb') as payload:
+                text, error = DocumentReader.extract_text_from_file(payload, job.file_type,
+                                                                    max_tokens=max_tokens, info=info)
+        except (OSError, TypeError):
+            text, error = '', gettext('Yüklenen dosya bulunamadı. Lütfen dosyayı tekrar yükleyin.')
+    
+    if use_text_cache and not error:
+        store_extracted_text(job.file_hash, job.file_type, text, max_tokens, info)
+    info['from_text_cache'] = False
+    return text, error
+
+
+def _run_upload_job(job):
+    """process_upload_job gövdesi (job.language locale'i aktifken çağrılır)"""
+    user = db.session.get(User, job.user_id)
+    # Sahiplik anahtarı: iş yeniden kuyruğa alınıp başka worker'a geçerse sonuç kaydedilmez
+    worker_id = job.worker_id
+    
+    def report(progress, message):
+        update_job_progress(job, progress, message)
+        emit_progress(progress, message, job_id=job.id)
+    
+    # Plan bilgilerini al
+    plan_type = user.subscription_plan or 'free'
+    plan_config = Config.SUBSCRIPTION_PLANS.get(plan_type, {})
+    plan_features = plan_config.get('features', {})
+    
+    # Paylaşılan (kullanıcılar arası) önbellek anahtarları: aynı içerik + seviye + dil + model
+    # için başka bir kullanıcının ürettiği sonuç model çağrılmadan kopyalanır
+    use_shared_cache = Config.SHARED_RESULT_CACHE_ENABLED
+    question_limit = plan_features.get('max_questions_per_type')
+    shared_cache_keys = []
+    shared_result = None
+    if use_shared_cache:
+        shared_cache_keys.append(build_shared_cache_key(
+            f'file:{job.file_hash}', job.user_level, job.user_type, job.language, Config.OPENAI_MODEL, question_limit
+        ))
+        shared_result = check_shared_cache(shared_cache_keys)
+    
+    text = None
+    extraction_info = {}
+    sections = []
+    text_selection = None
+    
+    if shared_result is None:
+        report(30, gettext('Metin çıkartılıyor...'))
         
-        emit_progress(40, gettext('Metin hazırlanıyor...'))
+        # Bölümlü üretim kapalıyken modele en fazla AI_MAX_INPUT_TOKENS gider; PDF'lerde bütçe
+        # dolunca kalan sayfalar hiç ayrıştırılmaz (sonuç tamamını okuyup kısaltmakla aynıdır).
+        # Dengeli seçimde kaynak bütçenin TEXT_SELECTION_SOURCE_FACTOR katıdır (sonraki üniteler de okunur)
+        extraction_budget = None
+        if not Config.AI_CHUNKED_GENERATION:
+            extraction_budget = Config.AI_MAX_INPUT_TOKENS
+            if Config.TEXT_SELECTION_STRATEGY == STRATEGY_BALANCED:
+                extraction_budget *= max(1, Config.TEXT_SELECTION_SOURCE_FACTOR)
         
-        # Metni token limitine göre kısalt
-        text = DocumentReader.truncate_text(text)
+        text, error = extract_job_text(job, extraction_budget, extraction_info)
+        
+        if error:
+            fail_job(job, gettext('Dosya işleme hatası: %(error)s', error=error), worker_id)
+            return
+        
+        # Bölüm dizini (başlık, seviye, ofsetler, sayfa) sonraki aşamalar içindir; meta veriye sadece sayısı yazılır
+        sections = extraction_info.pop('sections', [])
+        extraction_info['section_count'] = len(sections)
+        
+        if extraction_info.get('pages_skipped'):
+            logger.info(f"[EXTRACT] {job.id}: {extraction_info['pages_read']}/{extraction_info['pages_total']} sayfa kullanıldı "
+                        f"({extraction_info.get('pages_parsed', extraction_info['pages_read'])} sayfa ayrıştırıldı), "
+                        f"{extraction_info['pages_skipped']} sayfa token bütçesi nedeniyle atlandı")
+        if extraction_info.get('boilerplate', {}).get('lines_removed'):
+            boilerplate = extraction_info['boilerplate']
+            logger.info(f"[EXTRACT] {job.id}: {boilerplate['lines_removed']} tekrarlanan üst/alt bilgi satırı atıldı "
+                        f"(~{boilerplate['tokens_saved']} token)")
+        
+        # Bütçeyi aşan metinden modele gidecek kısım seçilir (strateji ve kapsam meta veriye yazılır)
+        if extraction_budget is not None:
+            text, text_selection = select_text(text, Config.AI_MAX_INPUT_TOKENS, sections,
+                                               strategy=Config.TEXT_SELECTION_STRATEGY, source_tokens=extraction_budget)
+            if text_selection['strategy'] != 'full':
+                logger.info(f"[EXTRACT] {job.id}: {text_selection['strategy']} metin seçimi, "
+                            f"{text_selection['sections_covered']}/{text_selection['sections_total']} bölüm kapsandı")
+        
+        # Farklı dosyadan aynı metin çıkmışsa (örn. aynı bölümün PDF ve DOCX hali) yine paylaşılan sonucu kullan.
+        # Hash modele gidecek metinden alınır; erken durdurulan PDF ile tamamı okunan DOCX aynı anahtarı üretir
+        if use_shared_cache:
+            shared_cache_keys.append(build_shared_cache_key(
+                f'text:{get_text_hash(text)}', job.user_level, job.user_type, job.language, Config.OPENAI_MODEL, question_limit
+            ))
+            shared_result = check_shared_cache(shared_cache_keys[1:])
+    
+    report(40, gettext('Metin hazırlanıyor...'))
+    
+    # Uzun metinler: bölümlü üretim açıksa tamamı işlenir, değilse yukarıda token limitine göre seçilmiştir
+    use_chunked = False
+    if shared_result is not None:
+        estimated_tokens = shared_result.token_used
+    else:
+        use_chunked = Config.AI_CHUNKED_GENERATION and estimate_tokens(text) > Config.AI_MAX_INPUT_TOKENS
         estimated_tokens = estimate_tokens(text)
+    
+    # AI ile içerik üret
+    try:
+        Config.validate_config()
         
-        # AI ile içerik üret
-        try:
-            Config.validate_config()
-            
-            emit_progress(50, gettext('Özet oluşturuluyor...'))
-            start_time = time.time()
-            
-            # Mevcut locale'i al
-            current_lang = str(get_locale())
-            
-            ai_generator = AIGenerator(language=current_lang)
-            
-            emit_progress(60, gettext('Sorular üretiliyor...'))
-            results = ai_generator.generate_all_content(text, level=user_level, user_type=user_type, user_plan=plan_type, language=current_lang)
-            
-            emit_progress(90, gettext('Sonuçlar hazırlanıyor...'))
-            
-            processing_time = time.time() - start_time
-            
-            # Plan bazlı soru limitlerini uygula
-            max_questions_per_type = plan_features.get('max_questions_per_type')
-            original_counts = {}
-            plan_limit_info = {}
-            
-            if max_questions_per_type is not None:
-                # Her soru türü için limit uygula
-                question_types = {
-                    'multiple_choice': 'Çoktan Seçmeli',
-                    'short_answer': 'Kısa Cevap',
-                    'fill_blank': 'Boş Doldurma',
-                    'true_false': 'Doğru-Yanlış'
-                }
-                
-                for q_type, q_name in question_types.items():
-                    if q_type in results:
-                        original_count = len(results[q_type])
-                        original_counts[q_type] = original_count
-                        
-                        if original_count > max_questions_per_type:
-                            # Limit uygula - sadece ilk N soruyu göster
-                            results[q_type] = results[q_type][:max_questions_per_type]
-                            plan_limit_info[q_type] = {
-                                'name': q_name,
-                                'generated': original_count,
-                                'displayed': max_questions_per_type,
-                                'limit': max_questions_per_type
-                            }
-            
-            # Geçici dosyayı temizle
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            
-            # Cache'e kaydet ve ardından fiş düş (tek transaction)
-            try:
-                # İsteğe bağlı sıkı doğruluk: token düşmeden önce kullanıcı satırını kilitle
-                locked_user = User.query.filter_by(id=current_user.id).with_for_update().first()
-                result = save_to_cache(
-                    file_hash=file_hash,
-                    filename=filename,
-                    file_type=file_extension,
-                    file_size=file_size,
-                    user_level=user_level,
-                    user_type=user_type,
-                    results_data=results,
-                    ai_model=Config.OPENAI_MODEL,
-                    token_used=estimated_tokens,
-                    processing_time=processing_time,
-                    user_id=current_user.id
-                )
-                deduct_tokens(locked_user or current_user, required_tokens)
-                db.session.commit()
-            except Exception as trx_err:
-                db.session.rollback()
-                logger.error(f"Transaction failed after AI generation: {trx_err}")
-                flash(gettext('İşlem sırasında bir hata oluştu. Lütfen tekrar deneyin.'), 'error')
-                return redirect(url_for('upload'))
-            
-            # Kullanıcı bazlı yükleme sayacını artır
-            increment_user_upload(current_user.id)
-            
-            # Özeti markdown'dan HTML'e çevir
-            results['summary_html'] = markdown.markdown(results['summary'])
-            
-            # Token bilgilerini al
-            token_info = get_user_token_info(current_user)
+        report(50, gettext('Özet oluşturuluyor...'))
+        start_time = time.time()
+        
+        if shared_result is not None:
+            # PAYLAŞILAN ÖNBELLEK HIT - Model çağrılmadan mevcut sonuç kopyalanır
+            logger.info(f"[SHARED CACHE HIT] Result {shared_result.id}, token saved: ~{shared_result.token_used}")
+            cached_data = parse_cached_result(shared_result)
+            results = {key: cached_data[key] for key in RESULT_KEYS}
+            UsageStats.get_or_create().update_shared_cache_hit(shared_result.token_used or 0)
+        else:
+            if use_shared_cache:
+                UsageStats.get_or_create().update_shared_cache_miss()
             
-            # ÖNEMLİ: İçerik analizi GERÇEK soru sayılarına göre yapılmalı
-            # Tahmini kelime sayısı değil, üretilen sorulara bak!
-            from utils import detect_main_topic
+            # İşlem genelinde paylaşılan generator (keep-alive bağlantı havuzu yeniden kullanılır)
+            ai_generator = get_shared_generator()
             
-            # Toplam üretilen soru sayısını hesapla
-            total_questions = 0
-            question_types = ['multiple_choice', 'short_answer', 'fill_blank', 'true_false']
-            for q_type in question_types:
-                if q_type in results and isinstance(results[q_type], list):
-                    total_questions += len(results[q_type])
+            report(60, gettext('Sorular üretiliyor...'))
+            if use_chunked:
+                results = ai_generator.generate_all_content_chunked(text, level=job.user_level, user_type=job.user_type, user_plan=plan_type, language=job.language)
+            else:
+                results = ai_generator.generate_all_content(text, level=job.user_level, user_type=job.user_type, user_plan=plan_type, language=job.language)
+        
+        report(90, gettext('Sonuçlar hazırlanıyor...'))
+        
+        processing_time = time.time() - start_time
+    
+    except ValueError as e:
+        fail_job(job, str(e), worker_id)
+        return
+    
+    except Exception as e:
+        fail_job(job, gettext('İçerik üretimi sırasında hata oluştu: %(error)s', error=str(e)), worker_id)
+        return
+    
+    # Plan bazlı soru limitleri üretime aktarılır (resolve_generation_counts); model fazladan öğe
+    # döndürürse burada kesilir. Üretilen / gösterilen sayılar tasarrufu doğrulamak için kaydedilir
+    max_questions_per_type = plan_features.get('max_questions_per_type')
+    level_question_count = Config.LEVEL_SETTINGS.get(job.user_level, Config.LEVEL_SETTINGS['high_school'])['questions_per_type']
+    requested_questions, requested_flashcards = resolve_generation_counts(job.user_level, plan_type)
+    original_counts = {}
+    plan_limit_info = {}
+    generation_counts = {}
+    
+    question_types = {
+        'multiple_choice': 'Çoktan Seçmeli',
+        'short_answer': 'Kısa Cevap',
+        'fill_blank': 'Boş Doldurma',
+        'true_false': 'Doğru-Yanlış'
+    }
+    
+    for q_type, q_name in question_types.items():
+        if q_type in results:
+            original_count = len(results[q_type])
+            original_counts[q_type] = original_count
             
-            # İçerik analizi: Gerçek soru sayısına göre
-            content_analysis = None
-            topic_info = None
+            if max_questions_per_type is not None and original_count > max_questions_per_type:
+                # Limit uygula - sadece ilk N soruyu göster
+                results[q_type] = results[q_type][:max_questions_per_type]
             
-            # Sadece 5 veya daha az soru üretildiyse modal göster
-            if total_questions > 0 and total_questions <= 5:
-                content_analysis = {
-                    'is_limited': True,
-                    'estimated_questions': total_questions,
-                    'total_generated': total_questions,
-                    'reason': f'Sadece {total_questions} soru üretilebildi'
+            if max_questions_per_type is not None and level_question_count > max_questions_per_type:
+                # Seviyede üretilebilecek sorulardan plan nedeniyle gösterilmeyenler (yükseltme bilgisi)
+                plan_limit_info[q_type] = {
+                    'name': q_name,
+                    'generated': original_count,
+                    'available': level_question_count,
+                    'displayed': len(results[q_type]),
+                    'limit': max_questions_per_type
                 }
-                topic_info = detect_main_topic(text)
             
-            # Sonuçları göster
-            return render_template('result.html',
-                                   filename=filename,
-                                   results=results,
-                                   from_cache=False,
-                                   user_level=user_level,
-                                   user_type=user_type,
-                                   processing_time=processing_time,
-                                   short_answer_max_words=short_answer_max_words,
-                                   user=current_user,
-                                   user_plan=plan_type,
-                                   plan_config=plan_config,
-                                   original_counts=original_counts,
-                                   plan_limit_info=plan_limit_info,
-                                   token_info=token_info,
-                                   result_id=result.id,
-                                   content_analysis=content_analysis,
-                                   topic_info=topic_info)
-        
-        except ValueError as e:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            flash(str(e), 'error')
-            return redirect(url_for('upload'))
-        
-        except Exception as e:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            flash(gettext('İçerik üretimi sırasında hata oluştu: %(error)s', error=str(e)), 'error')
-            return redirect(url_for('upload'))
+            generation_counts[q_type] = {
+                'requested': requested_questions,
+                'generated': original_count,
+                'displayed': len(results[q_type])
+            }
     
-    except Exception as e:
-        flash(gettext('Bir hata oluştu: %(error)s', error=str(e)), 'error')
+    if isinstance(results.get('flashcards'), list):
+        generation_counts['flashcards'] = {
+            'requested': requested_flashcards,
+            'generated': len(results['flashcards']),
+            'displayed': len(results['flashcards'])
+        }
+    
+    if shared_result is None and requested_questions < level_question_count:
+        logger.info(f"[AI] {job.id}: plan limiti nedeniyle tür başına {level_question_count} yerine "
+                    f"{requested_questions} soru üretildi (plan={plan_type})")
+    
+    # ÖNEMLİ: İçerik analizi GERÇEK soru sayılarına göre yapılmalı
+    # Tahmini kelime sayısı değil, üretilen sorulara bak!
+    from utils import detect_main_topic
+    
+    # Toplam üretilen soru sayısını hesapla
+    total_questions = 0
+    for q_type in ['multiple_choice', 'short_answer', 'fill_blank', 'true_false']:
+        if q_type in results and isinstance(results[q_type], list):
+            total_questions += len(results[q_type])
+    
+    # İçerik analizi: Gerçek soru sayısına göre
+    content_analysis = None
+    topic_info = None
+    
+    # Sadece 5 veya daha az soru üretildiyse modal göster
+    if total_questions > 0 and total_questions <= 5:
+        content_analysis = {
+            'is_limited': True,
+            'estimated_questions': total_questions,
+            'total_generated': total_questions,
+            'reason': f'Sadece {total_questions} soru üretilebildi'
+        }
+        topic_info = detect_main_topic(text) if text else None
+    
+    # Cache'e kaydet ve işi tamamla (tek transaction; fiş iş kuyruğa alınırken düşülmüştü)
+    try:
+        result = save_to_cache(
+            file_hash=job.file_hash,
+            filename=job.original_filename,
+            file_type=job.file_type,
+            file_size=job.file_size,
+            user_level=job.user_level,
+            user_type=job.user_type,
+            results_data=results,
+            ai_model=Config.OPENAI_MODEL,
+            token_used=estimated_tokens,
+            processing_time=processing_time,
+            user_id=user.id,
+            is_private=job.is_private
+        )
+        # Yeni üretilen (özel olmayan) sonucu diğer kullanıcılar için paylaşılan önbelleğe ekle
+        if use_shared_cache and shared_result is None and not job.is_private:
+            register_shared_cache(result, shared_cache_keys)
+        
+        # İş en son ve sadece hâlâ bu worker'a aitse tamamlanır; değilse (yarım kaldı sanılıp yeniden
+        # kuyruğa alındıysa) sonuç kaydı da geri alınır
+        completed = complete_claimed_job(job.id, worker_id, {
+            'progress': 100,
+            'message': gettext('Tamamlandı! Yönlendiriliyorsunuz...'),
+            'result_id': result.id,
+            'finished_at': datetime.utcnow(),
+            'result_metadata': json.dumps({
+                'processing_time': processing_time,
+                'original_counts': original_counts,
+                'plan_limit_info': plan_limit_info,
+                'generation_counts': generation_counts,
+                'content_analysis': content_analysis,
+                'topic_info': topic_info,
+                'extraction': extraction_info,
+                'text_selection': text_selection
+            }, ensure_ascii=False)
+        })
+        if not completed:
+            db.session.rollback()
+            logger.warning(f"[JOB] {job.id} başka bir worker'a geçmiş, sonuç kaydedilmedi")
+            return
+        remove_job_payload(job)
+        db.session.commit()
+    except Exception as trx_err:
+        db.session.rollback()
+        logger.error(f"Transaction failed after AI generation: {trx_err}")
+        fail_job(job, gettext('İşlem sırasında bir hata oluştu. Lütfen tekrar deneyin.'), worker_id)
+        return
+    
+    # Kullanıcı bazlı yükleme sayacını artır
+    increment_user_upload(user.id)
+
+
+# Metin çıkarma işlem havuzu (işlemler ilk kullanımda, fork sonrası açılır)
+extraction_pool = ExtractionPool(
+    max_workers=Config.EXTRACTION_POOL_WORKERS,
+    cpu_time_limit=Config.EXTRACTION_CPU_TIME_LIMIT,
+    memory_limit_mb=Config.EXTRACTION_MEMORY_LIMIT_MB,
+    timeout=Config.EXTRACTION_TIMEOUT,
+    start_method=Config.EXTRACTION_POOL_START_METHOD,
+    parallel_min_bytes=int(Config.EXTRACTION_PARALLEL_MIN_MB * 1024 * 1024),
+    pages_per_task=Config.EXTRACTION_PAGES_PER_TASK
+)
+
+
+# Arka plan iş kuyruğu (worker thread'leri ilk iş eklendiğinde veya gunicorn post_worker_init'te başlar)
+job_queue = JobQueue(
+    app,
+    process_upload_job,
+    max_workers=Config.JOB_QUEUE_WORKERS,
+    poll_interval=Config.JOB_QUEUE_POLL_INTERVAL,
+    stale_seconds=Config.JOB_STALE_SECONDS,
+    max_attempts=Config.JOB_MAX_ATTEMPTS
+)
+
+
+def _get_user_job_or_404(job_id):
+    """Kullanıcının kendi işini getirir, başkasının işiyse 404"""
+    job = db.session.get(ProcessingJob, job_id)
+    if job is None or job.user_id != current_user.id:
+        abort(404)
+    return job
+
+
+@app.route('/jobs/<job_id>')
+@login_required
+def view_job(job_id):
+    """İş sayfası: devam ederken ilerleme, tamamlanınca sonuç sayfası"""
+    job = _get_user_job_or_404(job_id)
+    
+    if job.status == ProcessingJob.STATUS_FAILED:
+        flash(job.error or gettext('İşlem başarısız oldu.'), 'error')
         return redirect(url_for('upload'))
+    
+    if job.status != ProcessingJob.STATUS_COMPLETED:
+        return render_template('job_status.html', job=job)
+    
+    # Sonuç sonradan silinmiş olabilir (aynı dosya tekrar yüklendi veya eski cache temizlendi)
+    if job.result is None:
+        flash(gettext('Bu işlemin sonucu artık mevcut değil. Geçmiş sayfanızdan güncel sonuçlara ulaşabilirsiniz.'), 'warning')
+        return redirect(url_for('history'))
+    
+    result = job.result
+    metadata = json.loads(job.result_metadata) if job.result_metadata else {}
+    plan_type = current_user.subscription_plan or 'free'
+    short_settings = Config.LEVEL_SETTINGS.get(job.user_level, Config.LEVEL_SETTINGS['high_school']).get('short_answer', {})
+    
+    results = parse_cached_result(result)
+    results['summary_html'] = markdown.markdown(results['summary'])
+    
+    # Sonuçları göster
+    return render_template('result.html',
+                           filename=job.original_filename,
+                           results=results,
+                           from_cache=False,
+                           user_level=job.user_level,
+                           user_type=job.user_type,
+                           processing_time=metadata.get('processing_time'),
+                           short_answer_max_words=short_settings.get('max_words', 4),
+                           user=current_user,
+                           user_plan=plan_type,
+                           plan_config=Config.SUBSCRIPTION_PLANS.get(plan_type, {}),
+                           original_counts=metadata.get('original_counts', {}),
+                           plan_limit_info=metadata.get('plan_limit_info', {}),
+                           token_info=get_user_token_info(current_user),
+                           result_id=result.id,
+                           content_analysis=metadata.get('content_analysis'),
+                           topic_info=metadata.get('topic_info'))
+
+
+@app.route('/jobs/<job_id>/status')
+@login_required
+@limiter.exempt
+def job_status(job_id):
+    """İş durumu (JSON) - SocketIO bağlantısı olmayan istemciler için polling uç noktası"""
+    job = _get_user_job_or_404(job_id)
+    return jsonify({**job.to_dict(), 'result_url': url_for('view_job', job_id=job.id)})
 
 
 @app.route('/history')
@@ -1292,6 +1642,44 @@ def export(result_id):
     return send_file(file_path, as_attachment=True, download_name=download_name, mimetype=mimetype)
 
 
+@app.route('/internal/stats')
+@limiter.exempt
+def internal_stats():
+    """Operasyonel istatistikler (JSON) - STATS_ACCESS_TOKEN ile korunur"""
+    token = app.config.get('STATS_ACCESS_TOKEN')
+    provided = request.headers.get('X-Stats-Token', '')
+    if not token or not hmac.compare_digest(provided, token):
+        abort(404)
+    
+    usage_stats = UsageStats.get_or_create()
+    llm_cache = get_llm_cache()
+    rate_limiter = get_rate_limiter()
+    return jsonify({
+        'openai_connection_pool': get_shared_generator().get_connection_stats(),
+        'openai_usage': get_shared_generator().get_usage_stats(),
+        'openai_calls': get_shared_generator().get_call_stats(),
+        'openai_rate_limit': rate_limiter.get_stats() if rate_limiter else {'enabled': False},
+        'llm_response_cache': llm_cache.get_stats() if llm_cache else {'enabled': False},
+        'job_queue': job_queue.get_stats(),
+        'extraction_pool': extraction_pool.get_stats(),
+        'progress_events': progress_broadcaster.get_stats(),
+        'extracted_text_cache': {
+            'enabled': Config.EXTRACTED_TEXT_CACHE_ENABLED,
+            'entries': ExtractedTextCache.query.count(),
+            'hits': db.session.query(db.func.coalesce(db.func.sum(ExtractedTextCache.hit_count), 0)).scalar(),
+            'size_bytes': db.session.query(db.func.coalesce(db.func.sum(ExtractedTextCache.text_size), 0)).scalar(),
+            'max_bytes': Config.EXTRACTED_TEXT_CACHE_MAX_MB * 1024 * 1024
+        },
+        'shared_result_cache': {
+            'enabled': Config.SHARED_RESULT_CACHE_ENABLED,
+            'entries': SharedResultCache.query.count(),
+            'hits': usage_stats.shared_cache_hits or 0,
+            'misses': usage_stats.shared_cache_misses or 0,
+            'tokens_saved': usage_stats.shared_tokens_saved or 0
+        }
+    })
+
+
 @app.errorhandler(CSRFError)
 def handle_csrf_error(e):
     """CSRF token hatası"""
@@ -130,7 +130,9 @@ class Config:
                 'priority_support': False,
                 'export_formats': ['web'],  # Export yok (sadece web görüntüleme)
                 'export_cost_tokens': 2,  # Export için 2 fiş gerektirir
-                'history_retention_days': 30
+                'history_retention_days': 30,
+                'generation_mode': None,  # None = Config.AI_GENERATION_MODE
+                'llm_priority': 'low'  # Hız sınırında öncelik (high, normal, low)
             },
             'description': 'Başlangıç için ideal',
             'highlights': [
@@ -161,7 +163,9 @@ class Config:
                 'priority_support': False,
                 'export_formats': ['web'],  # Export var ama fiş gerektirir
                 'export_cost_tokens': 2,  # Export için 2 fiş gerektirir
-                'history_retention_days': 90
+                'history_retention_days': 90,
+                'generation_mode': None,  # None = Config.AI_GENERATION_MODE
+                'llm_priority': 'normal'  # Hız sınırında öncelik (high, normal, low)
             },
             'description': 'Daha fazla içerik için ideal',
             'highlights': [
@@ -192,7 +196,9 @@ class Config:
                 'priority_support': True,
                 'export_formats': ['web', 'pdf', 'docx'],  # Export ücretsiz
                 'export_cost_tokens': 0,  # Export ücretsiz (0 fiş)
-                'history_retention_days': None  # None = sınırsız
+                'history_retention_days': None,  # None = sınırsız
+                'generation_mode': None,  # None = Config.AI_GENERATION_MODE
+                'llm_priority': 'high'  # Hız sınırında öncelik (high, normal, low)
             },
             'description': 'Profesyonel öğrenme deneyimi',
             'highlights': [
@@ -267,6 +273,138 @@ class Config:
     DEFAULT_QUESTION_COUNT = 5
     DEFAULT_FLASHCARD_COUNT = 10
     
+    # Eşzamanlı AI üretimi (generate_all_content içindeki 6 bağımsız çağrı)
+    # true: Özet, 4 soru türü ve flashcard çağrıları paralel yapılır (toplam süre ~ en yavaş çağrı)
+    # false: Çağrılar sırayla yapılır (toplam süre = tüm çağrıların toplamı)
+    AI_CONCURRENT_GENERATION = os.environ.get('AI_CONCURRENT_GENERATION', 'true').lower() in ('true', '1', 'yes')
+    AI_MAX_CONCURRENCY = int(os.environ.get('AI_MAX_CONCURRENCY', 6))  # Aynı anda en fazla kaç çağrı
+    AI_CALL_TIMEOUT = float(os.environ.get('AI_CALL_TIMEOUT', 90))  # Tek bir OpenAI denemesi için zaman aşımı (saniye)
+    # Dayanıklı çağrı katmanı: 429 / 5xx / zaman aşımı / bağlantı hataları jitter'lı üstel beklemeyle yeniden denenir
+    AI_MAX_RETRIES = int(os.environ.get('AI_MAX_RETRIES', 3))
+    AI_RETRY_BASE_DELAY = float(os.environ.get('AI_RETRY_BASE_DELAY', 1.0))  # İlk bekleme üst sınırı (saniye)
+    AI_RETRY_MAX_DELAY = float(os.environ.get('AI_RETRY_MAX_DELAY', 20))  # En uzun bekleme (Retry-After dahil)
+    AI_CALL_DEADLINE = float(os.environ.get('AI_CALL_DEADLINE', 240))  # Bir çağrının tüm denemeleri için toplam süre
+    # Devre kesici (worker başına): bu kadar ardışık geçici hatadan sonra çağrılar RESET süresi boyunca beklemeden reddedilir
+    AI_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('AI_CIRCUIT_FAILURE_THRESHOLD', 5))  # 0 = kapalı
+    AI_CIRCUIT_RESET_SECONDS = float(os.environ.get('AI_CIRCUIT_RESET_SECONDS', 30))
+    # Yedek (hedged) istek: deneme bu süreyi aşarsa aynı istek bir kez daha gönderilir, ilk yanıt kullanılır (0 = kapalı)
+    AI_HEDGE_AFTER_SECONDS = float(os.environ.get('AI_HEDGE_AFTER_SECONDS', 0))
+    # Küme geneli OpenAI hız sınırı: dakika başına istek (RPM) ve token (TPM) kovaları tüm worker'ların
+    # paylaştığı depoda tutulur (sqlite:///<yol> tek sunucu, redis://... birden fazla sunucu). Çağrılar
+    # kapasite alamazsa bekler; planın llm_priority özelliği yoğunlukta kimin önce geçeceğini belirler
+    LLM_RATE_LIMIT_RPM = int(os.environ.get('LLM_RATE_LIMIT_RPM', 0))  # 0 = sınır yok
+    LLM_RATE_LIMIT_TPM = int(os.environ.get('LLM_RATE_LIMIT_TPM', 0))  # 0 = sınır yok
+    LLM_RATE_LIMIT_STORAGE_URI = os.environ.get('LLM_RATE_LIMIT_STORAGE_URI', f'sqlite:///{os.path.join(instance_path, "llm_rate_limit.sqlite")}')
+    LLM_RATE_LIMIT_MAX_WAIT = float(os.environ.get('LLM_RATE_LIMIT_MAX_WAIT', 60))  # Kapasite için en fazla bekleme (saniye)
+    LLM_RATE_LIMIT_COMPLETION_TOKENS = int(os.environ.get('LLM_RATE_LIMIT_COMPLETION_TOKENS', 2000))  # max_tokens yoksa çıktı tahmini
+    # Çıktı token tavanı: her çağrıya istenen öğe sayısından hesaplanan max_tokens gönderilir
+    AI_OUTPUT_TOKEN_CAPS = os.environ.get('AI_OUTPUT_TOKEN_CAPS', 'true').lower() in ('true', '1', 'yes')
+    # Modelin tek yanıttaki çıktı token sınırı; tavan bunu aşamaz (0 = model adından belirlenir)
+    AI_MAX_OUTPUT_TOKENS = int(os.environ.get('AI_MAX_OUTPUT_TOKENS', 0))
+    # Prompt yerleşimi: instructions_first (talimatlar önce, metin sonda) veya document_first
+    # (sistem + metin her çağrıda aynı önek, türe özel talimatlar ayrı mesajda; sağlayıcının prompt
+    # önbelleği aynı doküman için yapılan çağrılarda devreye girer). Önbellekten okunan token'lar
+    # /internal/stats altında yerleşim bazında raporlanır
+    AI_PROMPT_LAYOUT = os.environ.get('AI_PROMPT_LAYOUT', 'instructions_first').lower()
+    
+    # AI üretim modu (plan bazında 'generation_mode' özelliği ile geçersiz kılınabilir)
+    # fanout: Her içerik türü için ayrı çağrı (metin 6 kez gönderilir)
+    # single: Tüm içerikler tek structured-output çağrısında (metin 1 kez gönderilir)
+    # auto: Metin AI_SINGLE_CALL_MAX_CHARS karakterden kısaysa single, uzunsa fanout
+    AI_GENERATION_MODE = os.environ.get('AI_GENERATION_MODE', 'fanout').lower()
+    AI_SINGLE_CALL_MAX_CHARS = int(os.environ.get('AI_SINGLE_CALL_MAX_CHARS', 24000))
+    
+    # Modele gönderilecek maksimum metin (token). Daha uzun metinler kısaltılır
+    # veya bölümlü üretim açıksa map-reduce ile tamamı işlenir
+    AI_MAX_INPUT_TOKENS = int(os.environ.get('AI_MAX_INPUT_TOKENS', 12000))
+    
+    # Bütçeyi aşan metinden modele gidecek kısmın seçimi (bölümlü üretim kapalıyken)
+    # balanced: Her bölümden TF-IDF ile temsili cümleler (son üniteler de kapsanır)
+    # head: Baştan kesme (eski davranış)
+    TEXT_SELECTION_STRATEGY = os.environ.get('TEXT_SELECTION_STRATEGY', 'balanced').lower()
+    # balanced seçimde çıkarılan kaynak metin sınırı (AI_MAX_INPUT_TOKENS katı; PDF erken durdurma bu sınırda)
+    TEXT_SELECTION_SOURCE_FACTOR = int(os.environ.get('TEXT_SELECTION_SOURCE_FACTOR', 8))
+    
+    # Bölümlü (map-reduce) üretim: uzun dokümanlar baştan kesilmek yerine bölümlere ayrılır,
+    # bölümler paralel işlenir ve sonuçlar konu dengeli şekilde birleştirilir
+    AI_CHUNKED_GENERATION = os.environ.get('AI_CHUNKED_GENERATION', 'false').lower() in ('true', '1', 'yes')
+    AI_CHUNK_MAX_TOKENS = int(os.environ.get('AI_CHUNK_MAX_TOKENS', 6000))  # Bölüm başına token
+    AI_MAX_CHUNKS = int(os.environ.get('AI_MAX_CHUNKS', 8))  # Daha fazla bölüm çıkarsa bölüm boyutu büyütülür
+    AI_CHUNK_CONCURRENCY = int(os.environ.get('AI_CHUNK_CONCURRENCY', 4))  # Aynı anda işlenen bölüm sayısı
+    
+    # OpenAI HTTP bağlantı havuzu (işlem başına tek paylaşılan client)
+    # Keep-alive bağlantılar istekler arasında yeniden kullanılır, TLS el sıkışması tekrarlanmaz
+    AI_HTTP_MAX_CONNECTIONS = int(os.environ.get('AI_HTTP_MAX_CONNECTIONS', 20))
+    AI_HTTP_MAX_KEEPALIVE = int(os.environ.get('AI_HTTP_MAX_KEEPALIVE', 10))
+    AI_HTTP_KEEPALIVE_EXPIRY = float(os.environ.get('AI_HTTP_KEEPALIVE_EXPIRY', 60))  # Boşta bağlantı ömrü (saniye)
+    AI_WARM_CLIENT_ON_BOOT = os.environ.get('AI_WARM_CLIENT_ON_BOOT', 'true').lower() in ('true', '1', 'yes')
+    AI_WARM_UP_TIMEOUT = float(os.environ.get('AI_WARM_UP_TIMEOUT', 10))
+    
+    # Kullanıcılar arası paylaşılan sonuç önbelleği
+    # Aynı içerik (dosya veya normalize metin hash'i), seviye, kullanıcı tipi, dil, model ve
+    # prompt sürümü için daha önce üretilmiş sonuç, model çağrılmadan kullanıcıya kopyalanır.
+    # Kullanıcı yüklemeyi "özel" işaretlerse sonuçları paylaşılan önbelleğe eklenmez.
+    SHARED_RESULT_CACHE_ENABLED = os.environ.get('SHARED_RESULT_CACHE_ENABLED', 'true').lower() in ('true', '1', 'yes')
+    
+    # Prompt seviyesinde LLM yanıt önbelleği: anahtar (model, sistem prompt'u, prompt, sıcaklık, prompt sürümü)
+    # hash'idir. İşlem içi LRU + tüm worker'ların paylaştığı SQLite dosyası; kayıtlar TTL sonunda geçersizdir.
+    # Sıcaklığı 0'dan büyük çağrılar (uygulamadaki tüm üretim çağrıları) sadece LLM_CACHE_SAMPLED_RESPONSES
+    # açıkça true yapılırsa önbelleğe alınır (aynı prompt her seferinde aynı yanıtı döndürür)
+    LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', 'true').lower() in ('true', '1', 'yes')
+    LLM_CACHE_SAMPLED_RESPONSES = os.environ.get('LLM_CACHE_SAMPLED_RESPONSES', 'false').lower() in ('true', '1', 'yes')
+    LLM_CACHE_PATH = os.environ.get('LLM_CACHE_PATH', os.path.join(instance_path, 'llm_cache.sqlite'))  # Boşsa sadece bellek
+    LLM_CACHE_MEMORY_ENTRIES = int(os.environ.get('LLM_CACHE_MEMORY_ENTRIES', 256))  # İşlem içi LRU kayıt sayısı
+    LLM_CACHE_TTL_SECONDS = int(os.environ.get('LLM_CACHE_TTL_SECONDS', 7 * 24 * 3600))  # 0 = süresiz
+    LLM_CACHE_MAX_MB = int(os.environ.get('LLM_CACHE_MAX_MB', 100))  # SQLite katmanı toplam yanıt boyutu
+    
+    # Arka plan iş kuyruğu (/process)
+    # Yükleme hemen bir iş ID'si döndürür; metin çıkarma, AI üretimi ve kayıt işlemleri
+    # worker işlemi başına sınırlı sayıda thread tarafından yürütülür. İş durumu veritabanında
+    # (processing_jobs) tutulur, harici broker gerekmez. Tüm gunicorn worker'ları aynı
+    # tablodan iş çeker; yükleme dosyaları iş bitene kadar JOB_SPOOL_FOLDER'da saklanır.
+    JOB_QUEUE_WORKERS = int(os.environ.get('JOB_QUEUE_WORKERS', 2))  # Worker işlemi başına eşzamanlı iş
+    JOB_QUEUE_POLL_INTERVAL = float(os.environ.get('JOB_QUEUE_POLL_INTERVAL', 2.0))  # Boşta kuyruk kontrol aralığı (saniye)
+    JOB_QUEUE_MAX_PENDING_PER_USER = int(os.environ.get('JOB_QUEUE_MAX_PENDING_PER_USER', 3))  # Kullanıcı başına bekleyen iş
+    JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', 900))  # Bu süre canlılık sinyali gelmeyen 'running' iş yarım kalmış sayılır
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 2))  # Yarım kalan iş en fazla kaç kez yeniden denenir
+    JOB_SPOOL_FOLDER = os.environ.get('JOB_SPOOL_FOLDER')  # Boşsa UPLOAD_FOLDER/jobs
+    # true: İşler istek içinde senkron çalıştırılır (testler ve tek süreçli geliştirme için)
+    JOB_QUEUE_INLINE = os.environ.get('JOB_QUEUE_INLINE', 'false').lower() in ('true', '1', 'yes')
+    
+    # Çıkarılmış metin deposu: dosya hash'i + çıkarıcı sürümüyle anahtarlanır, seviye/kullanıcı tipi
+    # değişse de dosya yeniden ayrıştırılmaz. Toplam boyut sınırı aşılınca en eski kayıtlar silinir
+    EXTRACTED_TEXT_CACHE_ENABLED = os.environ.get('EXTRACTED_TEXT_CACHE_ENABLED', 'true').lower() in ('true', '1', 'yes')
+    EXTRACTED_TEXT_CACHE_MAX_MB = int(os.environ.get('EXTRACTED_TEXT_CACHE_MAX_MB', 200))
+    
+    # Metin çıkarma işlem havuzu: CPU yoğun ayrıştırma gevent worker'ını bloklamasın diye ayrı işlemlerde çalışır
+    EXTRACTION_POOL_ENABLED = os.environ.get('EXTRACTION_POOL_ENABLED', 'true').lower() in ('true', '1', 'yes')
+    EXTRACTION_POOL_WORKERS = int(os.environ.get('EXTRACTION_POOL_WORKERS', 2))  # Worker işlemi başına ayrıştırma işlemi
+    EXTRACTION_CPU_TIME_LIMIT = int(os.environ.get('EXTRACTION_CPU_TIME_LIMIT', 60))  # İş başına CPU süresi (saniye)
+    EXTRACTION_MEMORY_LIMIT_MB = int(os.environ.get('EXTRACTION_MEMORY_LIMIT_MB', 1024))  # Havuz işlemi başına bellek (MB)
+    EXTRACTION_TIMEOUT = float(os.environ.get('EXTRACTION_TIMEOUT', 120))  # Kuyruk dahil bekleme süresi (saniye)
+    EXTRACTION_POOL_START_METHOD = os.environ.get('EXTRACTION_POOL_START_METHOD', 'spawn')  # spawn, forkserver, fork
+    # PDF metin çıkarma motoru: pypdf (varsayılan, her zaman kurulu), pdfium (pypdfium2), pdfminer (pdfminer.six)
+    # Seçilen motor kurulu değilse pypdf kullanılır. Karşılaştırma: python -m services.pdf_engines <pdf> ...
+    PDF_EXTRACTION_ENGINE = os.environ.get('PDF_EXTRACTION_ENGINE', 'pypdf')
+    # Zararlı/aşırı dosya korumaları: DOCX/PPTX arşivi yükleme sırasında (merkezi dizinden), sayfa sayısı ve
+    # süre çıkarma sırasında kontrol edilir; aşılırsa dosya açık bir hata mesajıyla reddedilir (0 = sınır yok)
+    DOCUMENT_MAX_UNCOMPRESSED_MB = int(os.environ.get('DOCUMENT_MAX_UNCOMPRESSED_MB', 200))  # Açılmış toplam boyut
+    DOCUMENT_MAX_ARCHIVE_ENTRIES = int(os.environ.get('DOCUMENT_MAX_ARCHIVE_ENTRIES', 5000))  # Arşivdeki dosya sayısı
+    DOCUMENT_MAX_COMPRESSION_RATIO = int(os.environ.get('DOCUMENT_MAX_COMPRESSION_RATIO', 200))  # 1 MB üstü dosyalarda
+    DOCUMENT_MAX_PAGES = int(os.environ.get('DOCUMENT_MAX_PAGES', 2000))  # PDF sayfası / PPTX slaytı
+    EXTRACTION_MAX_SECONDS = float(os.environ.get('EXTRACTION_MAX_SECONDS', 60))  # Doküman başına çıkarma süresi
+    # PDF sayfalarında ve slaytlarda tekrarlanan üst/alt bilgi, sayfa numarası ve telif satırları atılır (token tasarrufu)
+    BOILERPLATE_STRIPPING_ENABLED = os.environ.get('BOILERPLATE_STRIPPING_ENABLED', 'true').lower() in ('true', '1', 'yes')
+    # Bu boyut ve üstündeki PDF'ler sayfa aralıklarına bölünüp havuz işlemlerinde paralel okunur (0 = kapalı)
+    EXTRACTION_PARALLEL_MIN_MB = float(os.environ.get('EXTRACTION_PARALLEL_MIN_MB', 2))
+    EXTRACTION_PAGES_PER_TASK = int(os.environ.get('EXTRACTION_PAGES_PER_TASK', 16))  # Havuz işi başına sayfa
+    
+    # SocketIO ilerleme olayları bu aralıkta toplu gönderilir; aynı oda için bekleyen eski olay yenisiyle değiştirilir
+    SOCKET_PROGRESS_FLUSH_INTERVAL = float(os.environ.get('SOCKET_PROGRESS_FLUSH_INTERVAL', 0.05))
+    
+    # /internal/stats JSON uç noktası için erişim anahtarı (boşsa uç nokta kapalıdır)
+    STATS_ACCESS_TOKEN = os.environ.get('STATS_ACCESS_TOKEN')
+    
     # Flask-Mail SMTP ayarları
     MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'smtp.gmail.com'
     MAIL_PORT = int(os.environ.get('MAIL_PORT') or 587)
@@ -63,6 +63,20 @@ def when_ready(server):
     """Called just after the server is started."""
     server.log.info("StudyBuddy server is ready. Spawning workers...")
 
+def post_worker_init(worker):
+    """Called just after a worker has initialized the application."""
+    # Warm the shared OpenAI client so the first user request reuses an open connection
+    from config import Config
+    if Config.AI_WARM_CLIENT_ON_BOOT:
+        from services.ai_generator import warm_shared_generator
+        if warm_shared_generator():
+            worker.log.info("OpenAI connection pool warmed (pid %s)", worker.pid)
+    
+    # Start background job workers so this worker also picks up jobs queued by others
+    if not Config.JOB_QUEUE_INLINE:
+        from app import job_queue
+        job_queue.start()
+
 def on_exit(server):
     """Called just before exiting Gunicorn."""
     server.log.info("Shutting down StudyBuddy server...")
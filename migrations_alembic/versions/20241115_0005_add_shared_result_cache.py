@@ -0,0 +1,62 @@
+"""add_shared_result_cache
+
+Revision ID: 20241115_0005
+Revises: 20241115_0004
+Create Date: 2024-11-15 00:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20241115_0005'
+down_revision: Union[str, None] = '20241115_0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Kullanıcılar arası paylaşılan sonuç önbelleği
+    # Aynı içerik + seviye + dil + model için üretilmiş sonuç diğer kullanıcılara kopyalanır
+    
+    # documents: özel yüklemeler paylaşılan önbelleğe eklenmez
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.add_column(sa.Column('is_private', sa.Boolean(), nullable=False, server_default=sa.false()))
+    
+    # usage_stats: paylaşılan önbellek sayaçları
+    with op.batch_alter_table('usage_stats') as batch_op:
+        batch_op.add_column(sa.Column('shared_cache_hits', sa.Integer(), nullable=True, server_default='0'))
+        batch_op.add_column(sa.Column('shared_cache_misses', sa.Integer(), nullable=True, server_default='0'))
+        batch_op.add_column(sa.Column('shared_tokens_saved', sa.Integer(), nullable=True, server_default='0'))
+    
+    # shared_result_cache tablosunu oluştur
+    op.create_table(
+        'shared_result_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('result_id', sa.Integer(), nullable=False),
+        sa.Column('hit_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_hit_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['result_id'], ['results.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_shared_result_cache_cache_key', 'shared_result_cache', ['cache_key'], unique=True)
+    op.create_index('ix_shared_result_cache_result_id', 'shared_result_cache', ['result_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_shared_result_cache_result_id', table_name='shared_result_cache')
+    op.drop_index('ix_shared_result_cache_cache_key', table_name='shared_result_cache')
+    op.drop_table('shared_result_cache')
+    
+    with op.batch_alter_table('usage_stats') as batch_op:
+        batch_op.drop_column('shared_tokens_saved')
+        batch_op.drop_column('shared_cache_misses')
+        batch_op.drop_column('shared_cache_hits')
+    
+    with op.batch_alter_table('documents') as batch_op:
+        batch_op.drop_column('is_private')
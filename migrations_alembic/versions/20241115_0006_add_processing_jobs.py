@@ -0,0 +1,63 @@
+"""add_processing_jobs
+
+Revision ID: 20241115_0006
+Revises: 20241115_0005
+Create Date: 2024-11-15 00:06:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20241115_0006'
+down_revision: Union[str, None] = '20241115_0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # /process arka plan iş kuyruğu
+    # İş durumu veritabanında tutulur, harici broker gerekmez
+    op.create_table(
+        'processing_jobs',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='queued'),
+        sa.Column('progress', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('message', sa.String(length=255), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('worker_id', sa.String(length=100), nullable=True),
+        sa.Column('original_filename', sa.String(length=255), nullable=False),
+        sa.Column('file_type', sa.String(length=10), nullable=False),
+        sa.Column('file_size', sa.Integer(), nullable=False),
+        sa.Column('file_hash', sa.String(length=32), nullable=False),
+        sa.Column('payload_path', sa.String(length=500), nullable=True),
+        sa.Column('user_level', sa.String(length=20), nullable=False),
+        sa.Column('user_type', sa.String(length=20), nullable=False),
+        sa.Column('language', sa.String(length=5), nullable=False, server_default='tr'),
+        sa.Column('is_private', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('tokens_reserved', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('result_id', sa.Integer(), nullable=True),
+        sa.Column('result_metadata', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['result_id'], ['results.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_processing_jobs_user_id', 'processing_jobs', ['user_id'], unique=False)
+    op.create_index('ix_processing_jobs_status', 'processing_jobs', ['status'], unique=False)
+    op.create_index('ix_processing_jobs_created_at', 'processing_jobs', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_processing_jobs_created_at', table_name='processing_jobs')
+    op.drop_index('ix_processing_jobs_status', table_name='processing_jobs')
+    op.drop_index('ix_processing_jobs_user_id', table_name='processing_jobs')
+    op.drop_table('processing_jobs')
@@ -0,0 +1,45 @@
+"""add_extracted_text_cache
+
+Revision ID: 20241115_0007
+Revises: 20241115_0006
+Create Date: 2024-11-15 00:07:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20241115_0007'
+down_revision: Union[str, None] = '20241115_0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Çıkarılmış metin deposu: aynı dosya farklı seviye/kullanıcı tipiyle yüklendiğinde
+    # yeniden ayrıştırılmaz (dosya hash'i + çıkarıcı sürümü ile anahtarlanır)
+    op.create_table(
+        'extracted_text_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('file_hash', sa.String(length=32), nullable=False),
+        sa.Column('file_type', sa.String(length=10), nullable=False),
+        sa.Column('extractor_version', sa.String(length=20), nullable=False),
+        sa.Column('token_budget', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('text_size', sa.Integer(), nullable=False),
+        sa.Column('extraction_info', sa.Text(), nullable=True),
+        sa.Column('hit_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_hit_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('file_hash', 'file_type', 'extractor_version', 'token_budget', name='uq_extracted_text_key')
+    )
+    op.create_index('ix_extracted_text_cache_file_hash', 'extracted_text_cache', ['file_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_extracted_text_cache_file_hash', table_name='extracted_text_cache')
+    op.drop_table('extracted_text_cache')
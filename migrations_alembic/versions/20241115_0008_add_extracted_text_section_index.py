@@ -0,0 +1,29 @@
+"""add_extracted_text_section_index
+
+Revision ID: 20241115_0008
+Revises: 20241115_0007
+Create Date: 2024-11-15 00:08:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '20241115_0008'
+down_revision: Union[str, None] = '20241115_0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bölüm dizini (başlık, seviye, karakter ofsetleri, sayfa/slayt) çıkarılmış metinle birlikte saklanır
+    with op.batch_alter_table('extracted_text_cache') as batch_op:
+        batch_op.add_column(sa.Column('section_index', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('extracted_text_cache') as batch_op:
+        batch_op.drop_column('section_index')
@@ -25,6 +25,7 @@ class Document(db.Model):
     user_level = db.Column(db.String(20), nullable=False, index=True)  # elementary, middle_school, high_school, university
     user_type = db.Column(db.String(20), nullable=False, index=True)   # student, teacher
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    is_private = db.Column(db.Boolean, default=False, nullable=False)  # True: sonuçlar paylaşılan önbelleğe eklenmez
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_accessed = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -52,10 +53,53 @@ class Result(db.Model):
     processing_time = db.Column(db.Float, default=0.0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Relationships
+    shared_cache_entries = db.relationship('SharedResultCache', backref='result', lazy=True, cascade='all, delete-orphan')
+    
     def __repr__(self):
         return f'<Result for Document {self.document_id}>'
 
 
+class SharedResultCache(db.Model):
+    """Kullanıcılar arası paylaşılan sonuç önbelleği (içerik adresli)"""
+    __tablename__ = 'shared_result_cache'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # sha256(içerik hash'i, seviye, kullanıcı tipi, dil, model, prompt sürümü, soru limiti)
+    cache_key = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    result_id = db.Column(db.Integer, db.ForeignKey('results.id'), nullable=False, index=True)
+    hit_count = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_hit_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<SharedResultCache {self.cache_key[:12]} -> Result {self.result_id}>'
+
+
+class ExtractedTextCache(db.Model):
+    """Dosyadan çıkarılmış metin deposu (seviye ve kullanıcı tipinden bağımsız)"""
+    __tablename__ = 'extracted_text_cache'
+    __table_args__ = (
+        db.UniqueConstraint('file_hash', 'file_type', 'extractor_version', 'token_budget', name='uq_extracted_text_key'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    file_hash = db.Column(db.String(32), nullable=False, index=True)
+    file_type = db.Column(db.String(10), nullable=False)
+    extractor_version = db.Column(db.String(20), nullable=False)
+    token_budget = db.Column(db.Integer, default=0, nullable=False)  # 0 = metnin tamamı
+    text = db.Column(db.Text, nullable=False)
+    text_size = db.Column(db.Integer, nullable=False)  # byte (UTF-8), boyut sınırı için
+    extraction_info = db.Column(db.Text, nullable=True)  # JSON string (okunan/atlanan sayfa vb.)
+    section_index = db.Column(db.Text, nullable=True)  # JSON string: [{heading, level, start, end, page}]
+    hit_count = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_hit_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<ExtractedTextCache {self.file_hash[:12]} v{self.extractor_version} ({self.text_size} bytes)>'
+
+
 class User(UserMixin, db.Model):
     """Kullanıcı hesapları"""
     __tablename__ = 'users'
@@ -149,6 +193,10 @@ class UsageStats(db.Model):
     cache_hits = db.Column(db.Integer, default=0)
     cache_misses = db.Column(db.Integer, default=0)
     total_tokens_saved = db.Column(db.Integer, default=0)
+    # Kullanıcılar arası paylaşılan önbellek sayaçları
+    shared_cache_hits = db.Column(db.Integer, default=0)
+    shared_cache_misses = db.Column(db.Integer, default=0)
+    shared_tokens_saved = db.Column(db.Integer, default=0)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     @classmethod
@@ -175,6 +223,19 @@ class UsageStats(db.Model):
         self.last_updated = datetime.utcnow()
         db.session.commit()
     
+    def update_shared_cache_hit(self, tokens_saved):
+        """Paylaşılan önbellek hit kaydi"""
+        self.shared_cache_hits = (self.shared_cache_hits or 0) + 1
+        self.shared_tokens_saved = (self.shared_tokens_saved or 0) + tokens_saved
+        self.last_updated = datetime.utcnow()
+        db.session.commit()
+    
+    def update_shared_cache_miss(self):
+        """Paylaşılan önbellek miss kaydi"""
+        self.shared_cache_misses = (self.shared_cache_misses or 0) + 1
+        self.last_updated = datetime.utcnow()
+        db.session.commit()
+    
     def __repr__(self):
         return f'<UsageStats hits={self.cache_hits} misses={self.cache_misses}>'
 
@@ -347,3 +408,66 @@ class TokenPurchase(db.Model):
     
     def __repr__(self):
         return f'<TokenPurchase {self.tokens} tokens for User {self.user_id}>'
+
+
+class ProcessingJob(db.Model):
+    """Arka planda işlenen yükleme işleri (/process iş kuyruğu)"""
+    __tablename__ = 'processing_jobs'
+    
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    status = db.Column(db.String(20), default='queued', nullable=False, index=True)  # queued, running, completed, failed
+    progress = db.Column(db.Integer, default=0, nullable=False)  # 0-100
+    message = db.Column(db.String(255), nullable=True)  # Son ilerleme mesajı
+    error = db.Column(db.Text, nullable=True)  # Kullanıcıya gösterilecek hata mesajı
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    worker_id = db.Column(db.String(100), nullable=True)  # İşi alan worker ve sahiplik anahtarı (host:pid:claim)
+    # Yükleme parametreleri
+    original_filename = db.Column(db.String(255), nullable=False)
+    file_type = db.Column(db.String(10), nullable=False)
+    file_size = db.Column(db.Integer, nullable=False)
+    file_hash = db.Column(db.String(32), nullable=False)
+    payload_path = db.Column(db.String(500), nullable=True)  # İş bitene kadar saklanan yükleme dosyası
+    user_level = db.Column(db.String(20), nullable=False)
+    user_type = db.Column(db.String(20), nullable=False)
+    language = db.Column(db.String(5), nullable=False, default='tr')
+    is_private = db.Column(db.Boolean, default=False, nullable=False)
+    tokens_reserved = db.Column(db.Integer, default=0, nullable=False)  # Kuyruğa alınırken düşülen fiş (başarısızlıkta iade)
+    # Sonuç
+    # Sonuç silinirse (yeniden yükleme, eski cache temizliği) iş kaydı kalır, bağlantı kopar
+    result_id = db.Column(db.Integer, db.ForeignKey('results.id', ondelete='SET NULL'), nullable=True)
+    result_metadata = db.Column(db.Text, nullable=True)  # JSON string (plan limit bilgisi, işlem süresi vb.)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # Çalışan worker'ın son canlılık sinyali
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    # Relationships
+    user = db.relationship('User', backref=db.backref('processing_jobs', lazy='dynamic', cascade='all, delete-orphan'))
+    result = db.relationship('Result')
+    
+    @property
+    def is_finished(self):
+        """İş tamamlandı veya başarısız oldu mu"""
+        return self.status in (self.STATUS_COMPLETED, self.STATUS_FAILED)
+    
+    def to_dict(self):
+        """Durum uç noktası ve SocketIO olayları için JSON'a çevrilebilir dict"""
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'error': self.error,
+            'result_id': self.result_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    def __repr__(self):
+        return f'<ProcessingJob {self.id} - {self.status}>'
@@ -3,15 +3,35 @@ AI Üretim Servisi
 OpenAI API ile özet, sorular ve flashcard üretme fonksiyonları
 """
 
+import contextvars
+import hashlib
 import json
+import logging
+import math
 import random
-from typing import Dict, List, Any
-from openai import OpenAI
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from typing import Dict, List, Any, Callable, Optional, Tuple
+from openai import OpenAI, DefaultHttpxClient
 from config import Config
+from services.llm_cache import build_cache_key, get_llm_cache
+from services.llm_resilience import CircuitBreaker, LLMCallError, ResilientCaller
+from services.llm_rate_limiter import get_rate_limiter, DEFAULT_PRIORITY
+from services.document_reader import DocumentReader
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - openai paketi normalde httpx ile gelir
+    httpx = None
+
+logger = logging.getLogger(__name__)
 
 # Türkçe prompt şablonları
 TR_PROMPTS = {
     'system': 'Sen bir eğitim asistanısın. Verilen metinlerden kaliteli özet, sorular ve flashcard\'lar üretiyorsun. Yanıtlarını her zaman Türkçe ver.',
+    'document_block': 'Bu konuşmadaki görevlerin kaynağı olan metin aşağıdadır. Görev bir sonraki mesajda verilecektir.\n\nMetin:\n{text}',
+    'document_reference': '(Metin yukarıdaki mesajda verilmiştir)',
     'summary_intro': 'Aşağıdaki metni {level_name} ({age_range}) seviyesindeki {user_type_desc} için anlaşılır ve kapsamlı bir şekilde özetle.',
     'summary_full': '{intro}\n\nÖNEMLİ KURALLAR:\n1. Dili seviyeye uygun tut ({level_style})\n2. Ana konuları, önemli kavramları ve kilit noktaları içer\n3. Başlıklar ve alt başlıklar kullan\n4. Markdown formatında yaz (## başlıklar, - madde işaretleri)\n5. Önemli terimleri **kalın** yap\n6. Konular arasında boşluk bırak\n\nMetin:\n{text}\n\nLütfen özetini yapılandırılmış Markdown formatında ver.',
     'mcq_intro': 'Aşağıdaki metinden {level_name} seviyesine uygun {count} adet çoktan seçmeli soru üret.',
@@ -23,12 +43,16 @@ TR_PROMPTS = {
     'true_false_intro': 'Aşağıdaki metinden {level_name} seviyesine uygun {count} adet doğru-yanlış sorusu üret.',
     'true_false_full': '{intro}\n\nHEDEF KİTLE: {level_name}\nKULLANICI TİPİ: {user_type_desc}\n\nÖNEMLİ KURALLAR:\n1. Metindeki BAŞLIKLARI, ÜNİTELERİ ve KONU BAŞLIKLARINI tespit et\n2. Her önemli konudan MUTLAKA sorular sor\n3. Hem doğru hem yanlış ifadeler olmalı (yaklaşık %50-%50)\n4. Yanlış ifadeler mantıklı ama yanlış olmalı (çeldirici)\n5. Dili seviyeye uygun tut\n6. Her ifadeye detaylı açıklama ekle\n\nYanıtını JSON formatında ver:\n[\n  {{\n    "statement": "İfade metni",\n    "is_true": true,\n    "explanation": "Detaylı açıklama: Neden doğru/yanlış olduğu",\n    "topic": "Konu başlığı"\n  }}\n]\n\nMetin:\n{text}\n\nLütfen sadece JSON formatında yanıt ver.',
     'flashcard_intro': 'Aşağıdaki metinden {level_name} seviyesine uygun {count} adet flashcard (çalışma kartı) üret.',
-    'flashcard_full': '{intro}\n\nHEDEF KİTLE: {level_name}\n\nÇOK ÖNEMLİ KURALLAR:\n1. Metindeki BAŞLIKLARI, ÜNİTELERİ ve KONU BAŞLIKLARINI tespit et\n2. Her flashcard belirli bir KONU/KAVRAM hakkında olmalı\n3. Ön yüz: Konuyu anlatan SORU (sadece terim değil!)\n4. Arka yüz: Detaylı, öğretici AÇIKLAMA (sadece tanım değil!)\n5. Flashcard\'lar konunun ÖZÜNÜ öğretmeli\n6. Sadece dokümandaki kelimeleri sorma, KAVRAMI öğret\n\nYANLIŞ ÖRNEK (yapma!):\nFront: "Fotosentez nedir?"\nBack: "Bitkilerin ışıkla besin üretmesidir."\n\nDOĞRU ÖRNEK (yap!):\nFront: "Fotosentez sırasında bitki hücresinde hangi dönüşümler gerçekleşir ve bu sürecin canlılar için önemi nedir?"\nBack: "Klorofil molekülleri ışık enerjisini yakalar ve bu enerjiyle su molekülleri parçalanır. CO2 ve sudan glikoz sentezlenir. Bu süreç atmosfere oksijen salar ve besin zincirinin temelidir. Tüm canlılar doğrudan veya dolaylı olarak fotosenteze bağımlıdır."\n\nYanıtını JSON formatında ver:\n[\n  {{\n    "front": "Derinlemesine öğretici soru",\n    "back": "Detaylı, kavramsal açıklama",\n    "topic": "Konu başlığı"\n  }}\n]\n\nMetin:\n{text}\n\nLütfen sadece JSON formatında yanıt ver.'
+    'flashcard_full': '{intro}\n\nHEDEF KİTLE: {level_name}\n\nÇOK ÖNEMLİ KURALLAR:\n1. Metindeki BAŞLIKLARI, ÜNİTELERİ ve KONU BAŞLIKLARINI tespit et\n2. Her flashcard belirli bir KONU/KAVRAM hakkında olmalı\n3. Ön yüz: Konuyu anlatan SORU (sadece terim değil!)\n4. Arka yüz: Detaylı, öğretici AÇIKLAMA (sadece tanım değil!)\n5. Flashcard\'lar konunun ÖZÜNÜ öğretmeli\n6. Sadece dokümandaki kelimeleri sorma, KAVRAMI öğret\n\nYANLIŞ ÖRNEK (yapma!):\nFront: "Fotosentez nedir?"\nBack: "Bitkilerin ışıkla besin üretmesidir."\n\nDOĞRU ÖRNEK (yap!):\nFront: "Fotosentez sırasında bitki hücresinde hangi dönüşümler gerçekleşir ve bu sürecin canlılar için önemi nedir?"\nBack: "Klorofil molekülleri ışık enerjisini yakalar ve bu enerjiyle su molekülleri parçalanır. CO2 ve sudan glikoz sentezlenir. Bu süreç atmosfere oksijen salar ve besin zincirinin temelidir. Tüm canlılar doğrudan veya dolaylı olarak fotosenteze bağımlıdır."\n\nYanıtını JSON formatında ver:\n[\n  {{\n    "front": "Derinlemesine öğretici soru",\n    "back": "Detaylı, kavramsal açıklama",\n    "topic": "Konu başlığı"\n  }}\n]\n\nMetin:\n{text}\n\nLütfen sadece JSON formatında yanıt ver.',
+    'combined_intro': 'Aşağıdaki metinden {level_name} ({age_range}) seviyesindeki {user_type_desc} için tek seferde özet, soru setleri ve flashcard\'lar üret.',
+    'combined_full': '{intro}\n\nHEDEF KİTLE: {level_name}\nKULLANICI TİPİ: {user_type_desc}\n\nÜRETİLECEK İÇERİKLER:\n1. summary: Markdown formatında yapılandırılmış özet (## başlıklar, - madde işaretleri, önemli terimler **kalın**, dil: {level_style})\n2. multiple_choice: {mcq_count} adet çoktan seçmeli soru (4 seçenek, correct_answer doğru seçeneğin 0-3 arası indeksi, her soruya detaylı açıklama)\n3. short_answer: {short_answer_count} adet kısa cevap sorusu (her cevap en fazla {max_words} kelime, accepted_answers alanında en fazla 2 alternatif ifade)\n4. fill_blank: {fill_blank_count} adet boş doldurma sorusu (boşluk _____ ile gösterilir, doğru cevap dahil toplam 4 seçenek)\n5. true_false: {true_false_count} adet doğru-yanlış ifadesi (yaklaşık %50 doğru, %50 yanlış, her ifadeye detaylı açıklama)\n6. flashcards: {flashcard_count} adet flashcard (ön yüz konuyu anlatan SORU, arka yüz detaylı ve öğretici AÇIKLAMA)\n\nÇOKTAN SEÇMELİ ZORLUK DAĞILIMI (mutlaka uyulmalı):\n{difficulty_dist}\n\nÖNEMLİ KURALLAR:\n1. Metindeki BAŞLIKLARI, ÜNİTELERİ ve KONU BAŞLIKLARINI tespit et\n2. Her önemli konudan MUTLAKA sorular sor, soruları konulara dengeli dağıt\n3. Sorular içeriği ÖĞRETİR nitelikte olmalı, sadece ezber değil\n4. Yanlış şıklar ve yanlış ifadeler mantıklı ama yanlış olmalı (çeldirici)\n5. Dili seviyeye uygun tut\n6. Her öğenin topic alanına ilgili konu başlığını yaz\n\nMetin:\n{text}\n\nLütfen yanıtını verilen JSON şemasına uygun tek bir JSON nesnesi olarak ver.'
 }
 
 # İngilizce prompt şablonları
 EN_PROMPTS = {
     'system': 'You are an educational assistant. You generate quality summaries, questions, and flashcards from given texts. Always respond in English.',
+    'document_block': 'The text below is the source for the task in this conversation. The task will be given in the next message.\n\nText:\n{text}',
+    'document_reference': '(The text is given in the message above)',
     'summary_intro': 'Summarize the following text for {user_type_desc} at {level_name} level ({age_range}) in a clear and comprehensive way.',
     'summary_full': '{intro}\n\nIMPORTANT RULES:\n1. Keep language appropriate for the level ({level_style})\n2. Include main topics, important concepts, and key points\n3. Use headings and subheadings\n4. Write in Markdown format (## headings, - bullet points)\n5. Make important terms **bold**\n6. Leave space between topics\n\nText:\n{text}\n\nPlease provide the summary in structured Markdown format.',
     'mcq_intro': 'Generate {count} multiple-choice questions suitable for {level_name} level from the following text.',
@@ -40,7 +64,9 @@ EN_PROMPTS = {
     'true_false_intro': 'Generate {count} true-false questions suitable for {level_name} level from the following text.',
     'true_false_full': '{intro}\n\nTARGET AUDIENCE: {level_name}\nUSER TYPE: {user_type_desc}\n\nIMPORTANT RULES:\n1. Identify HEADINGS, UNITS, and TOPIC HEADINGS in the text\n2. Ask questions from EVERY important topic\n3. Both true and false statements should be included (approximately 50%-50%)\n4. False statements should be plausible but incorrect (distractors)\n5. Keep language appropriate for the level\n6. Add detailed explanation to each statement\n\nRespond in JSON format:\n[\n  {{\n    "statement": "Statement text",\n    "is_true": true,\n    "explanation": "Detailed explanation: Why it is true/false",\n    "topic": "Topic heading"\n  }}\n]\n\nText:\n{text}\n\nPlease respond only in JSON format.',
     'flashcard_intro': 'Generate {count} flashcards suitable for {level_name} level from the following text.',
-    'flashcard_full': '{intro}\n\nTARGET AUDIENCE: {level_name}\n\nVERY IMPORTANT RULES:\n1. Identify HEADINGS, UNITS, and TOPIC HEADINGS in the text\n2. Each flashcard should be about a specific TOPIC/CONCEPT\n3. Front: A QUESTION that explains the topic (not just a term!)\n4. Back: Detailed, educational EXPLANATION (not just a definition!)\n5. Flashcards should teach the ESSENCE of the topic\n6. Don\'t just ask about words in the document, teach the CONCEPT\n\nWRONG EXAMPLE (don\'t do!):\nFront: "What is photosynthesis?"\nBack: "Plants producing food with light."\n\nCORRECT EXAMPLE (do!):\nFront: "What transformations occur in plant cells during photosynthesis and what is the importance of this process for living organisms?"\nBack: "Chlorophyll molecules capture light energy and use it to split water molecules. Glucose is synthesized from CO2 and water. This process releases oxygen into the atmosphere and is the foundation of the food chain. All living organisms depend directly or indirectly on photosynthesis."\n\nRespond in JSON format:\n[\n  {{\n    "front": "In-depth educational question",\n    "back": "Detailed, conceptual explanation",\n    "topic": "Topic heading"\n  }}\n]\n\nText:\n{text}\n\nPlease respond only in JSON format.'
+    'flashcard_full': '{intro}\n\nTARGET AUDIENCE: {level_name}\n\nVERY IMPORTANT RULES:\n1. Identify HEADINGS, UNITS, and TOPIC HEADINGS in the text\n2. Each flashcard should be about a specific TOPIC/CONCEPT\n3. Front: A QUESTION that explains the topic (not just a term!)\n4. Back: Detailed, educational EXPLANATION (not just a definition!)\n5. Flashcards should teach the ESSENCE of the topic\n6. Don\'t just ask about words in the document, teach the CONCEPT\n\nWRONG EXAMPLE (don\'t do!):\nFront: "What is photosynthesis?"\nBack: "Plants producing food with light."\n\nCORRECT EXAMPLE (do!):\nFront: "What transformations occur in plant cells during photosynthesis and what is the importance of this process for living organisms?"\nBack: "Chlorophyll molecules capture light energy and use it to split water molecules. Glucose is synthesized from CO2 and water. This process releases oxygen into the atmosphere and is the foundation of the food chain. All living organisms depend directly or indirectly on photosynthesis."\n\nRespond in JSON format:\n[\n  {{\n    "front": "In-depth educational question",\n    "back": "Detailed, conceptual explanation",\n    "topic": "Topic heading"\n  }}\n]\n\nText:\n{text}\n\nPlease respond only in JSON format.',
+    'combined_intro': 'Generate a summary, question sets, and flashcards in one pass from the following text for {user_type_desc} at {level_name} level ({age_range}).',
+    'combined_full': '{intro}\n\nTARGET AUDIENCE: {level_name}\nUSER TYPE: {user_type_desc}\n\nCONTENT TO GENERATE:\n1. summary: Structured summary in Markdown format (## headings, - bullet points, important terms in **bold**, language: {level_style})\n2. multiple_choice: {mcq_count} multiple-choice questions (4 options, correct_answer is the 0-3 index of the correct option, detailed explanation for each question)\n3. short_answer: {short_answer_count} short-answer questions (each answer at most {max_words} words, at most 2 alternative phrasings in accepted_answers)\n4. fill_blank: {fill_blank_count} fill-in-the-blank questions (blank shown as _____, 4 options in total including the correct answer)\n5. true_false: {true_false_count} true-false statements (approximately 50% true, 50% false, detailed explanation for each statement)\n6. flashcards: {flashcard_count} flashcards (front: a QUESTION that explains the topic, back: detailed, educational EXPLANATION)\n\nMULTIPLE-CHOICE DIFFICULTY DISTRIBUTION (must be followed):\n{difficulty_dist}\n\nIMPORTANT RULES:\n1. Identify HEADINGS, UNITS, and TOPIC HEADINGS in the text\n2. Ask questions from EVERY important topic and distribute them evenly across topics\n3. Questions should TEACH the content, not just test memorization\n4. Wrong options and false statements should be plausible but incorrect (distractors)\n5. Keep language appropriate for the level\n6. Write the related topic heading in the topic field of every item\n\nText:\n{text}\n\nPlease respond with a single JSON object that follows the given JSON schema.'
 }
 
 PROMPT_TEMPLATES = {
@@ -48,6 +74,175 @@ PROMPT_TEMPLATES = {
     'en': EN_PROMPTS
 }
 
+# Prompt şablonlarının sürümü: şablonlar değiştiğinde otomatik değişir,
+# böylece paylaşılan önbellekte eski prompt'larla üretilmiş sonuçlar kullanılmaz
+PROMPT_VERSION = hashlib.sha256(json.dumps(PROMPT_TEMPLATES, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+# generate_all_content sonuç anahtarları (sıra önemli: veritabanı ve şablonlar bu yapıyı bekler)
+RESULT_KEYS = ('summary', 'multiple_choice', 'short_answer', 'fill_blank', 'true_false', 'flashcards')
+
+# Üretim modları:
+# - fanout: Her içerik türü için ayrı çağrı (6 çağrı, metin 6 kez gönderilir)
+# - single: Tüm içerikler tek bir structured-output çağrısında (metin 1 kez gönderilir)
+# - auto: Metin uzunluğuna göre seçim (Config.AI_SINGLE_CALL_MAX_CHARS)
+GENERATION_MODES = ('fanout', 'single', 'auto')
+
+# Prompt yerleşimleri (Config.AI_PROMPT_LAYOUT):
+# - instructions_first: Talimatlar önce, metin prompt'un sonunda (tek kullanıcı mesajı)
+# - document_first: Sistem mesajı + metin bloğu her çağrıda aynı önek, türe özel talimatlar ayrı kısa mesajda;
+#   aynı doküman için yapılan çağrılar sağlayıcının prompt önbelleğinden (cached input token) yararlanır
+PROMPT_LAYOUTS = ('instructions_first', 'document_first')
+
+# Çağrının hız sınırı önceliği (planın llm_priority özelliği); generate_all_content* ayarlar,
+# _run_concurrently görevlere kopyalar
+_call_priority = contextvars.ContextVar('llm_call_priority', default=DEFAULT_PRIORITY)
+
+# Çıktı token tavanı için öğe başına tahmini üst sınır (Türkçe açıklamalı JSON öğesi, pay dahil).
+# Tavan istenen öğe sayısından hesaplanır; planın göstermeyeceği öğeler için token harcanmaz
+OUTPUT_TOKENS_PER_ITEM = {
+    'multiple_choice': 260,
+    'short_answer': 120,
+    'fill_blank': 180,
+    'true_false': 160,
+    'flashcards': 220
+}
+OUTPUT_TOKENS_OVERHEAD = 300  # JSON iskeleti ve model payı
+OUTPUT_TOKENS_SUMMARY = 2500  # Tek çağrı modunda özet için ayrılan pay
+OUTPUT_TOKENS_SAFETY_MARGIN = 1.3  # Tahmini aşan yanıtlar kesilmesin diye tavana eklenen pay
+
+# Modellerin tek yanıtta üretebileceği en fazla token; model adı en uzun önekle eşleştirilir
+# (tarihli sürümler, örn. gpt-4.1-mini-2025-04-14, aynı sınırı kullanır)
+MODEL_OUTPUT_TOKEN_LIMITS = {
+    'gpt-4.1': 32768,
+    'gpt-4o': 16384,
+    'gpt-4-turbo': 4096,
+    'gpt-3.5-turbo': 4096
+}
+DEFAULT_OUTPUT_TOKEN_LIMIT = 16384
+
+
+def resolve_generation_counts(level: str = 'high_school', user_plan: str = 'free') -> Tuple[int, int]:
+    """
+    Üretilecek soru (tür başına) ve flashcard sayılarını belirler
+    
+    Seviyenin questions_per_type değeri planın max_questions_per_type limitiyle sınırlanır;
+    böylece plan gereği gösterilmeyecek sorular hiç üretilmez. Flashcard'lar plan bazında
+    sınırlanmadığından seviyenin soru sayısının iki katı kalır.
+    
+    Args:
+        level: Kullanıcı seviyesi
+        user_plan: Kullanıcı planı (free, standard, premium)
+        
+    Returns:
+        (question_count, flashcard_count)
+    """
+    level_config = Config.LEVEL_SETTINGS.get(level, Config.LEVEL_SETTINGS['high_school'])
+    level_count = level_config['questions_per_type']
+    flashcard_count = level_count * 2  # Flashcard sayisi daha fazla
+    
+    question_limit = Config.get_plan_limit(user_plan, 'max_questions_per_type')
+    question_count = level_count if question_limit is None else min(level_count, question_limit)
+    return question_count, flashcard_count
+
+
+def _json_object_schema(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Strict structured output için tüm alanları zorunlu, ek alan kabul etmeyen obje şeması"""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties.keys()),
+        "additionalProperties": False
+    }
+
+
+def _distribute_count(total: int, weights: List[int]) -> List[int]:
+    """
+    Toplam sayıyı ağırlıklara oranla dağıtır (en büyük kalan yöntemi)
+    
+    Args:
+        total: Dağıtılacak toplam sayı
+        weights: Her parça için ağırlık (örn. bölüm uzunluğu)
+        
+    Returns:
+        Toplamı total olan tam sayı listesi
+    """
+    weight_sum = sum(weights) or 1
+    shares = [total * weight / weight_sum for weight in weights]
+    counts = [int(share) for share in shares]
+    remainders = sorted(range(len(weights)), key=lambda i: shares[i] - counts[i], reverse=True)
+    for i in remainders[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def _merge_balanced(item_lists: List[List[Any]], count: int) -> List[Any]:
+    """
+    Bölüm bazlı listelerden sırayla (round-robin) seçerek en fazla count öğe alır
+    
+    Böylece bir bölüm fazla öğe üretse bile diğer bölümlerin konuları temsil edilir.
+    Seçilen öğeler doküman sırasında döndürülür.
+    
+    Args:
+        item_lists: Bölüm sırasına göre öğe listeleri
+        count: Hedef öğe sayısı
+        
+    Returns:
+        Birleştirilmiş öğe listesi
+    """
+    selected = []
+    depth = 0
+    while len(selected) < count and any(depth < len(items) for items in item_lists):
+        for index, items in enumerate(item_lists):
+            if depth < len(items) and len(selected) < count:
+                selected.append((index, depth))
+        depth += 1
+    selected.sort()
+    return [item_lists[index][position] for index, position in selected]
+
+
+_STRING = {"type": "string"}
+_STRING_LIST = {"type": "array", "items": _STRING}
+
+# Tek çağrı modunun JSON şeması (generate_all_content ile aynı sözlük yapısı)
+COMBINED_RESPONSE_SCHEMA = {
+    "name": "study_materials",
+    "strict": True,
+    "schema": _json_object_schema({
+        "summary": _STRING,
+        "multiple_choice": {"type": "array", "items": _json_object_schema({
+            "question": _STRING,
+            "options": _STRING_LIST,
+            "correct_answer": {"type": "integer"},
+            "difficulty": {"type": "string", "enum": ["simple", "medium", "advanced", "academic"]},
+            "topic": _STRING,
+            "explanation": _STRING
+        })},
+        "short_answer": {"type": "array", "items": _json_object_schema({
+            "question": _STRING,
+            "answer": _STRING,
+            "accepted_answers": _STRING_LIST,
+            "topic": _STRING
+        })},
+        "fill_blank": {"type": "array", "items": _json_object_schema({
+            "question": _STRING,
+            "answer": _STRING,
+            "options": _STRING_LIST,
+            "topic": _STRING
+        })},
+        "true_false": {"type": "array", "items": _json_object_schema({
+            "statement": _STRING,
+            "is_true": {"type": "boolean"},
+            "explanation": _STRING,
+            "topic": _STRING
+        })},
+        "flashcards": {"type": "array", "items": _json_object_schema({
+            "front": _STRING,
+            "back": _STRING,
+            "topic": _STRING
+        })}
+    })
+}
+
 class AIGenerator:
     """OpenAI API kullanarak eğitim içeriği üreten sınıf"""
     
@@ -63,41 +258,276 @@ class AIGenerator:
         self.api_key = api_key or Config.OPENAI_API_KEY
         self.model = model or Config.OPENAI_MODEL
         self.demo_mode = Config.DEMO_MODE
+        # Varsayılan dil; metotlara verilen language parametresi bunu değiştirmez
         self.language = language if language in ['tr', 'en'] else 'tr'
         self.prompts = PROMPT_TEMPLATES.get(self.language, TR_PROMPTS)
         
+        # Bağlantı havuzu ve token kullanım istatistikleri (thread-safe)
+        self._stats_lock = threading.Lock()
+        self._connection_stats = {'requests': 0, 'new_connections': 0}
+        self._usage_stats = {layout: {'calls': 0, 'prompt_tokens': 0, 'cached_tokens': 0,
+                                      'completion_tokens': 0, 'seconds': 0.0} for layout in PROMPT_LAYOUTS}
+        
+        # Yeniden deneme SDK yerine dayanıklı çağrı katmanında yapılır (max_retries=0); devre kesici
+        # paylaşılan generator üzerinden worker işlemi genelindedir
+        self._caller = ResilientCaller(
+            CircuitBreaker(Config.AI_CIRCUIT_FAILURE_THRESHOLD, Config.AI_CIRCUIT_RESET_SECONDS),
+            max_retries=Config.AI_MAX_RETRIES,
+            base_delay=Config.AI_RETRY_BASE_DELAY,
+            max_delay=Config.AI_RETRY_MAX_DELAY,
+            deadline=Config.AI_CALL_DEADLINE or None,
+            hedge_after=Config.AI_HEDGE_AFTER_SECONDS,
+            hedge_workers=Config.AI_MAX_CONCURRENCY
+        )
+        
         if not self.demo_mode:
-            self.client = OpenAI(api_key=self.api_key)
+            self.client = OpenAI(api_key=self.api_key, http_client=self._build_http_client(), max_retries=0)
         else:
             self.client = None  # Demo modda client gerekmiyor
     
-    def _call_openai(self, prompt: str, temperature: float = 0.7) -> str:
+    def _build_http_client(self):
+        """
+        Keep-alive bağlantı havuzlu HTTP client oluşturur
+        
+        Returns:
+            Havuz limitleri ayarlanmış httpx client, httpx yoksa None (SDK varsayılanı)
+        """
+        if httpx is None:
+            return None
+        
+        limits = httpx.Limits(
+            max_connections=Config.AI_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.AI_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=Config.AI_HTTP_KEEPALIVE_EXPIRY
+        )
+        return DefaultHttpxClient(limits=limits, event_hooks={'request': [self._on_request]})
+    
+    def _on_request(self, request) -> None:
+        """httpx request hook'u: yeni TCP bağlantılarını saymak için trace ekler"""
+        with self._stats_lock:
+            self._connection_stats['requests'] += 1
+        request.extensions['trace'] = self._on_trace
+    
+    def _on_trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        """httpcore trace callback'i: havuzdan değil yeni açılan bağlantıları sayar"""
+        if event_name == 'connection.connect_tcp.complete':
+            with self._stats_lock:
+                self._connection_stats['new_connections'] += 1
+    
+    def get_connection_stats(self) -> Dict[str, Any]:
+        """
+        Bağlantı havuzu limitlerini ve yeniden kullanım istatistiklerini döndürür
+        
+        Returns:
+            dict: pool_enabled, max_connections, max_keepalive_connections,
+                  keepalive_expiry, requests, new_connections, reused_connections
+        """
+        with self._stats_lock:
+            requests_sent = self._connection_stats['requests']
+            new_connections = self._connection_stats['new_connections']
+        
+        return {
+            'pool_enabled': self.client is not None and httpx is not None,
+            'max_connections': Config.AI_HTTP_MAX_CONNECTIONS,
+            'max_keepalive_connections': Config.AI_HTTP_MAX_KEEPALIVE,
+            'keepalive_expiry': Config.AI_HTTP_KEEPALIVE_EXPIRY,
+            'requests': requests_sent,
+            'new_connections': new_connections,
+            'reused_connections': max(requests_sent - new_connections, 0)
+        }
+    
+    def get_call_stats(self) -> Dict[str, Any]:
+        """
+        Dayanıklı çağrı katmanı istatistikleri (denemeler, yeniden denemeler, yedek istekler,
+        hata sınıfları, gecikme yüzdelikleri, devre kesici durumu)
+        """
+        return self._caller.get_stats()
+    
+    def _record_usage(self, layout: str, response: Any, seconds: float) -> None:
+        """Yanıtın usage alanından prompt / önbellekten okunan / çıktı token sayılarını toplar"""
+        usage = getattr(response, 'usage', None)
+        details = getattr(usage, 'prompt_tokens_details', None)
+        counts = {
+            'prompt_tokens': getattr(usage, 'prompt_tokens', 0),
+            'cached_tokens': getattr(details, 'cached_tokens', 0),
+            'completion_tokens': getattr(usage, 'completion_tokens', 0)
+        }
+        with self._stats_lock:
+            stats = self._usage_stats[layout]
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+            for name, value in counts.items():
+                if isinstance(value, int):
+                    stats[name] += value
+    
+    def get_usage_stats(self) -> Dict[str, Any]:
+        """
+        Prompt yerleşimine göre token kullanımı ve sağlayıcı prompt önbelleği istatistikleri
+        
+        Returns:
+            dict: layout, yerleşim adı -> calls, prompt_tokens, cached_tokens, completion_tokens,
+                  cached_ratio, avg_seconds
+        """
+        with self._stats_lock:
+            usage = {layout: dict(stats) for layout, stats in self._usage_stats.items()}
+        
+        for stats in usage.values():
+            stats['cached_ratio'] = round(stats['cached_tokens'] / stats['prompt_tokens'], 4) if stats['prompt_tokens'] else None
+            stats['avg_seconds'] = round(stats.pop('seconds') / stats['calls'], 3) if stats['calls'] else None
+        usage['layout'] = Config.AI_PROMPT_LAYOUT
+        return usage
+    
+    def _prompt_document(self, text: str, language: str) -> Tuple[str, Optional[str]]:
+        """
+        Prompt şablonundaki {text} yerine konacak değeri ve ayrı gönderilecek doküman bloğunu döndürür
+        
+        Args:
+            text: Doküman metni
+            language: Dil kodu
+            
+        Returns:
+            (şablona konacak metin, document_first yerleşiminde ayrı mesajda gidecek doküman veya None)
+        """
+        if Config.AI_PROMPT_LAYOUT == 'document_first':
+            return PROMPT_TEMPLATES[language]['document_reference'], text
+        return text, None
+    
+    def warm_up(self) -> bool:
+        """
+        İlk kullanıcı isteğinden önce TLS bağlantısını açıp havuza koyar
+        
+        Returns:
+            bool: Isınma başarılıysa True (demo modda her zaman True)
+        """
+        if self.demo_mode:
+            return True
+        
+        try:
+            self.client.with_options(timeout=Config.AI_WARM_UP_TIMEOUT, max_retries=0).models.list()
+            logger.info("[AI] OpenAI bağlantı havuzu ısıtıldı")
+            return True
+        except Exception as e:
+            # Isınma hatası uygulamayı durdurmamalı; ilk istek bağlantıyı kendisi açar
+            logger.warning(f"[AI] OpenAI bağlantı ısınması başarısız: {str(e)}")
+            return False
+    
+    def _resolve_language(self, language: str = None) -> str:
+        """
+        Çağrı için kullanılacak dili belirler (örnek durumunu değiştirmez)
+        
+        Args:
+            language: İstenen dil kodu, None veya desteklenmeyen ise varsayılan dil
+            
+        Returns:
+            str: PROMPT_TEMPLATES içinde bulunan dil kodu
+        """
+        if language in PROMPT_TEMPLATES:
+            return language
+        return self.language
+    
+    def _call_openai(self, prompt: str, temperature: float = 0.7, response_format: Dict[str, Any] = None, language: str = None,
+                     max_tokens: int = None, document: str = None) -> str:
         """
         OpenAI API'ye çağrı yapar (veya demo modda sahte veri döndürür)
         
         Args:
             prompt: Gönderilecek prompt
             temperature: Yaratıcılık seviyesi (0-1)
+            response_format: Structured output formatı (opsiyonel, örn. json_schema)
+            language: Sistem prompt'unun dili, None ise self.language kullanılır
+            max_tokens: Çıktı token tavanı (opsiyonel, bkz. _output_token_cap)
+            document: Verilirse talimatlardan önce ayrı mesajda gönderilen doküman (document_first yerleşimi)
             
         Returns:
             API yanıtı veya demo verisi
         """
+        language = self._resolve_language(language)
+        
         if self.demo_mode:
             # Demo mode: Gerçek API çağrısı yapmadan sahte veri döndür
-            return self._get_demo_response(prompt, self.language)
+            if response_format is not None:
+                return self._get_demo_combined_response(language)
+            return self._get_demo_response(prompt, language)
         
+        # Yanıt önbelleği: sıcaklık > 0 çağrılar sadece LLM_CACHE_SAMPLED_RESPONSES ile önbelleğe alınır
+        cache = None
+        cache_key = None
+        if temperature == 0 or Config.LLM_CACHE_SAMPLED_RESPONSES:
+            cache = get_llm_cache()
+        if cache is not None:
+            cache_key = build_cache_key(self.model, PROMPT_TEMPLATES[language]['system'], prompt, temperature,
+                                        PROMPT_VERSION, response_format=response_format, max_tokens=max_tokens,
+                                        document=document)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        request_kwargs = {}
+        if response_format is not None:
+            request_kwargs['response_format'] = response_format
+        if max_tokens:
+            request_kwargs['max_tokens'] = max_tokens
+        
+        # document_first: sistem + doküman mesajları aynı doküman için yapılan tüm çağrılarda birebir aynı önektir
+        messages = [{"role": "system", "content": PROMPT_TEMPLATES[language]['system']}]
+        if document is not None:
+            messages.append({"role": "user", "content": PROMPT_TEMPLATES[language]['document_block'].format(text=document)})
+        messages.append({"role": "user", "content": prompt})
+        
+        # Küme geneli hız sınırı: her deneme (yeniden deneme ve yedek istek dahil) kapasite alır
+        limiter = get_rate_limiter()
+        prompt_tokens = sum(len(message['content']) for message in messages) // 4
+        priority = _call_priority.get()
+        
+        def reserve(estimated_tokens: int):
+            if limiter is not None:
+                limiter.acquire(estimated_tokens, priority)
+        
+        def request(kwargs: Dict[str, Any], estimated_tokens: int):
+            started = time.perf_counter()
+            try:
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    timeout=Config.AI_CALL_TIMEOUT,
+                    **kwargs
+                )
+            except Exception:
+                # Başarısız deneme token harcamaz: tahmin kovaya iade edilir (yeniden denemeler kovayı tüketmesin)
+                if limiter is not None:
+                    limiter.settle(estimated_tokens, 0)
+                raise
+            self._record_usage('instructions_first' if document is None else 'document_first',
+                               response, time.perf_counter() - started)
+            if limiter is not None:
+                limiter.settle(estimated_tokens, getattr(getattr(response, 'usage', None), 'total_tokens', None))
+            return response
+        
+        # Geçici hatalar (429, 5xx, zaman aşımı, bağlantı) yeniden denenir; kalıcı hatalar ve
+        # tükenen denemeler LLMCallError ('OpenAI API hatası: ...') olarak yükseltilir. Kapasite
+        # deneme dışında alınır: kova beklemesi yedek istek (hedge_after) süresine sayılmaz
+        description = f"OpenAI çağrısı ({self.model})"
+        estimated_tokens = prompt_tokens + (max_tokens or Config.LLM_RATE_LIMIT_COMPLETION_TOKENS)
+        response = self._caller.call(lambda: request(request_kwargs, estimated_tokens), description=description,
+                                     acquire=lambda: reserve(estimated_tokens))
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.prompts['system']},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            raise Exception(f"OpenAI API hatası: {str(e)}")
+            finish_reason = response.choices[0].finish_reason
+            if max_tokens and finish_reason == 'length':
+                # Tahmin tavanı yetmedi: yarım JSON yerine bir kez tavansız (model sınırıyla) denenir;
+                # yine kesilirse ayrıştırıcılar yer tutucu içerik döndürür
+                logger.warning(f"[AI] Yanıt {max_tokens} token tavanında kesildi, tavansız yeniden deneniyor")
+                uncapped_kwargs = {key: value for key, value in request_kwargs.items() if key != 'max_tokens'}
+                response = self._caller.call(lambda: request(uncapped_kwargs, prompt_tokens + max_tokens),
+                                             description=description, acquire=lambda: reserve(prompt_tokens + max_tokens))
+                finish_reason = response.choices[0].finish_reason
+            content = response.choices[0].message.content
+        except (AttributeError, IndexError) as e:
+            raise LLMCallError(f"OpenAI API hatası: beklenmeyen yanıt ({str(e)})") from e
+        # Token tavanında kesilmiş (finish_reason='length') yanıtlar saklanmaz
+        if cache_key is not None and content and finish_reason == 'stop':
+            cache.set(cache_key, content)
+        return content
     
     def _get_demo_response(self, prompt: str, language: str = 'tr') -> str:
         """
@@ -465,6 +895,133 @@ Dokümanda ele alınan konular, öğrencilerin konuyu anlaması için gerekli te
             else:  # tr
                 return "Bu demo modu için hazırlanmış sahte içeriktir. Gerçek AI üretimi için OpenAI API anahtarı gereklidir."
     
+    def _get_demo_combined_response(self, language: str = 'tr') -> str:
+        """
+        Demo modu için tek çağrı (single) modunun JSON yanıtını üretir
+        
+        Args:
+            language: Dil kodu ('tr' veya 'en')
+            
+        Returns:
+            COMBINED_RESPONSE_SCHEMA yapısında JSON metni
+        """
+        # _get_demo_response içerik türünü prompt'taki anahtar kelimelerden seçer
+        probes = {
+            'summary': 'summary',
+            'multiple_choice': 'multiple choice',
+            'short_answer': 'short answer',
+            'fill_blank': 'fill in the blank',
+            'true_false': 'true false',
+            'flashcards': 'flashcard'
+        }
+        combined = {}
+        for key, probe in probes.items():
+            demo_response = self._get_demo_response(probe, language)
+            combined[key] = demo_response if key == 'summary' else json.loads(demo_response)
+        return json.dumps(combined, ensure_ascii=False)
+    
+    def _parse_json_response(self, response: str) -> Any:
+        """
+        Model yanıtındaki ```json bloklarını temizleyip JSON olarak parse eder
+        
+        Args:
+            response: Ham model yanıtı
+            
+        Returns:
+            Parse edilmiş JSON verisi
+            
+        Raises:
+            json.JSONDecodeError: Yanıt geçerli JSON değilse
+        """
+        response_clean = response.strip()
+        if response_clean.startswith('```json'):
+            response_clean = response_clean[7:]
+        if response_clean.startswith('```'):
+            response_clean = response_clean[3:]
+        if response_clean.endswith('```'):
+            response_clean = response_clean[:-3]
+        
+        return json.loads(response_clean.strip())
+    
+    def _format_difficulty_distribution(self, count: int, level_config: Dict[str, Any], language: str) -> str:
+        """
+        Seviyenin zorluk yüzdelerini prompt'a eklenecek soru adetlerine çevirir
+        
+        Args:
+            count: Toplam soru sayısı
+            level_config: Config.LEVEL_SETTINGS içindeki seviye ayarları
+            language: Dil kodu ('tr' veya 'en')
+            
+        Returns:
+            Madde işaretli zorluk dağılımı metni
+        """
+        difficulty_dist = level_config['difficulty']
+        
+        # Zorluk dağılımını hesapla
+        simple_count = int(count * difficulty_dist['simple'] / 100)
+        medium_count = int(count * difficulty_dist['medium'] / 100)
+        advanced_count = int(count * difficulty_dist['advanced'] / 100)
+        academic_count = count - simple_count - medium_count - advanced_count
+        
+        if language == 'en':
+            difficulty_dist_text = f"- {simple_count} SIMPLE questions (basic concepts, definitions, simple relationships)\n- {medium_count} MEDIUM questions (relationships between concepts, cause-effect, comparison)\n- {advanced_count} ADVANCED questions (analysis, synthesis, deep understanding)"
+            if academic_count > 0:
+                difficulty_dist_text += f"\n- {academic_count} ACADEMIC questions (critical thinking, complex relationships)"
+        else:  # tr
+            difficulty_dist_text = f"- {simple_count} adet BASIT soru (temel kavramlar, tanımlar, basit ilişkiler)\n- {medium_count} adet ORTA soru (kavramlar arası ilişkiler, neden-sonuç, karşılaştırma)\n- {advanced_count} adet İLERİ soru (analiz, sentez, derinlemesine anlama)"
+            if academic_count > 0:
+                difficulty_dist_text += f"\n- {academic_count} adet AKADEMİK soru (eleştirel düşünme, karmaşık ilişkiler)"
+        
+        return difficulty_dist_text
+    
+    def _shuffle_multiple_choice_options(self, questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Seçenekleri karıştırır ve doğru cevap indeksini günceller (doğru cevabı farklı şıklara dağıtır)"""
+        for question in questions:
+            if 'options' in question and 'correct_answer' in question:
+                options = question['options']
+                correct_index = question['correct_answer']
+                
+                # Doğru cevabı sakla
+                correct_answer = options[correct_index]
+                
+                # Seçenekleri karıştır
+                random.shuffle(options)
+                
+                # Yeni doğru cevap indeksini bul
+                new_correct_index = options.index(correct_answer)
+                question['correct_answer'] = new_correct_index
+        
+        return questions
+    
+    def _clamp_short_answers(self, questions: List[Dict[str, Any]], max_words: int) -> List[Dict[str, Any]]:
+        """Kısa cevapları ve alternatiflerini seviyenin kelime limitine göre kırpar"""
+        def clamp_words(text: str) -> str:
+            words = text.strip().split()
+            if not words:
+                return ""
+            return " ".join(words[:max_words])
+        
+        for question in questions:
+            question['answer'] = clamp_words(question.get('answer', ''))
+            
+            accepted = question.get('accepted_answers') or []
+            cleaned = []
+            for alt in accepted:
+                clamped = clamp_words(alt)
+                if clamped and clamped.lower() != question['answer'].lower():
+                    cleaned.append(clamped)
+            question['accepted_answers'] = cleaned[:2]
+        
+        return questions
+    
+    def _shuffle_fill_blank_options(self, questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Boş doldurma seçeneklerini karıştırır (cevap metin olarak tutulduğu için indeks güncellemesi gerekmez)"""
+        for question in questions:
+            if 'options' in question and 'answer' in question:
+                random.shuffle(question['options'])
+        
+        return questions
+    
     def generate_summary(self, text: str, level: str = 'high_school', user_type: str = 'student', language: str = None) -> str:
         """
         Metinden seviyeye uygun özet üretir
@@ -478,14 +1035,9 @@ Dokümanda ele alınan konular, öğrencilerin konuyu anlaması için gerekli te
         Returns:
             Markdown formatında özet
         """
-        # Language parametresini kullan, yoksa self.language'i kullan
-        if language is None:
-            language = self.language
-        else:
-            # Language değiştiyse prompts'u güncelle
-            if language in PROMPT_TEMPLATES:
-                self.prompts = PROMPT_TEMPLATES[language]
-                self.language = language
+        # Dil parametresi örnek durumunu değiştirmez (paylaşılan generator için)
+        language = self._resolve_language(language)
+        prompts = PROMPT_TEMPLATES[language]
         
         level_config = Config.LEVEL_SETTINGS.get(level, Config.LEVEL_SETTINGS['high_school'])
         age_desc = level_config['age_range']
@@ -502,20 +1054,22 @@ Dokümanda ele alınan konular, öğrencilerin konuyu anlaması için gerekli te
             level_style = "basit ve anlaşılır" if level in ["elementary", "middle_school"] else "akademik ve detaylı"
         
         # Prompt intro'yu oluştur
-        prompt_intro = self.prompts['summary_intro'].format(
+        prompt_intro = prompts['summary_intro'].format(
             level_name=level_name,
             age_range=age_desc,
             user_type_desc=user_type_desc
         )
         
+        prompt_text, document = self._prompt_document(text, language)
+        
         # Tam prompt'u şablondan oluştur
-        prompt = self.prompts['summary_full'].format(
+        prompt = prompts['summary_full'].format(
             intro=prompt_intro,
             level_style=level_style,
-            text=text
+            text=prompt_text
         )
 
-        return self._call_openai(prompt, temperature=0.5)
+        return self._call_openai(prompt, temperature=0.5, language=language, document=document)
     
     def generate_multiple_choice(self, text: str, count: int = 5, level: str = 'high_school', user_type: str = 'student', language: str = None) -> List[Dict[str, Any]]:
         """
@@ -531,23 +1085,12 @@ Dokümanda ele alınan konular, öğrencilerin konuyu anlaması için gerekli te
         Returns:
             Soru listesi [{"question": "...", "options": [...], "correct_answer": 0, "difficulty": "simple"}]
         """
-        # Language parametresini kullan, yoksa self.language'i kullan
-        if language is None:
-            language = self.language
-        else:
-            if language in PROMPT_TEMPLATES:
-                self.prompts = PROMPT_TEMPLATES[language]
-                self.language = language
+        # Dil parametresi örnek durumunu değiştirmez (paylaşılan generator için)
+        language = self._resolve_language(language)
+        prompts = PROMPT_TEMPLATES[language]
         
         level_config = Config.LEVEL_SETTINGS.get(level, Config.LEVEL_SETTINGS['high_school'])
         level_name = level_config['name']
-        difficulty_dist = level_config['difficulty']
-        
-        # Zorluk dağılımını hesapla
-        simple_count = int(count * difficulty_dist['simple'] / 100)
-        medium_count = int(count * difficulty_dist['medium'] / 100)
-        advanced_count = int(count * difficulty_dist['advanced'] / 100)
-        academic_count = count - simple_count - medium_count - advanced_count
         
         # user_type_desc oluştur
         if language == 'en':
@@ -556,61 +1099,32 @@ Dokümanda ele alınan konular, öğrencilerin konuyu anlaması için gerekli te
             user_type_desc = "Öğrenci" if user_type == "student" else "Öğretmen (sınıf için hazırlıyor)"
         
         # Zorluk dağılımı metnini oluştur
-        if language == 'en':
-            difficulty_dist_text = f"- {simple_count} SIMPLE questions (basic concepts, definitions, simple relationships)\n- {medium_count} MEDIUM questions (relationships between concepts, cause-effect, comparison)\n- {advanced_count} ADVANCED questions (analysis, synthesis, deep understanding)"
-            if academic_count > 0:
-                difficulty_dist_text += f"\n- {academic_count} ACADEMIC questions (critical thinking, complex relationships)"
-        else:  # tr
-            difficulty_dist_text = f"- {simple_count} adet BASIT soru (temel kavramlar, tanımlar, basit ilişkiler)\n- {medium_count} adet ORTA soru (kavramlar arası ilişkiler, neden-sonuç, karşılaştırma)\n- {advanced_count} adet İLERİ soru (analiz, sentez, derinlemesine anlama)"
-            if academic_count > 0:
-                difficulty_dist_text += f"\n- {academic_count} adet AKADEMİK soru (eleştirel düşünme, karmaşık ilişkiler)"
+        difficulty_dist_text = self._format_difficulty_distribution(count, level_config, language)
         
         # Prompt intro'yu oluştur
-        prompt_intro = self.prompts['mcq_intro'].format(
+        prompt_intro = prompts['mcq_intro'].format(
             level_name=level_name,
             count=count
         )
         
+        prompt_text, document = self._prompt_document(text, language)
+        
         # Tam prompt'u şablondan oluştur
-        prompt = self.prompts['mcq_full'].format(
+        prompt = prompts['mcq_full'].format(
             intro=prompt_intro,
             level_name=level_name,
             user_type_desc=user_type_desc,
             difficulty_dist=difficulty_dist_text,
-            text=text
+            text=prompt_text
         )
 
-        response = self._call_openai(prompt, temperature=0.7)
+        response = self._call_openai(prompt, temperature=0.7, language=language,
+                                     max_tokens=self._output_token_cap({'multiple_choice': count}), document=document)
         
         try:
-            # JSON parse et
-            response_clean = response.strip()
-            if response_clean.startswith('```json'):
-                response_clean = response_clean[7:]
-            if response_clean.startswith('```'):
-                response_clean = response_clean[3:]
-            if response_clean.endswith('```'):
-                response_clean = response_clean[:-3]
-            
-            questions = json.loads(response_clean.strip())
-            
-            # Seçenekleri randomize et (doğru cevabı farklı şıklara dağıt)
-            for question in questions:
-                if 'options' in question and 'correct_answer' in question:
-                    options = question['options']
-                    correct_index = question['correct_answer']
-                    
-                    # Doğru cevabı sakla
-                    correct_answer = options[correct_index]
-                    
-                    # Seçenekleri karıştır
-                    random.shuffle(options)
-                    
-                    # Yeni doğru cevap indeksini bul
-                    new_correct_index = options.index(correct_answer)
-                    question['correct_answer'] = new_correct_index
+            questions = self._parse_json_response(response)
             
-            return questions
+            return self._shuffle_multiple_choice_options(questions)
         except json.JSONDecodeError as e:
             # JSON parse edilemezse, hata logla ve basit format döndür
             import logging
@@ -651,13 +1165,9 @@ Dokümanda ele alınan konular, öğrencilerin konuyu anlaması için gerekli te
         Returns:
             Soru listesi [{"question": "...", "answer": "...", "topic": "..."}]
         """
-        # Language parametresini kullan, yoksa self.language'i kullan
-        if language is None:
-            language = self.language
-        else:
-            if language in PROMPT_TEMPLATES:
-                self.prompts = PROMPT_TEMPLATES[language]
-                self.language = language
+        # Dil parametresi örnek durumunu değiştirmez (paylaşılan generator için)
+        language = self._resolve_language(language)
+        prompts = PROMPT_TEMPLATES[language]
         
         level_config = Config.LEVEL_SETTINGS.get(level, Config.LEVEL_SETTINGS['high_school'])
         level_name = level_config['name']
@@ -671,51 +1181,28 @@ Dokümanda ele alınan konular, öğrencilerin konuyu anlaması için gerekli te
             user_type_desc = "Öğrenci" if user_type == "student" else "Öğretmen (sınıf için hazırlıyor)"
         
         # Prompt intro'yu oluştur
-        prompt_intro = self.prompts['short_answer_intro'].format(
+        prompt_intro = prompts['short_answer_intro'].format(
             level_name=level_name,
             count=count
         )
         
+        prompt_text, document = self._prompt_document(text, language)
+        
         # Tam prompt'u şablondan oluştur
-        prompt = self.prompts['short_answer_full'].format(
+        prompt = prompts['short_answer_full'].format(
             intro=prompt_intro,
             level_name=level_name,
             user_type_desc=user_type_desc,
             max_words=max_words,
-            text=text
+            text=prompt_text
         )
 
-        response = self._call_openai(prompt, temperature=0.7)
+        response = self._call_openai(prompt, temperature=0.7, language=language,
+                                     max_tokens=self._output_token_cap({'short_answer': count}), document=document)
         
         try:
-            response_clean = response.strip()
-            if response_clean.startswith('```json'):
-                response_clean = response_clean[7:]
-            if response_clean.startswith('```'):
-                response_clean = response_clean[3:]
-            if response_clean.endswith('```'):
-                response_clean = response_clean[:-3]
-            
-            questions = json.loads(response_clean.strip())
-            
-            def clamp_words(text: str) -> str:
-                words = text.strip().split()
-                if not words:
-                    return ""
-                return " ".join(words[:max_words])
-            
-            for question in questions:
-                question['answer'] = clamp_words(question.get('answer', ''))
-                
-                accepted = question.get('accepted_answers') or []
-                cleaned = []
-                for alt in accepted:
-                    clamped = clamp_words(alt)
-                    if clamped and clamped.lower() != question['answer'].lower():
-                        cleaned.append(clamped)
-                question['accepted_answers'] = cleaned[:2]
-            
-            return questions
+            questions = self._parse_json_response(response)
+            return self._clamp_short_answers(questions, max_words)
         except json.JSONDecodeError as e:
             import logging
             logger = logging.getLogger(__name__)
@@ -751,13 +1238,9 @@ Dokümanda ele alınan konular, öğrencilerin konuyu anlaması için gerekli te
         Returns:
             Soru listesi [{"question": "... ___ ...", "answer": "cevap", "options": [...], "topic": "..."}]
         """
-        # Language parametresini kullan, yoksa self.language'i kullan
-        if language is None:
-            language = self.language
-        else:
-            if language in PROMPT_TEMPLATES:
-                self.prompts = PROMPT_TEMPLATES[language]
-                self.language = language
+        # Dil parametresi örnek durumunu değiştirmez (paylaşılan generator için)
+        language = self._resolve_language(language)
+        prompts = PROMPT_TEMPLATES[language]
         
         level_config = Config.LEVEL_SETTINGS.get(level, Config.LEVEL_SETTINGS['high_school'])
         level_name = level_config['name']
@@ -769,45 +1252,27 @@ Dokümanda ele alınan konular, öğrencilerin konuyu anlaması için gerekli te
             user_type_desc = "Öğrenci" if user_type == "student" else "Öğretmen (sınıf için hazırlıyor)"
         
         # Prompt intro'yu oluştur
-        prompt_intro = self.prompts['fill_blank_intro'].format(
+        prompt_intro = prompts['fill_blank_intro'].format(
             level_name=level_name,
             count=count
         )
         
+        prompt_text, document = self._prompt_document(text, language)
+        
         # Tam prompt'u şablondan oluştur
-        prompt = self.prompts['fill_blank_full'].format(
+        prompt = prompts['fill_blank_full'].format(
             intro=prompt_intro,
             level_name=level_name,
             user_type_desc=user_type_desc,
-            text=text
+            text=prompt_text
         )
 
-        response = self._call_openai(prompt, temperature=0.7)
+        response = self._call_openai(prompt, temperature=0.7, language=language,
+                                     max_tokens=self._output_token_cap({'fill_blank': count}), document=document)
         
         try:
-            response_clean = response.strip()
-            if response_clean.startswith('```json'):
-                response_clean = response_clean[7:]
-            if response_clean.startswith('```'):
-                response_clean = response_clean[3:]
-            if response_clean.endswith('```'):
-                response_clean = response_clean[:-3]
-            
-            questions = json.loads(response_clean.strip())
-            
-            # Boş doldurma için seçenekleri randomize et
-            for question in questions:
-                if 'options' in question and 'answer' in question:
-                    options = question['options']
-                    correct_answer = question['answer']
-                    
-                    # Seçenekleri karıştır
-                    random.shuffle(options)
-                    
-                    # Doğru cevabın yeni pozisyonunu güncelle
-                    question['answer'] = correct_answer  # answer alanını koru
-            
-            return questions
+            questions = self._parse_json_response(response)
+            return self._shuffle_fill_blank_options(questions)
         except json.JSONDecodeError as e:
             import logging
             logger = logging.getLogger(__name__)
@@ -843,13 +1308,9 @@ Dokümanda ele alınan konular, öğrencilerin konuyu anlaması için gerekli te
         Returns:
             Soru listesi [{"statement": "...", "is_true": true/false, "explanation": "...", "topic": "..."}]
         """
-        # Language parametresini kullan, yoksa self.language'i kullan
-        if language is None:
-            language = self.language
-        else:
-            if language in PROMPT_TEMPLATES:
-                self.prompts = PROMPT_TEMPLATES[language]
-                self.language = language
+        # Dil parametresi örnek durumunu değiştirmez (paylaşılan generator için)
+        language = self._resolve_language(language)
+        prompts = PROMPT_TEMPLATES[language]
         
         level_config = Config.LEVEL_SETTINGS.get(level, Config.LEVEL_SETTINGS['high_school'])
         level_name = level_config['name']
@@ -861,31 +1322,26 @@ Dokümanda ele alınan konular, öğrencilerin konuyu anlaması için gerekli te
             user_type_desc = "Öğrenci" if user_type == "student" else "Öğretmen (sınıf için hazırlıyor)"
         
         # Prompt intro'yu oluştur
-        prompt_intro = self.prompts['true_false_intro'].format(
+        prompt_intro = prompts['true_false_intro'].format(
             level_name=level_name,
             count=count
         )
         
+        prompt_text, document = self._prompt_document(text, language)
+        
         # Tam prompt'u şablondan oluştur
-        prompt = self.prompts['true_false_full'].format(
+        prompt = prompts['true_false_full'].format(
             intro=prompt_intro,
             level_name=level_name,
             user_type_desc=user_type_desc,
-            text=text
+            text=prompt_text
         )
 
-        response = self._call_openai(prompt, temperature=0.7)
+        response = self._call_openai(prompt, temperature=0.7, language=language,
+                                     max_tokens=self._output_token_cap({'true_false': count}), document=document)
         
         try:
-            response_clean = response.strip()
-            if response_clean.startswith('```json'):
-                response_clean = response_clean[7:]
-            if response_clean.startswith('```'):
-                response_clean = response_clean[3:]
-            if response_clean.endswith('```'):
-                response_clean = response_clean[:-3]
-            
-            questions = json.loads(response_clean.strip())
+            questions = self._parse_json_response(response)
             return questions
         except json.JSONDecodeError as e:
             import logging
@@ -922,42 +1378,33 @@ Dokümanda ele alınan konular, öğrencilerin konuyu anlaması için gerekli te
         Returns:
             Flashcard listesi [{"front": "soru", "back": "cevap", "topic": "konu"}]
         """
-        # Language parametresini kullan, yoksa self.language'i kullan
-        if language is None:
-            language = self.language
-        else:
-            if language in PROMPT_TEMPLATES:
-                self.prompts = PROMPT_TEMPLATES[language]
-                self.language = language
+        # Dil parametresi örnek durumunu değiştirmez (paylaşılan generator için)
+        language = self._resolve_language(language)
+        prompts = PROMPT_TEMPLATES[language]
         
         level_config = Config.LEVEL_SETTINGS.get(level, Config.LEVEL_SETTINGS['high_school'])
         level_name = level_config['name']
         
         # Prompt intro'yu oluştur
-        prompt_intro = self.prompts['flashcard_intro'].format(
+        prompt_intro = prompts['flashcard_intro'].format(
             level_name=level_name,
             count=count
         )
         
+        prompt_text, document = self._prompt_document(text, language)
+        
         # Tam prompt'u şablondan oluştur
-        prompt = self.prompts['flashcard_full'].format(
+        prompt = prompts['flashcard_full'].format(
             intro=prompt_intro,
             level_name=level_name,
-            text=text
+            text=prompt_text
         )
 
-        response = self._call_openai(prompt, temperature=0.6)
+        response = self._call_openai(prompt, temperature=0.6, language=language,
+                                     max_tokens=self._output_token_cap({'flashcards': count}), document=document)
         
         try:
-            response_clean = response.strip()
-            if response_clean.startswith('```json'):
-                response_clean = response_clean[7:]
-            if response_clean.startswith('```'):
-                response_clean = response_clean[3:]
-            if response_clean.endswith('```'):
-                response_clean = response_clean[:-3]
-            
-            flashcards = json.loads(response_clean.strip())
+            flashcards = self._parse_json_response(response)
             return flashcards
         except json.JSONDecodeError as e:
             import logging
@@ -978,7 +1425,139 @@ Dokümanda ele alınan konular, öğrencilerin konuyu anlaması için gerekli te
                     "topic": "Hata"
                 }]
     
-    def generate_all_content(self, text: str, level: str = 'high_school', user_type: str = 'student', user_plan: str = 'free', language: str = None) -> Dict[str, Any]:
+    def _output_token_cap(self, counts: Dict[str, int], flashcards: int = 0, summary: bool = False) -> Optional[int]:
+        """
+        İstenen öğe sayılarına göre çıktı token tavanı (Config.AI_OUTPUT_TOKEN_CAPS kapalıysa None)
+        
+        Tahmine OUTPUT_TOKENS_SAFETY_MARGIN payı eklenir; sonuç modelin çıktı sınırını aşamaz
+        (aşan max_tokens isteği API tarafından reddedilir).
+        
+        Args:
+            counts: İçerik türü -> öğe sayısı
+            flashcards: Flashcard sayısı (tek çağrı modu için)
+            summary: Özet payı eklensin mi
+            
+        Returns:
+            Token sayısı veya None
+        """
+        if not Config.AI_OUTPUT_TOKEN_CAPS:
+            return None
+        counts = dict(counts)
+        if flashcards:
+            counts['flashcards'] = flashcards
+        tokens = sum(OUTPUT_TOKENS_PER_ITEM[key] * count for key, count in counts.items())
+        tokens += OUTPUT_TOKENS_OVERHEAD + (OUTPUT_TOKENS_SUMMARY if summary else 0)
+        return min(math.ceil(tokens * OUTPUT_TOKENS_SAFETY_MARGIN), self._model_output_limit())
+    
+    def _model_output_limit(self) -> int:
+        """
+        Modelin tek yanıtta üretebileceği en fazla token (Config.AI_MAX_OUTPUT_TOKENS verilmişse o)
+        """
+        if Config.AI_MAX_OUTPUT_TOKENS:
+            return Config.AI_MAX_OUTPUT_TOKENS
+        prefixes = [prefix for prefix in MODEL_OUTPUT_TOKEN_LIMITS if self.model.startswith(prefix)]
+        if not prefixes:
+            return DEFAULT_OUTPUT_TOKEN_LIMIT
+        return MODEL_OUTPUT_TOKEN_LIMITS[max(prefixes, key=len)]
+    
+    def resolve_generation_mode(self, text: str, user_plan: str = 'free', mode: str = None) -> str:
+        """
+        Kullanılacak üretim modunu belirler ('fanout' veya 'single')
+        
+        Öncelik sırası: mode parametresi > planın 'generation_mode' özelliği > Config.AI_GENERATION_MODE
+        
+        Args:
+            text: İçerik üretilecek metin
+            user_plan: Kullanıcı planı (free, standard, premium)
+            mode: Açıkça istenen mod (opsiyonel)
+            
+        Returns:
+            'fanout' veya 'single'
+        """
+        mode = mode or Config.get_plan_limit(user_plan, 'generation_mode') or Config.AI_GENERATION_MODE
+        
+        if mode == 'auto':
+            return 'single' if len(text) <= Config.AI_SINGLE_CALL_MAX_CHARS else 'fanout'
+        
+        return mode if mode in GENERATION_MODES else 'fanout'
+    
+    def _generate_all_single(self, text: str, question_count: int, flashcard_count: int, level: str, user_type: str, language: str) -> Dict[str, Any]:
+        """
+        Tüm içerikleri tek bir structured-output çağrısı ile üretir
+        
+        Args:
+            text: İçerik üretilecek metin
+            question_count: Her soru türü için soru sayısı
+            flashcard_count: Flashcard sayısı
+            level: Kullanıcı seviyesi
+            user_type: Kullanıcı tipi
+            language: Dil kodu ('tr' veya 'en')
+            
+        Returns:
+            generate_all_content ile aynı yapıda dict, yanıt işlenemezse None
+        """
+        prompts = PROMPT_TEMPLATES[language]
+        level_config = Config.LEVEL_SETTINGS.get(level, Config.LEVEL_SETTINGS['high_school'])
+        level_name = level_config['name']
+        max_words = level_config.get('short_answer', {'max_words': 4}).get('max_words', 4)
+        
+        if language == 'en':
+            user_type_desc = "students" if user_type == "student" else "the teacher's class"
+            level_style = "simple and clear" if level in ["elementary", "middle_school"] else "academic and detailed"
+        else:  # tr
+            user_type_desc = "öğrenciler" if user_type == "student" else "öğretmenin sınıfı"
+            level_style = "basit ve anlaşılır" if level in ["elementary", "middle_school"] else "akademik ve detaylı"
+        
+        prompt_intro = prompts['combined_intro'].format(
+            level_name=level_name,
+            age_range=level_config['age_range'],
+            user_type_desc=user_type_desc
+        )
+        
+        prompt_text, document = self._prompt_document(text, language)
+        
+        prompt = prompts['combined_full'].format(
+            intro=prompt_intro,
+            level_name=level_name,
+            user_type_desc=user_type_desc,
+            level_style=level_style,
+            mcq_count=question_count,
+            short_answer_count=question_count,
+            fill_blank_count=question_count,
+            true_false_count=question_count,
+            flashcard_count=flashcard_count,
+            max_words=max_words,
+            difficulty_dist=self._format_difficulty_distribution(question_count, level_config, language),
+            text=prompt_text
+        )
+        
+        response = self._call_openai(
+            prompt,
+            temperature=0.7,
+            response_format={"type": "json_schema", "json_schema": COMBINED_RESPONSE_SCHEMA},
+            language=language,
+            max_tokens=self._output_token_cap(
+                {key: question_count for key in RESULT_KEYS[1:5]}, flashcards=flashcard_count, summary=True
+            ),
+            document=document
+        )
+        
+        try:
+            data = self._parse_json_response(response)
+            return {
+                "summary": data['summary'],
+                "multiple_choice": self._shuffle_multiple_choice_options(data['multiple_choice']),
+                "short_answer": self._clamp_short_answers(data['short_answer'], max_words),
+                "fill_blank": self._shuffle_fill_blank_options(data['fill_blank']),
+                "true_false": data['true_false'],
+                "flashcards": data['flashcards']
+            }
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            logger.error(f"JSON parse error in generate_all_single: {str(e)}")
+            logger.error(f"Raw response (first 500 chars): {response[:500]}")
+            return None
+    
+    def generate_all_content(self, text: str, level: str = 'high_school', user_type: str = 'student', user_plan: str = 'free', language: str = None, mode: str = None) -> Dict[str, Any]:
         """
         Tüm içerikleri seviyeye göre tek seferde üretir
         
@@ -986,31 +1565,227 @@ Dokümanda ele alınan konular, öğrencilerin konuyu anlaması için gerekli te
             text: İçerik üretilecek metin
             level: Kullanıcı seviyesi (elementary, middle_school, high_school, university, exam_prep)
             user_type: Kullanıcı tipi (student, teacher)
-            user_plan: Kullanıcı planı (free, standard, premium) - Not: Soru limitleri app.py'de uygulanır
+            user_plan: Kullanıcı planı (free, standard, premium); soru sayısı planın limitine göre üretilir
             language: Dil kodu ('tr' veya 'en'), None ise self.language kullanılır
+            mode: Üretim modu ('fanout', 'single', 'auto'), None ise plan/config ayarı kullanılır
             
         Returns:
             Tüm içerikleri içeren dict
         """
-        # Language parametresini kullan, yoksa self.language'i kullan
-        if language is None:
-            language = self.language
+        # Dil parametresi örnek durumunu değiştirmez (paylaşılan generator için)
+        language = self._resolve_language(language)
+        
+        # Seviye ayarları ve plan limitine göre sayılar
+        question_count, flashcard_count = resolve_generation_counts(level, user_plan)
+        
+        generation_mode = self.resolve_generation_mode(text, user_plan, mode)
+        logger.info(f"[AI] Üretim modu: {generation_mode} (plan={user_plan}, karakter={len(text)})")
+        
+        priority = _call_priority.set(Config.get_plan_limit(user_plan, 'llm_priority') or DEFAULT_PRIORITY)
+        try:
+            return self._generate_for_counts(text, question_count, flashcard_count, level, user_type, language, generation_mode)
+        finally:
+            _call_priority.reset(priority)
+    
+    def generate_all_content_chunked(self, text: str, level: str = 'high_school', user_type: str = 'student', user_plan: str = 'free', language: str = None, mode: str = None) -> Dict[str, Any]:
+        """
+        Uzun metinler için map-reduce üretim: metni token sınırlı bölümlere ayırır,
+        her bölüm için kısmi içerikleri paralel üretir ve sonuçları birleştirir
+        
+        Soru ve flashcard sayıları bölümlere uzunlukları oranında dağıtılır, böylece toplam
+        sayılar Config.LEVEL_SETTINGS (ve plan limiti) ile aynı kalır ve her bölüm temsil edilir.
+        Özet, bölüm özetlerinin tek bir çağrıda yeniden özetlenmesiyle oluşturulur.
+        
+        Args:
+            text: İçerik üretilecek (kısaltılmamış) metin
+            level: Kullanıcı seviyesi
+            user_type: Kullanıcı tipi
+            user_plan: Kullanıcı planı
+            language: Dil kodu ('tr' veya 'en'), None ise self.language kullanılır
+            mode: Bölüm bazında üretim modu ('fanout', 'single', 'auto')
+            
+        Returns:
+            generate_all_content ile aynı yapıda dict
+        """
+        # Dil parametresi örnek durumunu değiştirmez (paylaşılan generator için)
+        language = self._resolve_language(language)
+        
+        chunk_tokens = Config.AI_CHUNK_MAX_TOKENS
+        chunks = DocumentReader.split_text_into_chunks(text, max_tokens=chunk_tokens)
+        while len(chunks) > Config.AI_MAX_CHUNKS:
+            # Bölüm sayısı sınırını aşmamak için bölüm boyutunu büyüt
+            chunk_tokens = max(int(chunk_tokens * 1.25) + 1, math.ceil(len(text) / 4 / Config.AI_MAX_CHUNKS))
+            chunks = DocumentReader.split_text_into_chunks(text, max_tokens=chunk_tokens)
+        
+        if len(chunks) <= 1:
+            return self.generate_all_content(text, level, user_type, user_plan, language, mode)
+        
+        question_count, flashcard_count = resolve_generation_counts(level, user_plan)
+        
+        weights = [len(chunk) for chunk in chunks]
+        question_counts = _distribute_count(question_count, weights)
+        flashcard_counts = _distribute_count(flashcard_count, weights)
+        logger.info(f"[AI] Bölümlü üretim: {len(chunks)} bölüm, karakter={len(text)}")
+        
+        # Map: her bölüm için kısmi sonuçlar (çağrılar planın hız sınırı önceliğiyle yapılır)
+        priority = _call_priority.set(Config.get_plan_limit(user_plan, 'llm_priority') or DEFAULT_PRIORITY)
+        tasks = {}
+        for index, chunk in enumerate(chunks):
+            tasks[f"chunk_{index + 1}"] = (
+                lambda chunk=chunk, q=question_counts[index], f=flashcard_counts[index]:
+                    self._generate_for_counts(chunk, q, f, level, user_type, language,
+                                              self.resolve_generation_mode(chunk, user_plan, mode))
+            )
+        
+        # Bölüm içindeki çağrılar da dalgalar halinde çalışabilir
+        inner_waves = math.ceil(len(RESULT_KEYS) / max(1, min(Config.AI_MAX_CONCURRENCY, len(RESULT_KEYS))))
+        task_timeout = Config.AI_CALL_DEADLINE * inner_waves if Config.AI_CALL_DEADLINE else None
+        try:
+            partials = list(self._run_concurrently(tasks, max_workers=Config.AI_CHUNK_CONCURRENCY, task_timeout=task_timeout).values())
+        
+            # Reduce: bölüm özetlerinden tek özet, sorular bölümler arasında dengeli
+            chunk_summaries = "\n\n".join(partial['summary'] for partial in partials if partial.get('summary'))
+            merged = {"summary": self.generate_summary(chunk_summaries, level, user_type, language)}
+        finally:
+            _call_priority.reset(priority)
+        for key in RESULT_KEYS[1:]:
+            target = flashcard_count if key == 'flashcards' else question_count
+            merged[key] = _merge_balanced([partial.get(key) or [] for partial in partials], target)
+        
+        return merged
+    
+    def _generate_for_counts(self, text: str, question_count: int, flashcard_count: int, level: str, user_type: str, language: str, generation_mode: str) -> Dict[str, Any]:
+        """
+        Verilen soru/flashcard sayıları ile tüm içerikleri üretir (generate_all_content çekirdeği)
+        
+        Args:
+            text: İçerik üretilecek metin
+            question_count: Her soru türü için soru sayısı (0 ise o türler için çağrı yapılmaz)
+            flashcard_count: Flashcard sayısı (0 ise çağrı yapılmaz)
+            level: Kullanıcı seviyesi
+            user_type: Kullanıcı tipi
+            language: Dil kodu ('tr' veya 'en')
+            generation_mode: 'fanout' veya 'single'
+            
+        Returns:
+            RESULT_KEYS anahtarlarına sahip dict
+        """
+        if generation_mode == 'single':
+            results = self._generate_all_single(text, question_count, flashcard_count, level, user_type, language)
+            if results is not None:
+                return results
+            # Tek çağrı yanıtı işlenemediyse içerik türü bazlı çağrılarla devam et
+            logger.warning("[AI] Tek çağrı yanıtı işlenemedi, fanout moduna geçiliyor")
+        
+        # Çağrılar birbirinden bağımsız: aynı metin, farklı prompt
+        tasks = {"summary": lambda: self.generate_summary(text, level, user_type, language)}
+        if question_count > 0:
+            tasks.update({
+                "multiple_choice": lambda: self.generate_multiple_choice(text, question_count, level, user_type, language),
+                "short_answer": lambda: self.generate_short_answer(text, question_count, level, user_type, language),
+                "fill_blank": lambda: self.generate_fill_blank(text, question_count, level, user_type, language),
+                "true_false": lambda: self.generate_true_false(text, question_count, level, user_type, language)
+            })
+        if flashcard_count > 0:
+            tasks["flashcards"] = lambda: self.generate_flashcards(text, flashcard_count, level, user_type, language)
+        
+        if Config.AI_CONCURRENT_GENERATION:
+            results = self._run_concurrently(tasks)
         else:
-            if language in PROMPT_TEMPLATES:
-                self.prompts = PROMPT_TEMPLATES[language]
-                self.language = language
+            results = {name: task() for name, task in tasks.items()}
         
-        # Seviye ayarlarini al
-        level_config = Config.LEVEL_SETTINGS.get(level, Config.LEVEL_SETTINGS['high_school'])
-        question_count = level_config['questions_per_type']
-        flashcard_count = question_count * 2  # Flashcard sayisi daha fazla
+        return {key: results.get(key, []) for key in RESULT_KEYS}
+    
+    def _run_concurrently(self, tasks: Dict[str, Callable[[], Any]], max_workers: int = None, task_timeout: float = None) -> Dict[str, Any]:
+        """
+        Bağımsız üretim görevlerini eşzamanlı çalıştırır ve sonuçları birleştirir
         
-        return {
-            "summary": self.generate_summary(text, level, user_type, language),
-            "multiple_choice": self.generate_multiple_choice(text, question_count, level, user_type, language),
-            "short_answer": self.generate_short_answer(text, question_count, level, user_type, language),
-            "fill_blank": self.generate_fill_blank(text, question_count, level, user_type, language),
-            "true_false": self.generate_true_false(text, question_count, level, user_type, language),
-            "flashcards": self.generate_flashcards(text, flashcard_count, level, user_type, language)
-        }
+        Gunicorn gevent worker'ında thread'ler monkey-patch ile greenlet'e dönüştüğü için
+        havuz event loop'u bloklamaz; diğer ortamlarda normal thread havuzu olarak çalışır.
+        
+        Args:
+            tasks: {sonuç_anahtarı: parametresiz çağrılabilir} sözlüğü
+            max_workers: Eşzamanlı görev sınırı (None ise Config.AI_MAX_CONCURRENCY)
+            task_timeout: Tek görev için süre (None ise Config.AI_CALL_DEADLINE, yeniden denemeler dahil)
+            
+        Returns:
+            tasks ile aynı anahtar sırasına sahip sonuç sözlüğü
+            
+        Raises:
+            Exception: Görevlerden biri hata verirse (ilk hata) veya süre aşılırsa
+        """
+        max_workers = max(1, min(max_workers or Config.AI_MAX_CONCURRENCY, len(tasks)))
+        task_timeout = task_timeout or Config.AI_CALL_DEADLINE
+        
+        # Concurrency limiti görev sayısından küçükse görevler dalgalar halinde çalışır;
+        # her çağrının kendi timeout'u var, toplam bekleme süresi dalga sayısına göre hesaplanır
+        deadline = None
+        if task_timeout:
+            waves = math.ceil(len(tasks) / max_workers)
+            deadline = task_timeout * waves
+        
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ai-generator')
+        try:
+            # Her görev çağıranın context'inin kopyasında çalışır (hız sınırı önceliği görevlere geçer)
+            futures = {executor.submit(contextvars.copy_context().run, task): name for name, task in tasks.items()}
+            done, not_done = wait(futures, timeout=deadline, return_when=FIRST_EXCEPTION)
+            
+            for future in done:
+                error = future.exception()
+                if error is not None:
+                    raise error
+            
+            if not_done:
+                pending = ", ".join(sorted(futures[f] for f in not_done))
+                raise Exception(f"OpenAI API zaman aşımı: {pending}")
+            
+            results = {futures[f]: f.result() for f in done}
+            return {name: results[name] for name in tasks}
+        finally:
+            # Hata/zaman aşımında bekleyen görevleri iptal et, çalışanları bekleme
+            executor.shutdown(wait=False, cancel_futures=True)
+
 
+# İşlem başına paylaşılan generator (istekler arasında bağlantı havuzunu yeniden kullanır)
+_shared_generator = None
+_shared_generator_lock = threading.Lock()
+
+
+def get_shared_generator() -> AIGenerator:
+    """
+    İşlem genelinde paylaşılan AIGenerator örneğini döndürür
+    
+    Generator dil bilgisi tutmadığından (dil her çağrıda parametre olarak verilir)
+    tüm istekler ve thread'ler tarafından güvenle paylaşılabilir. API anahtarı,
+    model veya demo modu değişirse örnek yeniden oluşturulur.
+    
+    Returns:
+        AIGenerator: Paylaşılan örnek
+    """
+    global _shared_generator
+    
+    key = (Config.OPENAI_API_KEY, Config.OPENAI_MODEL, Config.DEMO_MODE)
+    generator = _shared_generator
+    if generator is not None and (generator.api_key, generator.model, generator.demo_mode) == key:
+        return generator
+    
+    with _shared_generator_lock:
+        generator = _shared_generator
+        if generator is None or (generator.api_key, generator.model, generator.demo_mode) != key:
+            generator = AIGenerator()
+            _shared_generator = generator
+        return generator
+
+
+def warm_shared_generator() -> bool:
+    """
+    Paylaşılan generator'ı oluşturur ve bağlantı havuzunu ısıtır (worker başlangıcında)
+    
+    Returns:
+        bool: Isınma başarılıysa True
+    """
+    try:
+        return get_shared_generator().warm_up()
+    except Exception as e:
+        logger.warning(f"[AI] Paylaşılan generator başlatılamadı: {str(e)}")
+        return False
@@ -0,0 +1,440 @@
+"""
+Metin Çıkarma İşlem Havuzu
+pypdf / python-docx / python-pptx ayrıştırmasını ayrı işlemlerde, CPU süresi ve bellek sınırıyla çalıştırır
+"""
+
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, CancelledError, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional, Tuple
+
+from services.document_reader import DocumentLimitError, DocumentReader
+
+try:
+    import resource
+    RESOURCE_LIMITS_AVAILABLE = True
+except ImportError:  # Windows: kaynak sınırları uygulanamaz
+    resource = None
+    RESOURCE_LIMITS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CPU_LIMIT_ERROR = "Dosya işleme süresi sınırı aşıldı. Daha küçük bir dosya deneyin."
+MEMORY_LIMIT_ERROR = "Dosya işlenirken bellek sınırı aşıldı. Daha küçük bir dosya deneyin."
+TIMEOUT_ERROR = "Dosya işleme zaman aşımına uğradı. Lütfen daha sonra tekrar deneyin."
+CANCELLED_ERROR = "Dosya işleme iptal edildi."
+WORKER_CRASH_ERROR = "Dosya işlenirken beklenmeyen bir hata oluştu. Lütfen tekrar deneyin."
+
+
+class _CpuTimeExceeded(BaseException):
+    """
+    SIGXCPU ile fırlatılır
+    
+    BaseException'dan türer; böylece DocumentReader'daki 'except Exception' blokları
+    tarafından yutulmaz ve işlem havuzu worker'ında yakalanabilir.
+    """
+
+
+def _on_cpu_limit(signum, frame):
+    """SIGXCPU işleyicisi (RLIMIT_CPU yumuşak sınırı aşıldı)"""
+    raise _CpuTimeExceeded()
+
+
+def _init_worker(memory_limit_mb: int) -> None:
+    """Havuz işlemi başlatıcı: bellek sınırını ve CPU sınırı sinyal işleyicisini kurar"""
+    if not RESOURCE_LIMITS_AVAILABLE:
+        return
+    signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    if memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _set_cpu_budget(seconds: Optional[int]) -> None:
+    """
+    Bu işlemin CPU sınırını 'şu ana kadar kullanılan + seconds' olarak ayarlar
+    
+    RLIMIT_CPU işlem ömrü boyunca birikimli sayıldığı için her iş başında yeniden ayarlanır.
+    seconds None ise sınır kaldırılır.
+    """
+    if not RESOURCE_LIMITS_AVAILABLE:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if seconds:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft = int(usage.ru_utime + usage.ru_stime) + 1 + int(seconds)
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+    else:
+        soft = hard
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _run_limited(func, args: tuple, cpu_time_limit: Optional[int]) -> Dict[str, Any]:
+    """
+    Havuz işleminde çalışır: fonksiyonu CPU sınırıyla çağırır ve sonucu/sınır ihlalini döndürür
+    
+    Returns:
+        dict: value, limit ('cpu' / 'memory' / None), elapsed (saniye)
+    """
+    started = time.perf_counter()
+    limit = None
+    value = None
+    _set_cpu_budget(cpu_time_limit)
+    try:
+        value = func(*args)
+    except _CpuTimeExceeded:
+        limit = 'cpu'
+    except MemoryError:
+        limit = 'memory'
+    finally:
+        _set_cpu_budget(None)
+    return {'value': value, 'limit': limit, 'elapsed': time.perf_counter() - started}
+
+
+def _count_pdf_pages(path: str) -> Tuple[int, Optional[str]]:
+    """Havuz işleminde çalışır: PDF sayfa sayısını döndürür"""
+    try:
+        pages = DocumentReader.count_pdf_pages(path)
+        DocumentReader.check_page_count(pages)
+        return pages, None
+    except DocumentLimitError as e:
+        return 0, str(e)
+    except Exception as e:
+        return 0, f"Dosya okuma hatası: {str(e)}"
+
+
+def _extract_pdf_range(path: str, start: int, end: int) -> Tuple[List[str], Optional[str]]:
+    """Havuz işleminde çalışır: PDF'in [start, end) sayfa aralığının metnini döndürür"""
+    try:
+        return DocumentReader.extract_pdf_page_range(path, start, end), None
+    except Exception as e:
+        return [], f"Dosya okuma hatası: {str(e)}"
+
+
+def _extract_file(path: str, file_extension: str, max_tokens: Optional[int] = None) -> Tuple[str, Optional[str], Dict[str, Any]]:
+    """Havuz işleminde çalışır: dosyayı açar ve DocumentReader ile metin çıkarır (çıkarma bilgisiyle)"""
+    info = {}
+    try:
+        with open(path, 'rb') as f:
+            text, error = DocumentReader.extract_text_from_file(f, file_extension, max_tokens=max_tokens, info=info)
+        return text, error, info
+    except OSError as e:
+        return "", f"Dosya okuma hatası: {str(e)}", info
+
+
+class ExtractionPool:
+    """
+    Sınırlı boyutlu metin çıkarma işlem havuzu
+    
+    Ayrıştırma CPU yoğun olduğu için gevent worker'ında çalıştırıldığında o işlemdeki tüm
+    greenlet'leri (girişler, sayfa yüklemeleri) bekletir. Havuz işi ayrı işlemlere taşır;
+    çağıran sadece sonucu bekler. Her iş için CPU süresi (RLIMIT_CPU) ve bellek (RLIMIT_AS)
+    sınırı uygulanır, çağıran tarafta da duvar saati zaman aşımı vardır. Havuz ilk kullanımda
+    oluşturulur (gunicorn fork'u sonrası her worker kendi havuzunu açar).
+    """
+    
+    def __init__(self, max_workers: int = 2, cpu_time_limit: int = 60, memory_limit_mb: int = 1024,
+                 timeout: float = 120.0, start_method: str = 'spawn', parallel_min_bytes: int = 0,
+                 pages_per_task: int = 16):
+        """
+        ExtractionPool başlatıcı
+        
+        Args:
+            max_workers: Eşzamanlı ayrıştırma işlemi sayısı (fazlası kuyrukta bekler)
+            cpu_time_limit: İş başına CPU süresi sınırı (saniye, 0 = sınırsız)
+            memory_limit_mb: Havuz işlemi başına adres alanı sınırı (MB, 0 = sınırsız)
+            timeout: Çağıranın sonucu bekleme süresi; kuyruk bekleme süresi dahil (saniye)
+            start_method: multiprocessing başlatma yöntemi ('spawn', 'forkserver', 'fork')
+            parallel_min_bytes: Bu boyut ve üstündeki PDF'ler sayfa aralıklarıyla paralel okunur (0 = kapalı)
+            pages_per_task: Paralel çıkarmada havuz işine düşen sayfa sayısı
+        """
+        self.max_workers = max(1, max_workers)
+        self.cpu_time_limit = cpu_time_limit
+        self.memory_limit_mb = memory_limit_mb
+        self.timeout = timeout
+        self.start_method = start_method
+        self.parallel_min_bytes = parallel_min_bytes
+        self.pages_per_task = max(1, pages_per_task)
+        
+        self._executor = None
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Any] = {}
+        self._stats = {
+            'submitted': 0, 'completed': 0, 'reader_errors': 0, 'cancelled': 0, 'timeouts': 0,
+            'cpu_limit_exceeded': 0, 'memory_limit_exceeded': 0, 'worker_crashes': 0, 'parallel_extractions': 0,
+            'total_latency_ms': 0.0, 'max_latency_ms': 0.0, 'total_extract_ms': 0.0
+        }
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                    initargs=(self.memory_limit_mb,)
+                )
+            return self._executor
+    
+    def _reset_executor(self, executor: ProcessPoolExecutor) -> None:
+        """Çöken (BrokenProcessPool) havuzu bırakır; sonraki iş yeni havuz açar"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+    
+    def _submit(self, func, args: tuple, key: Optional[str]):
+        """İşi havuza gönderir ve takibe alır; (future, anahtar, gönderim zamanı) döner"""
+        executor = self._get_executor()
+        future = executor.submit(_run_limited, func, args, self.cpu_time_limit)
+        key = key if key is not None else f'anonymous:{id(future)}'
+        with self._lock:
+            self._stats['submitted'] += 1
+            self._futures[key] = future
+        return future, key, time.perf_counter(), executor
+    
+    def _collect(self, submission, timeout: Optional[float]) -> Dict[str, Any]:
+        """Gönderilmiş işin sonucunu bekler ve sınır ihlallerini hata mesajına çevirir"""
+        future, key, submitted_at, executor = submission
+        try:
+            outcome = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Kuyruktaki iş iptal edilir; çalışan iş CPU sınırına kadar sürer, sonucu atılır
+            future.cancel()
+            self._count('timeouts')
+            logger.warning(f"[EXTRACT] Zaman aşımı ({timeout}s, {key})")
+            return {'value': None, 'error': TIMEOUT_ERROR}
+        except CancelledError:
+            self._count('cancelled')
+            return {'value': None, 'error': CANCELLED_ERROR}
+        except BrokenProcessPool:
+            # Havuz işlemi öldü (ör. bellek sınırında OOM); havuz yeniden oluşturulur
+            self._count('worker_crashes')
+            self._reset_executor(executor)
+            logger.error(f"[EXTRACT] Havuz işlemi beklenmedik şekilde sonlandı ({key})")
+            return {'value': None, 'error': WORKER_CRASH_ERROR}
+        finally:
+            self._forget(key, future)
+        
+        latency_ms = (time.perf_counter() - submitted_at) * 1000
+        with self._lock:
+            self._stats['total_latency_ms'] += latency_ms
+            self._stats['max_latency_ms'] = max(self._stats['max_latency_ms'], latency_ms)
+            self._stats['total_extract_ms'] += outcome['elapsed'] * 1000
+        
+        if outcome['limit'] == 'cpu':
+            self._count('cpu_limit_exceeded')
+            return {'value': None, 'error': CPU_LIMIT_ERROR}
+        if outcome['limit'] == 'memory':
+            self._count('memory_limit_exceeded')
+            return {'value': None, 'error': MEMORY_LIMIT_ERROR}
+        
+        self._count('completed')
+        return {'value': outcome['value'], 'error': None}
+    
+    def _forget(self, key: str, future) -> None:
+        with self._lock:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+    
+    def run(self, func, *args, key: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Fonksiyonu havuzda sınırlarla çalıştırır ve sonucunu bekler
+        
+        func ve argümanları pickle edilebilir olmalıdır (modül seviyesinde fonksiyon).
+        
+        Args:
+            func: Çalıştırılacak fonksiyon
+            key: cancel() ile iptal için anahtar (ör. iş ID'si)
+            timeout: Bekleme süresi (None ise havuz varsayılanı)
+        
+        Returns:
+            dict: value (fonksiyon sonucu) ve error (None veya kullanıcıya gösterilecek mesaj)
+        """
+        timeout = self.timeout if timeout is None else timeout
+        return self._collect(self._submit(func, args, key), timeout)
+    
+    def extract(self, path: str, file_extension: str, key: Optional[str] = None, max_tokens: Optional[int] = None,
+                info: Optional[Dict[str, Any]] = None) -> Tuple[str, Optional[str]]:
+        """
+        Diskteki dosyadan havuzda metin çıkarır
+        
+        Büyük PDF'ler (parallel_min_bytes ve üstü) sayfa aralıklarına bölünüp birden fazla
+        havuz işleminde okunur; metin sayfa sırasıyla birleştirilir.
+        
+        Args:
+            path: Dosya yolu (havuz işlemi dosyayı kendisi açar)
+            file_extension: Dosya uzantısı
+            key: cancel() için anahtar (ör. iş ID'si)
+            max_tokens: Token bütçesi (DocumentReader.extract_text_from_file ile aynı)
+            info: Verilirse havuz işleminden dönen çıkarma bilgisiyle doldurulur
+        
+        Returns:
+            Tuple[str, Optional[str]]: DocumentReader.extract_text_from_file ile aynı biçim
+        """
+        if self._use_parallel(path, file_extension):
+            return self._extract_pdf_parallel(path, key, max_tokens, {} if info is None else info)
+        
+        outcome = self.run(_extract_file, path, file_extension, max_tokens, key=key)
+        if outcome['error']:
+            return "", outcome['error']
+        text, error, extraction_info = outcome['value']
+        if info is not None:
+            info.update(extraction_info)
+        if error:
+            self._count('reader_errors')
+        return text, error
+    
+    def _use_parallel(self, path: str, file_extension: str) -> bool:
+        """Paralel sayfa çıkarma kullanılmalı mı (PDF, birden fazla worker ve çekirdek, boyut eşiği)"""
+        if not self.parallel_min_bytes or self.max_workers < 2 or (os.cpu_count() or 1) < 2:
+            return False
+        if file_extension.lower().strip('.') != 'pdf':
+            return False
+        try:
+            return os.path.getsize(path) >= self.parallel_min_bytes
+        except OSError:
+            return False
+    
+    def _extract_pdf_parallel(self, path: str, key: Optional[str], max_tokens: Optional[int],
+                              info: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+        """
+        PDF'i sayfa aralıklarına bölerek havuz işlemlerinde paralel okur
+        
+        Aynı anda en fazla max_workers aralık havuzdadır (diğer işler de havuzu kullanabilir).
+        Aralıklar sırayla tüketilir; token bütçesi dolunca kalan aralıklar gönderilmez,
+        bekleyenler iptal edilir. Sonuç seri çıkarmayla aynıdır.
+        """
+        deadline = time.perf_counter() + self.timeout
+        key = key if key is not None else f'anonymous:{id(info)}'
+        
+        outcome = self.run(_count_pdf_pages, path, key=f'{key}:pages')
+        if outcome['error']:
+            return "", outcome['error']
+        total_pages, error = outcome['value']
+        if error:
+            self._count('reader_errors')
+            return "", error
+        
+        ranges = [(start, min(start + self.pages_per_task, total_pages))
+                  for start in range(0, total_pages, self.pages_per_task)]
+        if len(ranges) < 2:
+            # Tek aralık: paralellikten kazanç yok, normal çıkarma yapılır
+            outcome = self.run(_extract_file, path, 'pdf', max_tokens, key=key)
+            if outcome['error']:
+                return "", outcome['error']
+            text, error, extraction_info = outcome['value']
+            info.update(extraction_info)
+            if error:
+                self._count('reader_errors')
+            return text, error
+        
+        failure = []
+        pending = []
+        
+        def pages():
+            # Kayan pencere: en eski aralık tamamlandıkça yenisi gönderilir
+            next_range = 0
+            try:
+                while next_range < len(ranges) or pending:
+                    while next_range < len(ranges) and len(pending) < self.max_workers:
+                        start, end = ranges[next_range]
+                        pending.append(self._submit(_extract_pdf_range, (path, start, end), f'{key}:{start}'))
+                        next_range += 1
+                    
+                    result = self._collect(pending.pop(0), max(0.0, deadline - time.perf_counter()))
+                    if result['error']:
+                        failure.append(result['error'])
+                        return
+                    page_texts, error = result['value']
+                    if error:
+                        self._count('reader_errors')
+                        failure.append(error)
+                        return
+                    yield from page_texts
+            finally:
+                # Bütçe dolduysa veya hata olduysa kalan aralıklar iptal edilir
+                for future, pending_key, _, _ in pending:
+                    if future.cancel():
+                        self._count('cancelled')
+                    self._forget(pending_key, future)
+        
+        page_info = {}
+        page_stream = pages()
+        page_texts = DocumentReader.take_within_budget(
+            DocumentReader.iter_prepared_pages(DocumentReader.count_parsed(page_stream, info), info),
+            max_tokens, page_info)
+        page_stream.close()
+        if failure:
+            return "", failure[0]
+        
+        info.update(page_info)
+        info['pages_total'] = total_pages
+        info['pages_skipped'] = total_pages - page_info['pages_read']
+        info['parallel_tasks'] = -(-info['pages_parsed'] // self.pages_per_task)
+        self._count('parallel_extractions')
+        return DocumentReader.finish_extraction("\n".join(page_texts), info=info)
+    
+    def cancel(self, key: str) -> bool:
+        """
+        Anahtara ait işi (paralel çıkarmada tüm sayfa aralıklarını) iptal eder
+        
+        İş kuyruğu çıkarma hata verdiğinde veya iş beklenmedik şekilde sonlandığında iş ID'siyle
+        çağırır. Sadece henüz başlamamış görevler iptal edilebilir; çalışan görev CPU süresi
+        sınırında (RLIMIT_CPU) durur ve sonucu atılır.
+        
+        Returns:
+            bool: En az bir iş henüz başlamamışsa ve iptal edildiyse True
+        """
+        with self._lock:
+            futures = [future for future_key, future in self._futures.items()
+                       if future_key == key or future_key.startswith(f'{key}:')]
+        return any([future.cancel() for future in futures])
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Havuz işlemlerini kapatır (bekleyen işler iptal edilir)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Havuz istatistiklerini döndürür
+        
+        Returns:
+            dict: Sayaçlar, in_flight (bekleyen + çalışan), queued, running, ortalama/maks. gecikme
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            futures = list(self._futures.values())
+        
+        running = sum(1 for future in futures if future.running())
+        finished = stats['completed'] + stats['cpu_limit_exceeded'] + stats['memory_limit_exceeded']
+        stats.update({
+            'workers': self.max_workers,
+            'started': self._executor is not None,
+            'limits_enforced': RESOURCE_LIMITS_AVAILABLE,
+            'in_flight': len(futures),
+            'running': running,
+            'queued': len(futures) - running,
+            'avg_latency_ms': round(stats['total_latency_ms'] / finished, 1) if finished else 0.0,
+            'avg_extract_ms': round(stats['total_extract_ms'] / finished, 1) if finished else 0.0,
+            'max_latency_ms': round(stats['max_latency_ms'], 1)
+        })
+        del stats['total_latency_ms']
+        del stats['total_extract_ms']
+        return stats
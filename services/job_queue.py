@@ -0,0 +1,372 @@
+"""
+Arka Plan İş Kuyruğu
+/process yüklemelerini harici broker gerektirmeden, veritabanı destekli bir kuyrukta işler
+"""
+
+import logging
+import os
+import queue
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Any, Optional
+
+from models import db, ProcessingJob, User
+
+logger = logging.getLogger(__name__)
+
+
+def new_job_id() -> str:
+    """Yeni iş ID'si üretir (tahmin edilemez, URL'de kullanılabilir)"""
+    return uuid.uuid4().hex
+
+
+def get_worker_id() -> str:
+    """Bu işlemin worker kimliği (gunicorn fork sonrası her worker için farklıdır)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_job(job_id: str) -> bool:
+    """
+    Belirli bir bekleyen işi atomik olarak 'running' durumuna alır
+    
+    worker_id her alışta benzersizdir; yeniden kuyruğa alınıp başka bir worker'a (aynı
+    işlemdeki başka bir thread dahil) geçen işi eski sahibi tamamlayamaz.
+    
+    Args:
+        job_id: İş ID'si
+    
+    Returns:
+        bool: İş bu worker tarafından alındıysa True (başka worker aldıysa False)
+    """
+    now = datetime.utcnow()
+    updated = ProcessingJob.query.filter_by(id=job_id, status=ProcessingJob.STATUS_QUEUED).update({
+        'status': ProcessingJob.STATUS_RUNNING,
+        'started_at': now,
+        'heartbeat_at': now,
+        'worker_id': f"{get_worker_id()}:{uuid.uuid4().hex[:8]}",
+        'attempts': ProcessingJob.attempts + 1
+    }, synchronize_session=False)
+    db.session.commit()
+    return updated == 1
+
+
+def claim_next_job() -> Optional[str]:
+    """
+    Sıradaki en eski bekleyen işi alır (birden fazla worker aynı tablodan güvenle çekebilir)
+    
+    Returns:
+        Alınan işin ID'si veya kuyruk boşsa None
+    """
+    candidates = db.session.query(ProcessingJob.id).filter_by(
+        status=ProcessingJob.STATUS_QUEUED
+    ).order_by(ProcessingJob.created_at).limit(5).all()
+    
+    for (job_id,) in candidates:
+        if claim_job(job_id):
+            return job_id
+    return None
+
+
+def update_job_progress(job: ProcessingJob, progress: int, message: str) -> None:
+    """İşin ilerleme durumunu kaydeder (canlılık sinyali de yenilenir)"""
+    job.progress = progress
+    job.message = message[:255] if message else message
+    job.heartbeat_at = datetime.utcnow()
+    db.session.commit()
+
+
+def heartbeat_job(job_id: str, worker_id: str) -> bool:
+    """
+    Çalışan işin canlılık sinyalini yeniler
+    
+    Args:
+        job_id: İş ID'si
+        worker_id: claim_job'un yazdığı sahiplik anahtarı
+    
+    Returns:
+        bool: İş hâlâ bu worker'daysa True
+    """
+    updated = ProcessingJob.query.filter_by(
+        id=job_id, status=ProcessingJob.STATUS_RUNNING, worker_id=worker_id
+    ).update({'heartbeat_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return updated == 1
+
+
+def complete_claimed_job(job_id: str, worker_id: str, values: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    İşi, hâlâ bu worker'a aitse atomik olarak 'completed' durumuna alır (commit yapmaz)
+    
+    Sonuç kaydı ve fiş düşümüyle aynı transaction'da, en son çağrılmalıdır: False dönerse
+    (yarım kaldı sanılıp başka worker'a geçen iş) çağıran transaction'ı geri alır, sonuç ikinci
+    kez kaydedilmez ve ücretlendirilmez; sonuç kaydı hata verirse iş tamamlanmış görünmez.
+    
+    Args:
+        job_id: İş ID'si
+        worker_id: claim_job'un yazdığı sahiplik anahtarı
+        values: Durumla birlikte yazılacak diğer alanlar (result_id, finished_at vb.)
+    
+    Returns:
+        bool: İş bu worker'a aitse True (değilse çağıran transaction'ı geri almalı)
+    """
+    updated = ProcessingJob.query.filter_by(
+        id=job_id, status=ProcessingJob.STATUS_RUNNING, worker_id=worker_id
+    ).update({**(values or {}), 'status': ProcessingJob.STATUS_COMPLETED}, synchronize_session=False)
+    return updated == 1
+
+
+def refund_reserved_tokens(user_id: int, amount: int) -> None:
+    """İş kuyruğa alınırken düşülen fişi kullanıcıya iade eder (atomik artış, commit yapmaz)"""
+    if amount:
+        User.query.filter_by(id=user_id).update(
+            {'tokens_remaining': User.tokens_remaining + amount}, synchronize_session=False
+        )
+
+
+def fail_job(job: ProcessingJob, error: str, worker_id: Optional[str] = None) -> bool:
+    """
+    İşi başarısız olarak işaretler, ayrılan fişi iade eder ve yükleme dosyasını siler
+    
+    Durum değişikliği complete_claimed_job gibi koşulludur: worker_id verilirse iş sadece hâlâ
+    bu worker'da çalışıyorsa, verilmezse sadece bitmemişse değiştirilir. Yeniden kuyruğa
+    alınıp başka worker'a geçen işi eski sahibi başarısız işaretleyemez.
+    
+    Args:
+        job: İş
+        error: Kullanıcıya gösterilecek hata mesajı
+        worker_id: claim_job'un yazdığı sahiplik anahtarı
+    
+    Returns:
+        bool: İş başarısız işaretlendiyse True
+    """
+    reserved = job.tokens_reserved
+    query = ProcessingJob.query.filter(ProcessingJob.id == job.id)
+    if worker_id is not None:
+        query = query.filter(ProcessingJob.status == ProcessingJob.STATUS_RUNNING, ProcessingJob.worker_id == worker_id)
+    else:
+        query = query.filter(ProcessingJob.status.in_([ProcessingJob.STATUS_QUEUED, ProcessingJob.STATUS_RUNNING]))
+    updated = query.update({
+        'status': ProcessingJob.STATUS_FAILED,
+        'error': error,
+        'finished_at': datetime.utcnow(),
+        'tokens_reserved': 0
+    }, synchronize_session=False)
+    if updated != 1:
+        db.session.rollback()
+        logger.warning(f"[JOB] {job.id} başka bir worker'a geçmiş veya bitmiş, başarısız işaretlenmedi")
+        return False
+    refund_reserved_tokens(job.user_id, reserved)
+    remove_job_payload(job)
+    db.session.commit()
+    return True
+
+
+def remove_job_payload(job: ProcessingJob) -> None:
+    """İşin geçici yükleme dosyasını siler (commit yapmaz)"""
+    if job.payload_path and os.path.exists(job.payload_path):
+        try:
+            os.remove(job.payload_path)
+        except OSError as e:
+            logger.warning(f"[JOB] Yükleme dosyası silinemedi ({job.id}): {str(e)}")
+    job.payload_path = None
+
+
+def requeue_stale_jobs(stale_seconds: int, max_attempts: int) -> int:
+    """
+    Worker'ı ölmüş (uzun süredir canlılık sinyali gelmeyen 'running') işleri yeniden kuyruğa alır
+    
+    Deneme hakkı biten işler başarısız olarak işaretlenir ve ayrılan fişleri iade edilir. Durum
+    değişikliği koşulludur: bu arada sinyal gönderen veya tamamlanan iş değiştirilmez.
+    
+    Args:
+        stale_seconds: Bu süre boyunca sinyal gelmeyen iş yarım kalmış sayılır
+        max_attempts: Bir işin en fazla kaç kez çalıştırılacağı
+    
+    Returns:
+        int: Yeniden kuyruğa alınan veya başarısız sayılan iş sayısı
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+    last_seen = db.func.coalesce(ProcessingJob.heartbeat_at, ProcessingJob.started_at)
+    stale_jobs = ProcessingJob.query.filter(
+        ProcessingJob.status == ProcessingJob.STATUS_RUNNING,
+        last_seen < cutoff
+    ).all()
+    
+    changed = 0
+    for job in stale_jobs:
+        exhausted = job.attempts >= max_attempts or not job.payload_path
+        if exhausted:
+            values = {'status': ProcessingJob.STATUS_FAILED, 'finished_at': datetime.utcnow(), 'tokens_reserved': 0,
+                      'error': job.error or 'İşlem yarıda kaldı. Lütfen dosyayı tekrar yükleyin.'}
+        else:
+            values = {'status': ProcessingJob.STATUS_QUEUED, 'worker_id': None}
+        updated = ProcessingJob.query.filter(
+            ProcessingJob.id == job.id,
+            ProcessingJob.status == ProcessingJob.STATUS_RUNNING,
+            ProcessingJob.worker_id == job.worker_id,
+            last_seen < cutoff
+        ).update(values, synchronize_session=False)
+        if updated != 1:
+            continue
+        if exhausted:
+            refund_reserved_tokens(job.user_id, job.tokens_reserved)
+            remove_job_payload(job)
+        changed += 1
+        logger.warning(f"[JOB] Yarım kalan iş {job.id} -> {values['status']}")
+    
+    if stale_jobs:
+        db.session.commit()
+    return changed
+
+
+class JobQueue:
+    """
+    Sınırlı sayıda worker thread'i ile çalışan iş kuyruğu
+    
+    İş durumu processing_jobs tablosunda tutulur; bu sayede tüm gunicorn worker'ları aynı
+    kuyruktan iş çekebilir ve yeniden başlatma sonrası bekleyen işler kaybolmaz.
+    Yerel submit() çağrıları bekleyen bir worker'ı hemen uyandırır, diğer worker'ların
+    eklediği işler poll_interval aralığıyla fark edilir.
+    """
+    
+    def __init__(self, app, handler: Callable[[str], None], max_workers: int = 2,
+                 poll_interval: float = 2.0, stale_seconds: int = 900, max_attempts: int = 2):
+        """
+        JobQueue başlatıcı
+        
+        Args:
+            app: Flask uygulaması (worker thread'leri app context içinde çalışır)
+            handler: İş ID'si alan ve işi tamamlayan fonksiyon
+            max_workers: Bu işlemde aynı anda çalışabilecek iş sayısı
+            poll_interval: Boştayken kuyruğu kontrol etme aralığı (saniye)
+            stale_seconds: Yarım kalmış iş sayılma süresi (saniye); çalışan işler bu sürenin
+                üçte biri aralıkla canlılık sinyali gönderir
+            max_attempts: Yarım kalan bir işin en fazla deneme sayısı
+        """
+        self.app = app
+        self.handler = handler
+        self.max_workers = max(1, max_workers)
+        self.poll_interval = poll_interval
+        self.stale_seconds = stale_seconds
+        self.max_attempts = max_attempts
+        
+        self._wakeups = queue.Queue()
+        self._stopped = threading.Event()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {'active': 0, 'completed': 0, 'failed': 0}
+    
+    def start(self) -> None:
+        """Worker thread'lerini başlatır (her işlemde bir kez, fork sonrası çağrılmalı)"""
+        with self._start_lock:
+            if self._threads:
+                return
+            for index in range(self.max_workers):
+                thread = threading.Thread(target=self._worker_loop, name=f'job-worker-{index}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            logger.info(f"[JOB] İş kuyruğu başlatıldı ({self.max_workers} worker, {get_worker_id()})")
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        """Worker thread'lerini durdurur (çalışan işlerin bitmesini timeout kadar bekler)"""
+        self._stopped.set()
+        for _ in self._threads:
+            self._wakeups.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._stopped.clear()
+    
+    def submit(self, job_id: str, inline: bool = False) -> None:
+        """
+        Kuyruğa eklenmiş (veritabanına yazılmış) işi çalıştırılmak üzere bildirir
+        
+        Args:
+            job_id: processing_jobs tablosundaki iş ID'si
+            inline: True ise iş çağıran thread'de hemen çalıştırılır
+        """
+        if inline:
+            with self.app.app_context():
+                if claim_job(job_id):
+                    self._execute(job_id)
+            return
+        
+        self.start()
+        self._wakeups.put(job_id)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Kuyruk istatistiklerini döndürür
+        
+        Returns:
+            dict: workers, active, completed, failed (bu işlem) ve queued, running (tüm worker'lar)
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['workers'] = self.max_workers
+        stats['started'] = bool(self._threads)
+        stats['queued'] = ProcessingJob.query.filter_by(status=ProcessingJob.STATUS_QUEUED).count()
+        stats['running'] = ProcessingJob.query.filter_by(status=ProcessingJob.STATUS_RUNNING).count()
+        return stats
+    
+    def _worker_loop(self) -> None:
+        """Worker thread'i: kuyruktan iş çeker, yoksa bildirim veya poll aralığı kadar bekler"""
+        while not self._stopped.is_set():
+            try:
+                with self.app.app_context():
+                    requeue_stale_jobs(self.stale_seconds, self.max_attempts)
+                    job_id = claim_next_job()
+                    if job_id is not None:
+                        self._execute(job_id)
+                        continue
+            except Exception as e:
+                logger.error(f"[JOB] Kuyruk döngüsü hatası: {str(e)}")
+            
+            try:
+                self._wakeups.get(timeout=self.poll_interval)
+            except queue.Empty:
+                pass
+    
+    def _execute(self, job_id: str) -> None:
+        """Alınmış bir işi çalıştırır; yakalanmamış hatada işi başarısız işaretler (app context içinde)"""
+        with self._stats_lock:
+            self._stats['active'] += 1
+        
+        # İş sürdükçe canlılık sinyali gönderilir (uzun üretim adımları yarım kalmış sayılmasın)
+        worker_id = db.session.query(ProcessingJob.worker_id).filter_by(id=job_id).scalar()
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, args=(job_id, worker_id, stop_heartbeat),
+                                     name=f'job-heartbeat-{job_id[:8]}', daemon=True)
+        heartbeat.start()
+        
+        succeeded = False
+        try:
+            self.handler(job_id)
+            job = db.session.get(ProcessingJob, job_id)
+            succeeded = job is not None and job.status == ProcessingJob.STATUS_COMPLETED
+        except Exception as e:
+            logger.exception(f"[JOB] İş {job_id} hata ile sonlandı: {str(e)}")
+            db.session.rollback()
+            job = db.session.get(ProcessingJob, job_id)
+            if job is not None and not job.is_finished:
+                fail_job(job, 'İşlem sırasında beklenmeyen bir hata oluştu. Lütfen tekrar deneyin.', worker_id)
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+            with self._stats_lock:
+                self._stats['active'] -= 1
+                self._stats['completed' if succeeded else 'failed'] += 1
+    
+    def _heartbeat_loop(self, job_id: str, worker_id: str, stop: threading.Event) -> None:
+        """Heartbeat thread'i: iş bitene veya başka worker'a geçene kadar heartbeat_at'i yeniler"""
+        interval = max(1.0, self.stale_seconds / 3)
+        while not stop.wait(interval):
+            try:
+                with self.app.app_context():
+                    if not heartbeat_job(job_id, worker_id):
+                        return
+            except Exception as e:
+                logger.warning(f"[JOB] İş {job_id} canlılık sinyali yazılamadı: {str(e)}")
@@ -0,0 +1,279 @@
+"""
+LLM Yanıt Önbelleği
+Aynı prompt'un (model, sistem prompt'u, kullanıcı prompt'u, sıcaklık, şablon sürümü) yanıtını
+işlem içi LRU ve SQLite dosyası üzerinde saklar; tekrar eden çağrılar modele gitmez
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Disk boyutu her bu kadar yazmada bir kontrol edilir (SUM sorgusu her yazmada çalışmasın)
+_SIZE_CHECK_INTERVAL = 32
+
+
+def build_cache_key(model: str, system_prompt: str, prompt: str, temperature: float,
+                    prompt_version: str, **options) -> str:
+    """
+    Çağrının içerik adresli önbellek anahtarı
+    
+    Args:
+        model: Model adı
+        system_prompt: Sistem mesajı
+        prompt: Kullanıcı mesajı
+        temperature: Sıcaklık
+        prompt_version: Prompt şablonlarının sürümü (şablon değişince eski yanıtlar kullanılmaz)
+        **options: Yanıtı etkileyen diğer istek parametreleri (response_format, max_tokens)
+    
+    Returns:
+        64 karakterlik hex anahtar
+    """
+    payload = json.dumps({
+        'model': model,
+        'system': system_prompt,
+        'prompt': prompt,
+        'temperature': temperature,
+        'prompt_version': prompt_version,
+        'options': {name: value for name, value in options.items() if value is not None}
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    İki katmanlı yanıt önbelleği
+    
+    Bellek katmanı işlem içi LRU'dur (en fazla memory_entries kayıt). Disk katmanı tüm
+    worker işlemlerinin paylaştığı SQLite dosyasıdır; toplam boyut max_bytes'ı aşınca en
+    uzun süredir okunmayan kayıtlar silinir. Her iki katmanda da kayıtlar ttl saniye sonra
+    geçersiz olur. Disk hataları çağrıyı bozmaz, sadece loglanır ve sayılır.
+    """
+    
+    def __init__(self, path: Optional[str], memory_entries: int = 256, ttl: float = 7 * 24 * 3600,
+                 max_bytes: int = 100 * 1024 * 1024):
+        """
+        LLMResponseCache başlatıcı
+        
+        Args:
+            path: SQLite dosya yolu (None ise sadece bellek katmanı kullanılır)
+            memory_entries: Bellek katmanındaki en fazla kayıt sayısı
+            ttl: Kayıt ömrü (saniye, 0 = süresiz)
+            max_bytes: Disk katmanının en fazla toplam yanıt boyutu
+        """
+        self.path = path
+        self.memory_entries = memory_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        
+        self._lock = threading.Lock()
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._connection = None
+        self._connection_pid = None
+        self._writes_since_check = _SIZE_CHECK_INTERVAL
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0,
+                       'expired': 0, 'evictions': 0, 'errors': 0}
+    
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Disk bağlantısı (ilk kullanımda açılır; _lock altında çağrılır)"""
+        if self.path is None:
+            return None
+        # Fork sonrası üst işlemin bağlantısı kullanılmaz
+        if self._connection is None or self._connection_pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            # WAL: worker işlemleri okurken yazma bloklanmaz
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS llm_responses ('
+                'key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, '
+                'created_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_llm_responses_accessed ON llm_responses (accessed_at)')
+            connection.commit()
+            self._connection = connection
+            self._connection_pid = os.getpid()
+        return self._connection
+    
+    def _expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl) and now - created_at > self.ttl
+    
+    def _remember(self, key: str, response: str, created_at: float) -> None:
+        """Bellek katmanına ekler, sınır aşılırsa en eski kaydı atar (_lock altında)"""
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Önbellekteki yanıtı döndürür
+        
+        Args:
+            key: build_cache_key ile oluşturulmuş anahtar
+        
+        Returns:
+            Yanıt metni veya bulunamazsa / süresi dolmuşsa None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1], now):
+                    self._memory.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    return entry[0]
+                del self._memory[key]
+            
+            try:
+                connection = self._connect()
+                row = None
+                if connection is not None:
+                    row = connection.execute(
+                        'SELECT response, created_at FROM llm_responses WHERE key = ?', (key,)
+                    ).fetchone()
+                if row is not None and self._expired(row[1], now):
+                    connection.execute('DELETE FROM llm_responses WHERE key = ?', (key,))
+                    connection.commit()
+                    self._stats['expired'] += 1
+                    row = None
+                if row is not None:
+                    connection.execute('UPDATE llm_responses SET accessed_at = ? WHERE key = ?', (now, key))
+                    connection.commit()
+                    self._remember(key, row[0], row[1])
+                    self._stats['disk_hits'] += 1
+                    return row[0]
+            except sqlite3.Error as e:
+                self._stats['errors'] += 1
+                logger.warning(f"[LLM CACHE] Disk okunamadı: {str(e)}")
+            
+            self._stats['misses'] += 1
+            return None
+    
+    def set(self, key: str, response: str) -> None:
+        """
+        Yanıtı her iki katmana yazar
+        
+        Args:
+            key: build_cache_key ile oluşturulmuş anahtar
+            response: Model yanıtı
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            self._stats['stores'] += 1
+            try:
+                connection = self._connect()
+                if connection is None:
+                    return
+                connection.execute(
+                    'INSERT OR REPLACE INTO llm_responses (key, response, size, created_at, accessed_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (key, response, len(response.encode('utf-8')), now, now)
+                )
+                connection.commit()
+                self._writes_since_check += 1
+                if self._writes_since_check >= _SIZE_CHECK_INTERVAL:
+                    self._writes_since_check = 0
+                    self._evict(connection, now)
+            except sqlite3.Error as e:
+                self._stats['errors'] += 1
+                logger.warning(f"[LLM CACHE] Diske yazılamadı: {str(e)}")
+    
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        """Süresi dolan kayıtları ve boyut sınırını aşan en az kullanılanları siler (_lock altında)"""
+        if self.ttl:
+            expired = connection.execute('DELETE FROM llm_responses WHERE created_at < ?', (now - self.ttl,)).rowcount
+            self._stats['expired'] += max(expired, 0)
+        
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM llm_responses').fetchone()[0]
+        if self.max_bytes and total > self.max_bytes:
+            removed = 0
+            for key, size in connection.execute(
+                'SELECT key, size FROM llm_responses ORDER BY accessed_at'
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                connection.execute('DELETE FROM llm_responses WHERE key = ?', (key,))
+                total -= size
+                removed += 1
+            self._stats['evictions'] += removed
+        connection.commit()
+    
+    def clear(self) -> None:
+        """Tüm kayıtları siler"""
+        with self._lock:
+            self._memory.clear()
+            try:
+                connection = self._connect()
+                if connection is not None:
+                    connection.execute('DELETE FROM llm_responses')
+                    connection.commit()
+            except sqlite3.Error as e:
+                self._stats['errors'] += 1
+                logger.warning(f"[LLM CACHE] Temizlenemedi: {str(e)}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Önbellek istatistiklerini döndürür
+        
+        Returns:
+            dict: memory_hits, disk_hits, misses, hit_rate, stores, expired, evictions,
+                  errors, memory_entries, disk_entries, disk_bytes
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+            try:
+                connection = self._connect()
+                if connection is not None:
+                    stats['disk_entries'], stats['disk_bytes'] = connection.execute(
+                        'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses'
+                    ).fetchone()
+            except sqlite3.Error:
+                pass
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else None
+        return stats
+
+
+_shared_cache: Optional[LLMResponseCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    İşlem genelinde paylaşılan yanıt önbelleği (LLM_CACHE_ENABLED kapalıysa None)
+    
+    Returns:
+        LLMResponseCache veya None
+    """
+    global _shared_cache
+    
+    from config import Config
+    if not Config.LLM_CACHE_ENABLED:
+        return None
+    
+    path = Config.LLM_CACHE_PATH or None
+    cache = _shared_cache
+    if cache is not None and cache.path == path:
+        return cache
+    
+    with _shared_cache_lock:
+        if _shared_cache is None or _shared_cache.path != path:
+            _shared_cache = LLMResponseCache(
+                path,
+                memory_entries=Config.LLM_CACHE_MEMORY_ENTRIES,
+                ttl=Config.LLM_CACHE_TTL_SECONDS,
+                max_bytes=Config.LLM_CACHE_MAX_MB * 1024 * 1024
+            )
+        return _shared_cache
@@ -0,0 +1,414 @@
+"""
+Küme Geneli LLM Hız Sınırlayıcı
+Dakika başına istek (RPM) ve token (TPM) kovaları tüm worker işlemlerinin paylaştığı depoda
+tutulur; her model çağrısı göndermeden önce kapasite alır, öncelik plana göre belirlenir
+"""
+
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Plan önceliğine göre kovada bırakılması gereken pay: düşük öncelikli çağrılar kova bu payın
+# altına inecekse bekler, böylece yoğunlukta kalan kapasite yüksek öncelikli planlara kalır
+PRIORITY_RESERVES = {
+    'high': 0.0,
+    'normal': 0.1,
+    'low': 0.25
+}
+DEFAULT_PRIORITY = 'normal'
+
+# Bekleme döngüsünde tek seferde en fazla bu kadar uyunur (kapasite başka işlemde boşalabilir)
+MAX_SLEEP_SLICE = 1.0
+
+# SQLite kilidi başka işlemdeyken C seviyesinde beklenmez (busy timeout gevent hub'ını bloklar);
+# kısa uykularla (gevent altında diğer greenlet'lere geçilir) en fazla bu kadar yeniden denenir
+SQLITE_LOCK_TIMEOUT = 10.0
+SQLITE_LOCK_RETRY_SLEEP = (0.002, 0.02)
+
+
+class RateLimitWaitTimeout(Exception):
+    """Kapasite LLM_RATE_LIMIT_MAX_WAIT içinde alınamadı"""
+
+
+class BucketStore:
+    """
+    Kova deposu arayüzü
+    
+    try_acquire() iki kovayı (requests, tokens) atomik olarak doldurur ve yeterliyse düşer;
+    değilse gereken bekleme süresini döndürür. Uygulamalar: SQLiteBucketStore (tek sunucu,
+    tüm worker'lar) ve RedisBucketStore (birden fazla sunucu).
+    """
+    
+    def try_acquire(self, costs: Dict[str, float], limits: Dict[str, float], reserve: float) -> float:
+        """
+        Args:
+            costs: Kova adı -> bu çağrının maliyeti
+            limits: Kova adı -> dakika başına sınır (kova kapasitesi)
+            reserve: Kovada kalması gereken pay (0-1)
+        
+        Returns:
+            0 ise kapasite alındı, değilse tekrar denemeden önce beklenecek süre (saniye)
+        """
+        raise NotImplementedError
+    
+    def adjust(self, bucket: str, amount: float, limit: float) -> None:
+        """Kovaya miktar iade eder (pozitif) veya ek düşer (negatif); kapasiteyi aşmaz"""
+        raise NotImplementedError
+
+
+def _refill(level: float, updated_at: float, limit: float, now: float) -> float:
+    """Geçen süre kadar (dakikada limit hızında) doldurulmuş kova seviyesi"""
+    return min(limit, level + max(0.0, now - updated_at) * limit / 60.0)
+
+
+def _decide(levels: Dict[str, float], costs: Dict[str, float], limits: Dict[str, float], reserve: float) -> float:
+    """Tüm kovalar yeterliyse 0, değilse en uzun gerekli bekleme"""
+    wait = 0.0
+    for name, cost in costs.items():
+        # Rezerv kapasiteyi aşmaz (kapasite kadar maliyetli çağrı düşük öncelikte de geçebilsin)
+        needed = min(limits[name], cost + reserve * limits[name]) - levels[name]
+        if needed > 0:
+            wait = max(wait, needed * 60.0 / limits[name])
+    return wait
+
+
+class SQLiteBucketStore(BucketStore):
+    """
+    Aynı sunucudaki tüm worker işlemlerinin paylaştığı SQLite dosyası (BEGIN IMMEDIATE ile atomik)
+    
+    Bağlantının busy timeout'u 0'dır: kilit meşgulse sqlite3 hemen hata verir ve işlem
+    time.sleep ile (gevent altında bloklamadan) lock_timeout dolana kadar yeniden denenir.
+    """
+    
+    def __init__(self, path: str, lock_timeout: float = SQLITE_LOCK_TIMEOUT):
+        self.path = path
+        self.lock_timeout = lock_timeout
+        self._lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+    
+    def _connect(self) -> sqlite3.Connection:
+        # Fork sonrası üst işlemin bağlantısı kullanılmaz
+        if self._connection is None or self._connection_pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=0, isolation_level=None, check_same_thread=False)
+            try:
+                connection.execute('PRAGMA journal_mode=WAL')
+                connection.execute('CREATE TABLE IF NOT EXISTS llm_buckets '
+                                   '(name TEXT PRIMARY KEY, level REAL NOT NULL, updated_at REAL NOT NULL)')
+            except sqlite3.Error:
+                connection.close()
+                raise
+            self._connection = connection
+            self._connection_pid = os.getpid()
+        return self._connection
+    
+    def _transaction(self, body: Callable[[sqlite3.Connection], Any]) -> Any:
+        """body'yi BEGIN IMMEDIATE işlemi içinde çalıştırır; kilit meşgulse uyuyup yeniden dener"""
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            with self._lock:
+                try:
+                    connection = self._connect()
+                    connection.execute('BEGIN IMMEDIATE')
+                except sqlite3.OperationalError as e:
+                    if ('locked' not in str(e) and 'busy' not in str(e)) or time.monotonic() >= deadline:
+                        raise
+                else:
+                    try:
+                        result = body(connection)
+                        connection.execute('COMMIT')
+                        return result
+                    except Exception:
+                        connection.execute('ROLLBACK')
+                        raise
+            time.sleep(random.uniform(*SQLITE_LOCK_RETRY_SLEEP))
+    
+    def _levels(self, connection: sqlite3.Connection, limits: Dict[str, float], now: float) -> Dict[str, float]:
+        levels = {}
+        for name, limit in limits.items():
+            row = connection.execute('SELECT level, updated_at FROM llm_buckets WHERE name = ?', (name,)).fetchone()
+            # Yeni kova dolu başlar
+            levels[name] = limit if row is None else _refill(row[0], row[1], limit, now)
+        return levels
+    
+    def _save(self, connection: sqlite3.Connection, levels: Dict[str, float], now: float) -> None:
+        for name, level in levels.items():
+            connection.execute('INSERT OR REPLACE INTO llm_buckets (name, level, updated_at) VALUES (?, ?, ?)',
+                               (name, level, now))
+    
+    def try_acquire(self, costs: Dict[str, float], limits: Dict[str, float], reserve: float) -> float:
+        def body(connection):
+            now = time.time()
+            levels = self._levels(connection, limits, now)
+            wait = _decide(levels, costs, limits, reserve)
+            if not wait:
+                for name, cost in costs.items():
+                    levels[name] -= cost
+            self._save(connection, levels, now)
+            return wait
+        return self._transaction(body)
+    
+    def adjust(self, bucket: str, amount: float, limit: float) -> None:
+        def body(connection):
+            now = time.time()
+            levels = self._levels(connection, {bucket: limit}, now)
+            levels[bucket] = min(limit, levels[bucket] + amount)
+            self._save(connection, levels, now)
+        self._transaction(body)
+
+
+# KEYS: kova anahtarları; ARGV: şimdi, rezerv, sonra her kova için (maliyet, sınır)
+_REDIS_ACQUIRE = """
+local now = tonumber(ARGV[1])
+local reserve = tonumber(ARGV[2])
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local cost = tonumber(ARGV[1 + i * 2])
+    local limit = tonumber(ARGV[2 + i * 2])
+    local state = redis.call('HMGET', key, 'level', 'updated_at')
+    local level = limit
+    if state[1] then
+        level = math.min(limit, tonumber(state[1]) + math.max(0, now - tonumber(state[2])) * limit / 60)
+    end
+    levels[i] = level
+    local needed = math.min(limit, cost + reserve * limit) - level
+    if needed > 0 then
+        wait = math.max(wait, needed * 60 / limit)
+    end
+end
+for i, key in ipairs(KEYS) do
+    local level = levels[i]
+    if wait == 0 then
+        level = level - tonumber(ARGV[1 + i * 2])
+    end
+    redis.call('HSET', key, 'level', level, 'updated_at', now)
+    redis.call('EXPIRE', key, 120)
+end
+return tostring(wait)
+"""
+
+# KEYS[1]: kova; ARGV: şimdi, miktar, sınır
+_REDIS_ADJUST = """
+local now = tonumber(ARGV[1])
+local limit = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'level', 'updated_at')
+local level = limit
+if state[1] then
+    level = math.min(limit, tonumber(state[1]) + math.max(0, now - tonumber(state[2])) * limit / 60)
+end
+redis.call('HSET', KEYS[1], 'level', math.min(limit, level + tonumber(ARGV[2])), 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], 120)
+return 1
+"""
+
+
+class RedisBucketStore(BucketStore):
+    """Birden fazla sunucu için Redis deposu (kova güncellemesi tek Lua betiğiyle atomik)"""
+    
+    def __init__(self, url: str, prefix: str = 'studybuddy:llm_bucket:'):
+        if redis is None:
+            raise RuntimeError("redis paketi kurulu değil (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._acquire = self.client.register_script(_REDIS_ACQUIRE)
+        self._adjust = self.client.register_script(_REDIS_ADJUST)
+    
+    def try_acquire(self, costs: Dict[str, float], limits: Dict[str, float], reserve: float) -> float:
+        names = list(costs)
+        args = [time.time(), reserve]
+        for name in names:
+            args.extend([costs[name], limits[name]])
+        return float(self._acquire(keys=[self.prefix + name for name in names], args=args))
+    
+    def adjust(self, bucket: str, amount: float, limit: float) -> None:
+        self._adjust(keys=[self.prefix + bucket], args=[time.time(), amount, limit])
+
+
+def create_store(uri: str) -> BucketStore:
+    """
+    Depo URI'sinden kova deposu oluşturur
+    
+    Args:
+        uri: 'sqlite:///<dosya yolu>' veya 'redis://host:port/db'
+    
+    Returns:
+        BucketStore
+    """
+    if uri.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBucketStore(uri)
+    if uri.startswith('sqlite:///'):
+        return SQLiteBucketStore(uri[len('sqlite:///'):])
+    raise ValueError(f"Desteklenmeyen hız sınırı deposu: {uri}")
+
+
+class LLMRateLimiter:
+    """
+    Model çağrıları için RPM / TPM token kovası zamanlayıcısı
+    
+    acquire() çağrının istek ve tahmini token maliyetini iki kovadan birlikte alır; kapasite
+    yoksa gereken süre kadar (en fazla max_wait) bekler. Plan önceliği kovada bırakılması
+    gereken payı belirler (PRIORITY_RESERVES). Çağrı bitince settle() tahmini gerçek
+    kullanımla düzeltir.
+    """
+    
+    def __init__(self, store: BucketStore, requests_per_minute: int = 0, tokens_per_minute: int = 0,
+                 max_wait: float = 60):
+        """
+        LLMRateLimiter başlatıcı
+        
+        Args:
+            store: Paylaşılan kova deposu
+            requests_per_minute: Dakika başına istek sınırı (0 = sınır yok)
+            tokens_per_minute: Dakika başına token sınırı (0 = sınır yok)
+            max_wait: Kapasite için en fazla bekleme (saniye)
+        """
+        self.store = store
+        self.limits = {}
+        if requests_per_minute:
+            self.limits['requests'] = float(requests_per_minute)
+        if tokens_per_minute:
+            self.limits['tokens'] = float(tokens_per_minute)
+        self.max_wait = max_wait
+        
+        self._lock = threading.Lock()
+        self._stats = {'acquired': 0, 'waited': 0, 'wait_seconds': 0.0, 'timeouts': 0, 'store_errors': 0,
+                       'by_priority': {priority: 0 for priority in PRIORITY_RESERVES}}
+    
+    def _costs(self, tokens: int) -> Dict[str, float]:
+        costs = {}
+        if 'requests' in self.limits:
+            costs['requests'] = 1.0
+        if 'tokens' in self.limits:
+            # Sınırdan büyük tek çağrı hiç sığmayacağından kapasiteyle sınırlanır
+            costs['tokens'] = float(min(tokens, self.limits['tokens']))
+        return costs
+    
+    def acquire(self, tokens: int, priority: str = DEFAULT_PRIORITY) -> float:
+        """
+        Çağrı için kapasite alır (gerekirse bekler)
+        
+        Args:
+            tokens: Tahmini token (prompt + en fazla çıktı)
+            priority: 'high', 'normal' veya 'low'
+        
+        Returns:
+            Beklenen süre (saniye)
+        
+        Raises:
+            RateLimitWaitTimeout: max_wait içinde kapasite alınamazsa
+        """
+        priority = priority if priority in PRIORITY_RESERVES else DEFAULT_PRIORITY
+        reserve = PRIORITY_RESERVES[priority]
+        costs = self._costs(tokens)
+        started = time.monotonic()
+        waited = 0.0
+        
+        while True:
+            try:
+                wait = self.store.try_acquire(costs, self.limits, reserve)
+            except Exception as e:
+                # Depo erişilemezse çağrı engellenmez (sağlayıcının kendi sınırı ve yeniden deneme devrede)
+                with self._lock:
+                    self._stats['store_errors'] += 1
+                logger.warning(f"[AI] Hız sınırı deposu kullanılamadı: {str(e)}")
+                wait = 0
+            if not wait:
+                break
+            
+            waited = time.monotonic() - started
+            if waited + wait > self.max_wait:
+                with self._lock:
+                    self._stats['timeouts'] += 1
+                raise RateLimitWaitTimeout(
+                    f"OpenAI hız sınırı: {self.max_wait:.0f} sn içinde kapasite alınamadı ({priority} öncelik)"
+                )
+            time.sleep(min(wait, MAX_SLEEP_SLICE))
+        
+        waited = time.monotonic() - started
+        with self._lock:
+            self._stats['acquired'] += 1
+            self._stats['by_priority'][priority] += 1
+            if waited > 0.001:
+                self._stats['waited'] += 1
+                self._stats['wait_seconds'] += waited
+        return waited
+    
+    def settle(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """
+        Tahmini token maliyetini gerçek kullanımla düzeltir (fark kovaya iade edilir / düşülür)
+        
+        Args:
+            estimated_tokens: acquire() ile alınan token
+            actual_tokens: Yanıtın usage.total_tokens değeri (bilinmiyorsa None)
+        """
+        if 'tokens' not in self.limits or not isinstance(actual_tokens, int):
+            return
+        difference = self._costs(estimated_tokens)['tokens'] - actual_tokens
+        if not difference:
+            return
+        try:
+            self.store.adjust('tokens', difference, self.limits['tokens'])
+        except Exception as e:
+            with self._lock:
+                self._stats['store_errors'] += 1
+            logger.warning(f"[AI] Hız sınırı deposu güncellenemedi: {str(e)}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Zamanlayıcı istatistikleri
+        
+        Returns:
+            dict: requests_per_minute, tokens_per_minute, acquired, waited, avg_wait_seconds,
+                  timeouts, store_errors, by_priority
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['by_priority'] = dict(self._stats['by_priority'])
+        stats['requests_per_minute'] = self.limits.get('requests')
+        stats['tokens_per_minute'] = self.limits.get('tokens')
+        stats['avg_wait_seconds'] = round(stats.pop('wait_seconds') / stats['waited'], 3) if stats['waited'] else 0.0
+        return stats
+
+
+_shared_limiter: Optional[LLMRateLimiter] = None
+_shared_limiter_key: Optional[Tuple] = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[LLMRateLimiter]:
+    """
+    İşlem genelinde paylaşılan hız sınırlayıcı (LLM_RATE_LIMIT_RPM ve _TPM ikisi de 0 ise None)
+    
+    Returns:
+        LLMRateLimiter veya None
+    """
+    global _shared_limiter, _shared_limiter_key
+    
+    from config import Config
+    key = (Config.LLM_RATE_LIMIT_RPM, Config.LLM_RATE_LIMIT_TPM, Config.LLM_RATE_LIMIT_STORAGE_URI,
+           Config.LLM_RATE_LIMIT_MAX_WAIT)
+    if not (key[0] or key[1]):
+        return None
+    if _shared_limiter is not None and _shared_limiter_key == key:
+        return _shared_limiter
+    
+    with _shared_limiter_lock:
+        if _shared_limiter is None or _shared_limiter_key != key:
+            _shared_limiter = LLMRateLimiter(create_store(key[2]), key[0], key[1], max_wait=key[3])
+            _shared_limiter_key = key
+        return _shared_limiter
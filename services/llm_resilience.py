@@ -0,0 +1,380 @@
+"""
+Dayanıklı LLM Çağrı Katmanı
+Hata sınıflandırmalı yeniden deneme (jitter'lı üstel bekleme), worker başına devre kesici ve
+yavaş çağrılar için isteğe bağlı yedek (hedged) istek
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+logger = logging.getLogger(__name__)
+
+# Hata sınıfları: ilk dördü sağlayıcı kaynaklı ve geçicidir (yeniden denenir, devre kesiciye sayılır)
+ERROR_RATE_LIMIT = 'rate_limit'
+ERROR_SERVER = 'server'
+ERROR_TIMEOUT = 'timeout'
+ERROR_CONNECTION = 'connection'
+ERROR_CLIENT = 'client'
+RETRYABLE_ERRORS = (ERROR_RATE_LIMIT, ERROR_SERVER, ERROR_TIMEOUT, ERROR_CONNECTION)
+
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+# İstatistiklerde saklanan son deneme sayısı (gecikme yüzdelikleri bunlardan hesaplanır)
+RECENT_ATTEMPTS = 200
+
+
+class LLMCallError(Exception):
+    """Tüm denemeler başarısız olduğunda yükseltilir (mesaj eski 'OpenAI API hatası' biçimindedir)"""
+    
+    def __init__(self, message: str, error_class: str = ERROR_CLIENT, attempts: Optional[List[Dict[str, Any]]] = None):
+        super().__init__(message)
+        self.error_class = error_class
+        self.attempts = attempts or []
+
+
+class CircuitOpenError(LLMCallError):
+    """Devre açıkken çağrı sağlayıcıya gitmeden reddedilir"""
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Çağrı hatasını sınıflandırır
+    
+    Args:
+        error: OpenAI SDK veya ağ katmanı hatası
+    
+    Returns:
+        rate_limit, server, timeout, connection veya client
+    """
+    if openai is not None:
+        if isinstance(error, openai.APITimeoutError):
+            return ERROR_TIMEOUT
+        if isinstance(error, openai.APIConnectionError):
+            return ERROR_CONNECTION
+    if isinstance(error, TimeoutError):
+        return ERROR_TIMEOUT
+    if isinstance(error, ConnectionError):
+        return ERROR_CONNECTION
+    
+    status = getattr(error, 'status_code', None)
+    if status == 429:
+        return ERROR_RATE_LIMIT
+    if isinstance(status, int) and (status >= 500 or status in (408, 409)):
+        return ERROR_SERVER
+    return ERROR_CLIENT
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Yanıttaki Retry-After başlığı (saniye), yoksa None"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        return max(0.0, float(headers.get('retry-after')))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """
+    Deneme numarasına göre bekleme süresi (full jitter: 0 ile base * 2^attempt arası rastgele)
+    
+    Args:
+        attempt: Başarısız deneme sırası (0'dan başlar)
+        base: İlk bekleme üst sınırı (saniye)
+        cap: En uzun bekleme (saniye)
+        retry_after: Sağlayıcının istediği bekleme (varsa alt sınır olarak kullanılır)
+    
+    Returns:
+        Saniye
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+class CircuitBreaker:
+    """
+    Ardışık sağlayıcı hatalarında devreyi açan kesici
+    
+    failure_threshold ardışık geçici hatadan sonra devre açılır ve reset_timeout saniye
+    boyunca çağrılar beklemeden reddedilir. Süre dolunca tek bir deneme çağrısına izin
+    verilir (half_open); başarılıysa devre kapanır, değilse yeniden açılır. Sonucu
+    reset_timeout içinde kaydedilmeyen deneme çağrısı terk edilmiş sayılır ve yeni bir
+    deneme çağrısına izin verilir (devre half_open'da takılı kalmaz).
+    """
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        
+        self._lock = threading.Lock()
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+        self._stats = {'opened': 0, 'rejected': 0}
+    
+    def allow(self) -> bool:
+        """Çağrı yapılabilir mi (half_open'da sadece tek deneme çağrısı geçer)"""
+        if not self.failure_threshold:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if self._state == CIRCUIT_OPEN and now - self._opened_at >= self.reset_timeout:
+                self._state = CIRCUIT_HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == CIRCUIT_CLOSED:
+                return True
+            if self._state == CIRCUIT_HALF_OPEN and (not self._trial_in_flight
+                                                     or now - self._trial_started >= self.reset_timeout):
+                self._trial_in_flight = True
+                self._trial_started = now
+                return True
+            self._stats['rejected'] += 1
+            return False
+    
+    def release_trial(self) -> None:
+        """Sonucu kaydedilemeyen (yarıda kesilen) deneme çağrısının hakkını bırakır"""
+        with self._lock:
+            self._trial_in_flight = False
+    
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CIRCUIT_CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+    
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == CIRCUIT_HALF_OPEN or (self._state == CIRCUIT_CLOSED and self._failures >= self.failure_threshold):
+                if self._state != CIRCUIT_OPEN:
+                    self._stats['opened'] += 1
+                    logger.warning(f"[AI] Devre kesici açıldı ({self._failures} ardışık hata), "
+                                   f"{self.reset_timeout:.0f} sn boyunca çağrılar reddedilecek")
+                self._state = CIRCUIT_OPEN
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'state': self._state, 'consecutive_failures': self._failures, **self._stats}
+
+
+class ResilientCaller:
+    """
+    Model çağrılarını yeniden deneme, devre kesici ve yedek istekle çalıştırır
+    
+    Her deneme (yedek istekler dahil) sonucu, hata sınıfı ve gecikmesiyle kaydedilir.
+    Çağrının toplam süresi deadline ile sınırlıdır; bir sonraki denemeden önceki bekleme
+    bu süreyi aşacaksa son hata yükseltilir.
+    """
+    
+    def __init__(self, breaker: CircuitBreaker, max_retries: int = 3, base_delay: float = 1.0,
+                 max_delay: float = 20.0, deadline: Optional[float] = None, hedge_after: float = 0,
+                 hedge_workers: int = 4):
+        """
+        ResilientCaller başlatıcı
+        
+        Args:
+            breaker: Worker genelinde paylaşılan devre kesici
+            max_retries: Geçici hatalarda en fazla yeniden deneme sayısı
+            base_delay: Üstel beklemenin taban süresi (saniye)
+            max_delay: En uzun bekleme (saniye)
+            deadline: Bir çağrının tüm denemeleri için toplam süre (saniye, None = sınırsız)
+            hedge_after: Deneme bu süreyi aşarsa aynı istek bir kez daha gönderilir, ilk yanıt kullanılır (0 = kapalı)
+            hedge_workers: Yedek istekler için thread sayısı
+        """
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self.hedge_workers = hedge_workers
+        
+        self._lock = threading.Lock()
+        self._executor = None
+        self._recent: deque = deque(maxlen=RECENT_ATTEMPTS)
+        self._stats = {'calls': 0, 'succeeded': 0, 'failed': 0, 'attempts': 0, 'retries': 0,
+                       'hedges': 0, 'hedge_wins': 0, 'circuit_rejected': 0,
+                       'errors': {name: 0 for name in RETRYABLE_ERRORS + (ERROR_CLIENT,)}}
+    
+    def _record(self, attempts: List[Dict[str, Any]], attempt: Dict[str, Any]) -> None:
+        attempts.append(attempt)
+        with self._lock:
+            self._stats['attempts'] += 1
+            if attempt['error_class']:
+                self._stats['errors'][attempt['error_class']] += 1
+            self._recent.append(attempt)
+    
+    def _timed(self, func: Callable[[], Any], number: int, hedged: bool) -> Dict[str, Any]:
+        """Tek denemeyi çalıştırır; sonucu veya hatayı süresiyle döndürür (yükseltmez)"""
+        started = time.perf_counter()
+        try:
+            value = func()
+            error = None
+        except Exception as e:
+            value = None
+            error = e
+        return {
+            'attempt': number,
+            'hedged': hedged,
+            'seconds': round(time.perf_counter() - started, 3),
+            'error_class': classify_error(error) if error is not None else None,
+            'error': error,
+            'value': value
+        }
+    
+    def _attempt(self, func: Callable[[], Any], number: int, attempts: List[Dict[str, Any]],
+                 acquire: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+        """
+        Bir deneme; hedge_after aşılırsa yedek istek gönderilir ve ilk başarılı sonuç alınır
+        
+        Asıl denemenin kapasitesi çağıran tarafından önceden alınmıştır; yedek istek kendi
+        kapasitesini (acquire) yedek thread'inde alır.
+        """
+        if not self.hedge_after:
+            outcome = self._timed(func, number, False)
+            self._record(attempts, {k: v for k, v in outcome.items() if k not in ('error', 'value')})
+            return outcome
+        
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.hedge_workers * 2, thread_name_prefix='ai-hedge')
+            executor = self._executor
+        
+        futures = [executor.submit(self._timed, func, number, False)]
+        done, _ = wait(futures, timeout=self.hedge_after)
+        if not done:
+            with self._lock:
+                self._stats['hedges'] += 1
+            hedge = func if acquire is None else lambda: (acquire(), func())[1]
+            futures.append(executor.submit(self._timed, hedge, number, True))
+        
+        pending = set(futures)
+        outcome = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                self._record(attempts, {k: v for k, v in result.items() if k not in ('error', 'value')})
+                if outcome is None or (outcome['error'] is not None and result['error'] is None):
+                    outcome = result
+            if outcome['error'] is None:
+                # Kalan istek arka planda tamamlanır; sonucu kullanılmaz
+                break
+        
+        if outcome['error'] is None and outcome['hedged']:
+            with self._lock:
+                self._stats['hedge_wins'] += 1
+        return outcome
+    
+    def call(self, func: Callable[[], Any], description: str = '',
+             acquire: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        func'ı dayanıklı şekilde çağırır
+        
+        Args:
+            func: Parametresiz model çağrısı
+            description: Log mesajları için kısa açıklama
+            acquire: Verilirse her denemeden (ve yedek istekten) önce çağrılır (hız sınırı kapasitesi).
+                Bekleme süresi hedge_after süresine ve deneme gecikmesine sayılmaz
+        
+        Returns:
+            func'ın dönüş değeri
+        
+        Raises:
+            CircuitOpenError: Devre açıksa
+            LLMCallError: Kalıcı hata veya denemeler / süre tükendiyse
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+        started = time.monotonic()
+        attempts: List[Dict[str, Any]] = []
+        
+        for number in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                with self._lock:
+                    self._stats['circuit_rejected'] += 1
+                    self._stats['failed'] += 1
+                raise CircuitOpenError("OpenAI API hatası: servis geçici olarak kullanılamıyor (devre kesici açık)",
+                                       ERROR_SERVER, attempts)
+            
+            outcome = None
+            try:
+                if acquire is not None:
+                    try:
+                        acquire()
+                    except Exception as e:
+                        # Kapasite alınamadı (RateLimitWaitTimeout): sağlayıcıya gidilmedi, kesiciye sayılmaz
+                        with self._lock:
+                            self._stats['failed'] += 1
+                        raise LLMCallError(f"OpenAI API hatası: {str(e)}", ERROR_CLIENT, attempts) from e
+                outcome = self._attempt(func, number, attempts, acquire)
+            finally:
+                if outcome is None:
+                    # Deneme yarıda kesildi (örn. BaseException): half_open deneme hakkı serbest kalır
+                    self.breaker.release_trial()
+            
+            # Kesici sağlayıcının sağlığını izler: istemci hatası (4xx) sağlayıcının yanıt verdiğini
+            # gösterir ve başarı sayılır; half_open deneme hakkı her sonuçta bırakılır
+            error_class = outcome['error_class']
+            if error_class in RETRYABLE_ERRORS:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            
+            if outcome['error'] is None:
+                with self._lock:
+                    self._stats['succeeded'] += 1
+                return outcome['value']
+            
+            delay = backoff_delay(number, self.base_delay, self.max_delay, retry_after_seconds(outcome['error']))
+            out_of_time = self.deadline is not None and time.monotonic() - started + delay >= self.deadline
+            if error_class not in RETRYABLE_ERRORS or number == self.max_retries or out_of_time:
+                with self._lock:
+                    self._stats['failed'] += 1
+                raise LLMCallError(f"OpenAI API hatası: {str(outcome['error'])}", error_class, attempts) from outcome['error']
+            
+            logger.warning(f"[AI] {description or 'Çağrı'} başarısız ({error_class}, {outcome['seconds']} sn), "
+                           f"{delay:.1f} sn sonra yeniden denenecek ({number + 1}/{self.max_retries})")
+            with self._lock:
+                self._stats['retries'] += 1
+            time.sleep(delay)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Çağrı katmanı istatistikleri
+        
+        Returns:
+            dict: calls, succeeded, failed, attempts, retries, hedges, hedge_wins, circuit_rejected,
+                  errors (sınıf bazında), latency_p50 / latency_p95 (son denemeler, saniye), recent_attempts, circuit
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['errors'] = dict(self._stats['errors'])
+            recent = list(self._recent)
+        
+        latencies = sorted(attempt['seconds'] for attempt in recent)
+        stats['latency_p50'] = latencies[len(latencies) // 2] if latencies else None
+        stats['latency_p95'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None
+        stats['recent_attempts'] = recent[-20:]
+        stats['circuit'] = self.breaker.get_stats()
+        return stats
@@ -0,0 +1,267 @@
+"""
+PDF Metin Çıkarma Motorları
+pypdf (varsayılan) ve kuruluysa pypdfium2 / pdfminer.six ile sayfa sayfa metin çıkarma
+"""
+
+import difflib
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from pypdf import PdfReader
+
+try:
+    import pypdfium2
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    pypdfium2 = None
+    PDFIUM_AVAILABLE = False
+
+try:
+    from pdfminer.high_level import extract_pages as pdfminer_extract_pages
+    from pdfminer.layout import LTTextContainer
+    from pdfminer.pdfpage import PDFPage
+    PDFMINER_AVAILABLE = True
+except ImportError:
+    pdfminer_extract_pages = None
+    LTTextContainer = None
+    PDFPage = None
+    PDFMINER_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENGINE = 'pypdf'
+
+
+class PdfEngine:
+    """
+    PDF motoru arayüzü
+    
+    Kaynak (dosya yolu veya okunabilir ikili akış) open() ile açılır; dönen belge
+    page_count() ve iter_pages() ile kullanılır, iş bitince close() çağrılır.
+    """
+    
+    name = ''
+    available = False
+    
+    def open(self, source) -> Any:
+        raise NotImplementedError
+    
+    def page_count(self, document) -> int:
+        raise NotImplementedError
+    
+    def iter_pages(self, document, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        """[start, end) aralığındaki sayfaların metnini sırayla üretir (metinsiz sayfa için '')"""
+        raise NotImplementedError
+    
+    def close(self, document) -> None:
+        pass
+
+
+class PypdfEngine(PdfEngine):
+    """pypdf: saf Python, her ortamda kurulu (varsayılan ve yedek motor)"""
+    
+    name = 'pypdf'
+    available = True
+    
+    def open(self, source) -> PdfReader:
+        return PdfReader(source)
+    
+    def page_count(self, document: PdfReader) -> int:
+        return len(document.pages)
+    
+    def iter_pages(self, document: PdfReader, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        end = len(document.pages) if end is None else min(end, len(document.pages))
+        for index in range(start, end):
+            yield document.pages[index].extract_text() or ""
+
+
+class PdfiumEngine(PdfEngine):
+    """pypdfium2: PDFium (C++) tabanlı, büyük PDF'lerde pypdf'ten belirgin şekilde hızlı"""
+    
+    name = 'pdfium'
+    available = PDFIUM_AVAILABLE
+    
+    # PDFium aynı işlemde thread'ler arası eşzamanlı kullanıma uygun değildir
+    _lock = threading.RLock()
+    
+    def open(self, source):
+        with self._lock:
+            return pypdfium2.PdfDocument(source)
+    
+    def page_count(self, document) -> int:
+        with self._lock:
+            return len(document)
+    
+    def iter_pages(self, document, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        end = len(document) if end is None else min(end, len(document))
+        for index in range(start, end):
+            with self._lock:
+                page = document[index]
+                text_page = page.get_textpage()
+                try:
+                    text = text_page.get_text_range()
+                finally:
+                    text_page.close()
+                    page.close()
+            # PDFium satır sonlarını \r\n olarak döndürür
+            yield text.replace('\r\n', '\n').replace('\r', '\n')
+    
+    def close(self, document) -> None:
+        with self._lock:
+            document.close()
+
+
+class PdfminerEngine(PdfEngine):
+    """pdfminer.six: saf Python, düzen analizi sayesinde çok sütunlu sayfalarda okuma sırası daha doğru"""
+    
+    name = 'pdfminer'
+    available = PDFMINER_AVAILABLE
+    
+    def open(self, source):
+        # pdfminer dosya benzeri nesne ister; yol verilirse dosya burada açılır
+        if isinstance(source, str):
+            return {'file': open(source, 'rb'), 'owned': True}
+        return {'file': source, 'owned': False}
+    
+    def page_count(self, document) -> int:
+        document['file'].seek(0)
+        return sum(1 for _ in PDFPage.get_pages(document['file']))
+    
+    def iter_pages(self, document, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        page_numbers = None
+        if start or end is not None:
+            page_numbers = set(range(start, self.page_count(document) if end is None else end))
+        document['file'].seek(0)
+        for layout in pdfminer_extract_pages(document['file'], page_numbers=page_numbers):
+            yield "".join(element.get_text() for element in layout if isinstance(element, LTTextContainer))
+    
+    def close(self, document) -> None:
+        if document['owned']:
+            document['file'].close()
+
+
+PDF_ENGINES = {engine.name: engine for engine in (PypdfEngine(), PdfiumEngine(), PdfminerEngine())}
+
+_warned_engines = set()
+
+
+def available_engines() -> List[str]:
+    """Bu ortamda kullanılabilir motor adları"""
+    return [name for name, engine in PDF_ENGINES.items() if engine.available]
+
+
+def get_pdf_engine(name: Optional[str] = None) -> PdfEngine:
+    """
+    Adı verilen (veya PDF_EXTRACTION_ENGINE ayarındaki) motoru döndürür
+    
+    Motor bilinmiyorsa veya kütüphanesi kurulu değilse pypdf'e düşülür (uyarı bir kez loglanır).
+    
+    Args:
+        name: 'pypdf', 'pdfium' veya 'pdfminer' (None ise ayar kullanılır)
+    
+    Returns:
+        PdfEngine
+    """
+    if name is None:
+        from config import Config
+        name = getattr(Config, 'PDF_EXTRACTION_ENGINE', DEFAULT_ENGINE)
+    
+    engine = PDF_ENGINES.get((name or DEFAULT_ENGINE).lower())
+    if engine is not None and engine.available:
+        return engine
+    
+    if name not in _warned_engines:
+        _warned_engines.add(name)
+        reason = 'bilinmiyor' if engine is None else 'kurulu değil'
+        logger.warning(f"[PDF] '{name}' motoru {reason}, {DEFAULT_ENGINE} kullanılıyor")
+    return PDF_ENGINES[DEFAULT_ENGINE]
+
+
+def _normalize(text: str) -> List[str]:
+    return text.split()
+
+
+def benchmark_engines(paths: List[str], engines: Optional[List[str]] = None,
+                      reference: str = DEFAULT_ENGINE, repeat: int = 1) -> Dict[str, Dict[str, Any]]:
+    """
+    Motorları örnek PDF'ler üzerinde hız ve metin doğruluğu açısından karşılaştırır
+    
+    Doğruluk, referans motorun çıktısıyla kelime dizisi benzerliğidir (difflib, 0-1).
+    
+    Args:
+        paths: PDF dosya yolları (örnek korpus)
+        engines: Karşılaştırılacak motorlar (None ise kurulu olanların hepsi)
+        reference: Doğruluk için referans alınan motor
+        repeat: Her dosyanın kaç kez okunacağı (en iyi süre alınır)
+    
+    Returns:
+        dict: motor adı -> pages, seconds, pages_per_second, chars, similarity, errors
+    """
+    engines = engines or available_engines()
+    texts: Dict[str, Dict[str, str]] = {}
+    report: Dict[str, Dict[str, Any]] = {}
+    
+    for name in engines:
+        engine = PDF_ENGINES.get(name)
+        if engine is None or not engine.available:
+            report[name] = {'available': False}
+            continue
+        
+        pages = 0
+        seconds = 0.0
+        errors = 0
+        texts[name] = {}
+        for path in paths:
+            best = None
+            for _ in range(max(1, repeat)):
+                started = time.perf_counter()
+                try:
+                    document = engine.open(path)
+                    try:
+                        page_texts = list(engine.iter_pages(document))
+                    finally:
+                        engine.close(document)
+                except Exception as e:
+                    logger.warning(f"[PDF] {name} {path} okunamadı: {str(e)}")
+                    errors += 1
+                    break
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            if best is None:
+                continue
+            pages += len(page_texts)
+            seconds += best
+            texts[name][path] = "\n".join(page_texts)
+        
+        report[name] = {
+            'available': True,
+            'pages': pages,
+            'seconds': round(seconds, 3),
+            'pages_per_second': round(pages / seconds, 1) if seconds else None,
+            'chars': sum(len(text) for text in texts[name].values()),
+            'errors': errors
+        }
+    
+    # Metin doğruluğu: referans motorla kelime dizisi benzerliği
+    reference_texts = texts.get(reference, {})
+    for name, engine_texts in texts.items():
+        ratios = [
+            difflib.SequenceMatcher(None, _normalize(reference_texts[path]), _normalize(text), autojunk=False).ratio()
+            for path, text in engine_texts.items() if path in reference_texts
+        ]
+        report[name]['similarity'] = round(sum(ratios) / len(ratios), 4) if ratios else None
+    
+    return report
+
+
+if __name__ == '__main__':
+    # Kullanım: python -m services.pdf_engines kitap1.pdf kitap2.pdf ...
+    import json
+    import sys
+    
+    if len(sys.argv) < 2:
+        print("Kullanım: python -m services.pdf_engines <pdf> [<pdf> ...]")
+        sys.exit(1)
+    print(json.dumps(benchmark_engines(sys.argv[1:], repeat=3), indent=2, ensure_ascii=False))
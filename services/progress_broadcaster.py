@@ -0,0 +1,112 @@
+"""
+İlerleme Yayıncısı
+SocketIO ilerleme olaylarını oda bazında, çağıranı bloklamadan ve birleştirerek gönderir
+"""
+
+import logging
+import threading
+from typing import Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def user_room(user_id: int) -> str:
+    """Kullanıcıya özel SocketIO oda adı"""
+    return f'user:{user_id}'
+
+
+def job_room(job_id: str) -> str:
+    """İşe özel SocketIO oda adı"""
+    return f'job:{job_id}'
+
+
+class ProgressBroadcaster:
+    """
+    SocketIO olaylarını arka plan görevinde gönderen tampon
+    
+    publish() olayı sadece tampona yazar ve hemen döner; böylece işlem hattı soket
+    gönderimini beklemez. Aynı oda ve olay adı için gönderilmeyi bekleyen eski olay
+    yenisiyle değiştirilir (ör. %40 bekliyorken %50 gelirse sadece %50 gönderilir).
+    Olaylar sadece ilgili odaya gönderildiği için maliyet bağlı istemci sayısından bağımsızdır.
+    """
+    
+    def __init__(self, socketio, flush_interval: float = 0.05):
+        """
+        ProgressBroadcaster başlatıcı
+        
+        Args:
+            socketio: Flask-SocketIO örneği
+            flush_interval: Gönderimler arası bekleme; bu süredeki olaylar birleştirilir (saniye)
+        """
+        self.socketio = socketio
+        self.flush_interval = flush_interval
+        
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._started = False
+        self._stats = {'published': 0, 'coalesced': 0, 'emitted': 0, 'errors': 0}
+    
+    def publish(self, event: str, payload: Dict[str, Any], room: str) -> None:
+        """
+        Olayı gönderilmek üzere tampona ekler (bloklamaz)
+        
+        Args:
+            event: SocketIO olay adı ('progress', 'job_status')
+            payload: Olay verisi
+            room: Hedef oda (user_room / job_room)
+        """
+        key = (room, event)
+        with self._lock:
+            if key in self._pending:
+                self._stats['coalesced'] += 1
+            self._pending[key] = payload
+            self._stats['published'] += 1
+            start = not self._started
+            self._started = True
+        
+        if start:
+            self.socketio.start_background_task(self._run)
+        self._wakeup.set()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Yayıncı istatistiklerini döndürür
+        
+        Returns:
+            dict: published, coalesced, emitted, errors, pending
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        return stats
+    
+    def flush(self) -> None:
+        """Tampondaki tüm olayları çağıran thread'de hemen gönderir"""
+        with self._lock:
+            batch = self._pending
+            self._pending = {}
+        
+        emitted = 0
+        errors = 0
+        for (room, event), payload in batch.items():
+            try:
+                self.socketio.emit(event, payload, to=room)
+                emitted += 1
+            except Exception as e:
+                errors += 1
+                logger.warning(f"[SOCKET] '{event}' olayı gönderilemedi ({room}): {str(e)}")
+        
+        with self._lock:
+            self._stats['emitted'] += emitted
+            self._stats['errors'] += errors
+    
+    def _run(self) -> None:
+        """Arka plan görevi: bildirim geldikçe tamponu boşaltır"""
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self.flush()
+            if self.flush_interval:
+                # Kısa bekleme: bu sürede gelen olaylar tek gönderimde birleştirilir
+                self.socketio.sleep(self.flush_interval)
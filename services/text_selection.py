@@ -0,0 +1,195 @@
+"""
+Temsili Metin Seçimi
+Token bütçesini aşan metinden tüm bölümleri kapsayan, bütçe boyutunda bir alıntı oluşturur
+"""
+
+import math
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.document_reader import DocumentReader
+
+STRATEGY_FULL = 'full'          # Metin bütçeye sığıyor, olduğu gibi kullanılır
+STRATEGY_HEAD = 'head'          # Baştan kesme (DocumentReader.truncate_text)
+STRATEGY_BALANCED = 'balanced'  # Bölüm dengeli TF-IDF cümle seçimi
+
+SELECTION_NOTE = "\n\n[Not: Metin çok uzun olduğu için her bölümden temsili cümleler seçilmiştir]"
+
+# Bölüm dizini yoksa metin bu kadar eşit parçaya bölünür (bütçenin katına göre, en az 2)
+MAX_BLOCKS = 16
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+_WORD = re.compile(r'\w{3,}')
+
+
+def _split_parts(text: str, sections: Optional[List[Dict[str, Any]]], max_chars: int) -> Tuple[List[Tuple[int, int]], str]:
+    """
+    Metni kapsanacak parçalara böler
+    
+    Bölüm dizini varsa en üst seviyedeki bölümler (ve ilk başlıktan önceki giriş) kullanılır;
+    yoksa metin eşit bloklara bölünür.
+    
+    Returns:
+        ([(başlangıç, bitiş), ...], 'sections' veya 'blocks')
+    """
+    usable = [section for section in sections or [] if 0 <= section.get('start', -1) < len(text)]
+    if usable:
+        top_level = min(section['level'] for section in usable)
+        starts = sorted({section['start'] for section in usable if section['level'] == top_level})
+        if len(starts) < 2:
+            starts = sorted({section['start'] for section in usable})
+        if len(starts) >= 2:
+            if starts[0] > 0:
+                starts.insert(0, 0)
+            bounds = starts + [len(text)]
+            return [(bounds[i], bounds[i + 1]) for i in range(len(starts)) if text[bounds[i]:bounds[i + 1]].strip()], 'sections'
+    
+    blocks = max(2, min(MAX_BLOCKS, math.ceil(len(text) / max_chars) * 2))
+    size = math.ceil(len(text) / blocks)
+    parts = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        # Blok sınırı bir sonraki boşluğa kaydırılır (kelime bölünmez)
+        space = text.find(' ', end)
+        end = len(text) if space == -1 or end == len(text) else space
+        parts.append((start, end))
+        start = end
+    return parts, 'blocks'
+
+
+def _allocate(lengths: List[int], budget: int) -> List[int]:
+    """
+    Bütçeyi parçalara dağıtır: yarısı eşit taban pay (kısa bölümler de kapsansın), kalanı uzunlukla orantılı
+    """
+    floor = budget // (2 * len(lengths))
+    allocation = [min(length, floor) for length in lengths]
+    remaining = budget - sum(allocation)
+    rest = [length - share for length, share in zip(lengths, allocation)]
+    total = sum(rest)
+    if total and remaining > 0:
+        for index, length in enumerate(rest):
+            allocation[index] += length if total <= remaining else int(remaining * length / total)
+    return allocation
+
+
+def _tfidf_vectors(sentences: List[str]) -> List[Dict[str, float]]:
+    """Cümlelerin TF-IDF vektörleri (seyrek sözlük; belge = cümle)"""
+    tokenized = [_WORD.findall(sentence.lower()) for sentence in sentences]
+    document_frequency: Dict[str, int] = {}
+    for words in tokenized:
+        for word in set(words):
+            document_frequency[word] = document_frequency.get(word, 0) + 1
+    
+    count = len(sentences)
+    vectors = []
+    for words in tokenized:
+        vector: Dict[str, float] = {}
+        for word in words:
+            vector[word] = vector.get(word, 0.0) + 1.0
+        for word, frequency in vector.items():
+            vector[word] = frequency * (math.log((1 + count) / (1 + document_frequency[word])) + 1)
+        vectors.append(vector)
+    return vectors
+
+
+def _centrality(vectors: List[Dict[str, float]]) -> List[float]:
+    """Her cümlenin parçanın ağırlık merkezine kosinüs benzerliği (parçayı en iyi temsil eden cümleler yüksek)"""
+    centroid: Dict[str, float] = {}
+    for vector in vectors:
+        for word, weight in vector.items():
+            centroid[word] = centroid.get(word, 0.0) + weight
+    centroid_norm = math.sqrt(sum(weight * weight for weight in centroid.values())) or 1.0
+    
+    scores = []
+    for vector in vectors:
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        if not norm:
+            scores.append(0.0)
+            continue
+        dot = sum(weight * centroid.get(word, 0.0) for word, weight in vector.items())
+        scores.append(dot / (norm * centroid_norm))
+    return scores
+
+
+def _select_from_part(sentences: List[str], scores: List[float], budget: int) -> List[int]:
+    """
+    Parçadan bütçeye sığan en merkezi cümleleri seçer (indeksler doküman sırasıyla)
+    
+    İlk cümle (bölüm başlığını taşır) her zaman alınır.
+    """
+    chosen = [0]
+    used = len(sentences[0]) + 1
+    for index in sorted(range(1, len(sentences)), key=lambda i: scores[i], reverse=True):
+        if used + len(sentences[index]) + 1 <= budget:
+            chosen.append(index)
+            used += len(sentences[index]) + 1
+    return sorted(chosen)
+
+
+def select_text(text: str, max_tokens: int, sections: Optional[List[Dict[str, Any]]] = None,
+                strategy: str = STRATEGY_BALANCED, source_tokens: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Modele gidecek metni token bütçesine göre hazırlar
+    
+    balanced stratejisinde metin bölümlere (bölüm dizini yoksa eşit bloklara) ayrılır, bütçe
+    bölümlere (eşit taban pay + uzunlukla orantılı pay) dağıtılır ve her bölümden TF-IDF merkeziliği en yüksek
+    cümleler doküman sırasıyla alınır. Böylece tek model çağrısı, aynı token miktarıyla
+    dokümanın sonundaki üniteleri de görür.
+    
+    Args:
+        text: Temizlenmiş metin
+        max_tokens: Modele gidecek token bütçesi (1 token = 4 karakter)
+        sections: DocumentReader bölüm dizini (start/end ofsetleri bu metne göre)
+        strategy: 'balanced' veya 'head'
+        source_tokens: Verilirse metnin sadece ilk bu kadar token'ı kaynak alınır (farklı
+            formatlardan çıkarılan aynı içerik aynı sonucu versin diye)
+    
+    Returns:
+        Tuple[str, dict]: (seçilen metin, strategy / partition / sections_total / sections_covered /
+        coverage / source_chars / selected_chars)
+    """
+    max_chars = max_tokens * 4
+    if source_tokens:
+        text = text[:source_tokens * 4]
+    
+    info = {'strategy': STRATEGY_FULL, 'source_chars': len(text)}
+    if len(text) <= max_chars:
+        info.update({'selected_chars': len(text), 'coverage': 1.0})
+        return text, info
+    
+    parts, partition = _split_parts(text, sections, max_chars)
+    info.update({'partition': partition, 'sections_total': len(parts)})
+    
+    if strategy != STRATEGY_BALANCED or len(parts) < 2:
+        selected = DocumentReader.truncate_text(text, max_tokens=max_tokens)
+        # Kesme noktasından (en fazla max_chars) önce başlayan bölümler kapsanmış sayılır
+        covered = sum(1 for start, _ in parts if start < max_chars)
+        info.update({'strategy': STRATEGY_HEAD, 'sections_covered': covered,
+                     'coverage': round(covered / len(parts), 3), 'selected_chars': len(selected)})
+        return selected, info
+    
+    part_sentences = [[sentence for sentence in _SENTENCE_SPLIT.split(text[start:end].strip()) if sentence]
+                      for start, end in parts]
+    # Parçalar "\n\n" ile birleşir; ayırıcılar bütçeden düşülür
+    budgets = _allocate([len(text[start:end].strip()) + 2 for start, end in parts], max_chars)
+    
+    excerpts = []
+    covered = 0
+    for sentences, budget in zip(part_sentences, budgets):
+        if not sentences or budget <= 2:
+            continue
+        budget -= 2
+        if len(sentences[0]) >= budget:
+            excerpt = sentences[0][:budget].rsplit(' ', 1)[0] if ' ' in sentences[0][:budget] else sentences[0][:budget]
+        else:
+            scores = _centrality(_tfidf_vectors(sentences))
+            excerpt = " ".join(sentences[index] for index in _select_from_part(sentences, scores, budget))
+        if excerpt:
+            excerpts.append(excerpt)
+            covered += 1
+    
+    selected = "\n\n".join(excerpts) + SELECTION_NOTE
+    info.update({'strategy': STRATEGY_BALANCED, 'sections_covered': covered,
+                 'coverage': round(covered / len(parts), 3), 'selected_chars': len(selected)})
+    return selected, info
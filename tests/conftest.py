@@ -15,8 +15,10 @@ from config import Config
 
 
 @pytest.fixture
-def app():
+def app(monkeypatch):
     """Test Flask uygulaması oluştur"""
+    # LLM yanıt önbelleği testlerde sadece bellekte tutulur (instance/ altına SQLite dosyası yazılmaz)
+    monkeypatch.setattr(Config, 'LLM_CACHE_PATH', '')
     # Test konfigürasyonu
     flask_app.config['TESTING'] = True
     # SQLite in-memory database'de her connection farklı bir database görür
@@ -28,6 +30,10 @@ def app():
     flask_app.config['DEMO_MODE'] = True
     flask_app.config['SECRET_KEY'] = 'test-secret-key'
     flask_app.config['UPLOAD_FOLDER'] = tempfile.mkdtemp()
+    # Arka plan işleri testlerde istek içinde senkron çalıştırılır
+    flask_app.config['JOB_QUEUE_INLINE'] = True
+    # Metin çıkarma testlerde işlem havuzu yerine aynı işlemde yapılır (mock'lar geçerli kalır)
+    flask_app.config['EXTRACTION_POOL_ENABLED'] = False
     
     # App context içinde çalıştır
     with flask_app.app_context():
@@ -4,8 +4,9 @@ AIGenerator servis testleri
 
 import pytest
 import json
+import math
 from unittest.mock import patch, MagicMock
-from services.ai_generator import AIGenerator
+from services.ai_generator import AIGenerator, PROMPT_TEMPLATES, get_shared_generator
 from config import Config
 
 
@@ -256,3 +257,382 @@ def test_json_parse_error_handling(mock_openai_class, demo_mode_false):
     assert len(questions) > 0
     assert 'Soru üretimi sırasında bir hata oluştu' in questions[0]['question'] or 'hata' in questions[0].get('explanation', '').lower() or 'Invalid' in questions[0].get('explanation', '')
 
+
+
+@pytest.mark.unit
+def test_generate_all_content_concurrent_matches_sequential(demo_mode_true, monkeypatch):
+    """Eşzamanlı mod sıralı mod ile aynı sonuç yapısını döndürür"""
+    generator = AIGenerator()
+    
+    monkeypatch.setattr('config.Config.AI_CONCURRENT_GENERATION', False)
+    sequential = generator.generate_all_content(text='test', level='high_school')
+    
+    monkeypatch.setattr('config.Config.AI_CONCURRENT_GENERATION', True)
+    concurrent = generator.generate_all_content(text='test', level='high_school')
+    
+    assert list(concurrent.keys()) == list(sequential.keys())
+    for key in sequential:
+        assert type(concurrent[key]) is type(sequential[key])
+        if isinstance(sequential[key], list):
+            assert len(concurrent[key]) == len(sequential[key])
+
+
+@pytest.mark.unit
+def test_generate_all_content_concurrent_runs_in_parallel(demo_mode_true, monkeypatch):
+    """Eşzamanlı modda toplam süre en yavaş çağrıya yakındır"""
+    import time
+    
+    monkeypatch.setattr('config.Config.AI_CONCURRENT_GENERATION', True)
+    monkeypatch.setattr('config.Config.AI_MAX_CONCURRENCY', 6)
+    generator = AIGenerator()
+    original = generator._get_demo_response
+    
+    def slow_demo_response(prompt, language='tr'):
+        time.sleep(0.2)
+        return original(prompt, language)
+    
+    monkeypatch.setattr(generator, '_get_demo_response', slow_demo_response)
+    
+    start = time.time()
+    results = generator.generate_all_content(text='test', level='high_school')
+    elapsed = time.time() - start
+    
+    assert len(results) == 6
+    assert elapsed < 0.2 * 6 * 0.75
+
+
+@pytest.mark.unit
+def test_generate_all_content_concurrent_propagates_error(demo_mode_true, monkeypatch):
+    """Eşzamanlı modda bir çağrının hatası üst katmana iletilir"""
+    monkeypatch.setattr('config.Config.AI_CONCURRENT_GENERATION', True)
+    generator = AIGenerator()
+    
+    def failing_summary(*args, **kwargs):
+        raise Exception('OpenAI API hatası: test')
+    
+    monkeypatch.setattr(generator, 'generate_summary', failing_summary)
+    
+    with pytest.raises(Exception) as exc_info:
+        generator.generate_all_content(text='test', level='high_school')
+    assert 'OpenAI API hatası' in str(exc_info.value)
+
+
+@pytest.mark.unit
+def test_generate_all_content_concurrent_timeout(demo_mode_true, monkeypatch):
+    """Eşzamanlı modda süre aşımı anlaşılır bir hata ile sonuçlanır"""
+    import time
+    
+    monkeypatch.setattr('config.Config.AI_CONCURRENT_GENERATION', True)
+    # Görev süresi bir çağrının tüm denemelerini kapsar
+    monkeypatch.setattr('config.Config.AI_CALL_DEADLINE', 0.1)
+    generator = AIGenerator()
+    
+    def hanging_flashcards(*args, **kwargs):
+        time.sleep(1)
+        return []
+    
+    monkeypatch.setattr(generator, 'generate_flashcards', hanging_flashcards)
+    
+    start = time.time()
+    with pytest.raises(Exception) as exc_info:
+        generator.generate_all_content(text='test', level='high_school')
+    assert 'zaman aşımı' in str(exc_info.value)
+    assert 'flashcards' in str(exc_info.value)
+    assert time.time() - start < 1
+
+
+@pytest.mark.unit
+def test_generate_all_content_single_mode_demo(demo_mode_true):
+    """Tek çağrı modu demo modda da aynı sözlük yapısını döndürür"""
+    generator = AIGenerator()
+    results = generator.generate_all_content(text='test', level='high_school', mode='single')
+    
+    assert list(results.keys()) == ['summary', 'multiple_choice', 'short_answer', 'fill_blank', 'true_false', 'flashcards']
+    assert isinstance(results['summary'], str) and len(results['summary']) > 0
+    for q in results['multiple_choice']:
+        assert len(q['options']) == 4
+        assert 0 <= q['correct_answer'] < 4
+
+
+@pytest.mark.unit
+@patch('services.ai_generator.OpenAI')
+def test_generate_all_content_single_mode_makes_one_call(mock_openai_class, demo_mode_false):
+    """Tek çağrı modunda metin yalnızca bir kez gönderilir ve yanıt türlere ayrılır"""
+    combined = {
+        'summary': '## Özet',
+        'multiple_choice': [{'question': 'S?', 'options': ['A', 'B', 'C', 'D'], 'correct_answer': 2,
+                             'difficulty': 'simple', 'topic': 'T', 'explanation': 'E'}],
+        'short_answer': [{'question': 'K?', 'answer': 'bir iki üç dört beş altı', 'accepted_answers': [], 'topic': 'T'}],
+        'fill_blank': [{'question': 'X _____', 'answer': 'a', 'options': ['a', 'b', 'c', 'd'], 'topic': 'T'}],
+        'true_false': [{'statement': 'İfade', 'is_true': True, 'explanation': 'E', 'topic': 'T'}],
+        'flashcards': [{'front': 'Ön', 'back': 'Arka', 'topic': 'T'}]
+    }
+    mock_client = MagicMock()
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = json.dumps(combined, ensure_ascii=False)
+    mock_client.chat.completions.create.return_value = mock_response
+    mock_openai_class.return_value = mock_client
+    
+    generator = AIGenerator(api_key='test-key')
+    results = generator.generate_all_content(text='test metin', level='elementary', mode='single')
+    
+    mock_client.chat.completions.create.assert_called_once()
+    call_kwargs = mock_client.chat.completions.create.call_args.kwargs
+    assert call_kwargs['response_format']['type'] == 'json_schema'
+    assert results['summary'] == '## Özet'
+    mcq = results['multiple_choice'][0]
+    assert mcq['options'][mcq['correct_answer']] == 'C'
+    # Elementary için kısa cevap en fazla 3 kelime
+    assert len(results['short_answer'][0]['answer'].split()) <= 3
+
+
+@pytest.mark.unit
+@patch('services.ai_generator.OpenAI')
+def test_generate_all_content_single_mode_falls_back_to_fanout(mock_openai_class, demo_mode_false, monkeypatch):
+    """Tek çağrı yanıtı işlenemezse içerik türü bazlı çağrılara geçilir"""
+    monkeypatch.setattr('config.Config.AI_CONCURRENT_GENERATION', False)
+    mock_client = MagicMock()
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = 'Geçersiz yanıt'
+    mock_client.chat.completions.create.return_value = mock_response
+    mock_openai_class.return_value = mock_client
+    
+    generator = AIGenerator(api_key='test-key')
+    results = generator.generate_all_content(text='test', mode='single')
+    
+    assert mock_client.chat.completions.create.call_count == 7
+    assert 'summary' in results and 'flashcards' in results
+
+
+@pytest.mark.unit
+def test_resolve_generation_mode(demo_mode_true, monkeypatch):
+    """Üretim modu parametre, plan ve metin uzunluğuna göre seçilir"""
+    generator = AIGenerator()
+    monkeypatch.setattr('config.Config.AI_GENERATION_MODE', 'auto')
+    monkeypatch.setattr('config.Config.AI_SINGLE_CALL_MAX_CHARS', 100)
+    
+    assert generator.resolve_generation_mode('x' * 50) == 'single'
+    assert generator.resolve_generation_mode('x' * 500) == 'fanout'
+    assert generator.resolve_generation_mode('x' * 50, mode='fanout') == 'fanout'
+    
+    monkeypatch.setitem(Config.SUBSCRIPTION_PLANS['premium']['features'], 'generation_mode', 'single')
+    assert generator.resolve_generation_mode('x' * 500, user_plan='premium') == 'single'
+    
+    monkeypatch.setattr('config.Config.AI_GENERATION_MODE', 'unknown')
+    assert generator.resolve_generation_mode('x') == 'fanout'
+
+
+@pytest.mark.unit
+def test_generate_all_content_chunked_respects_counts(demo_mode_true, monkeypatch):
+    """Bölümlü üretimde toplam sayılar seviye ayarlarını aşmaz ve her bölüm temsil edilir"""
+    monkeypatch.setattr('config.Config.AI_CHUNK_MAX_TOKENS', 100)
+    monkeypatch.setattr('config.Config.AI_MAX_CHUNKS', 3)
+    generator = AIGenerator()
+    
+    chunk_calls = []
+    original = generator._generate_for_counts
+    
+    def tracking_generate(text, question_count, flashcard_count, *args):
+        chunk_calls.append((question_count, flashcard_count))
+        return original(text, question_count, flashcard_count, *args)
+    
+    monkeypatch.setattr(generator, '_generate_for_counts', tracking_generate)
+    
+    long_text = ' '.join(f'Bölüm cümlesi {i}.' for i in range(300))
+    results = generator.generate_all_content_chunked(long_text, level='elementary', user_plan='premium')
+    
+    level_count = Config.LEVEL_SETTINGS['elementary']['questions_per_type']
+    assert len(chunk_calls) == 3
+    assert sum(q for q, _ in chunk_calls) == level_count
+    assert sum(f for _, f in chunk_calls) == level_count * 2
+    assert len(results['multiple_choice']) <= level_count
+    assert len(results['flashcards']) <= level_count * 2
+    assert isinstance(results['summary'], str)
+
+
+@pytest.mark.unit
+@patch('services.ai_generator.OpenAI')
+def test_generate_all_content_applies_plan_limits(mock_openai_class, demo_mode_false, monkeypatch):
+    """Plan limiti soru sayısına ve çıktı token tavanına yansımalı; limitsiz planda seviye sayısı kullanılmalı"""
+    from services.ai_generator import (resolve_generation_counts, OUTPUT_TOKENS_PER_ITEM, OUTPUT_TOKENS_OVERHEAD,
+                                       OUTPUT_TOKENS_SAFETY_MARGIN)
+    monkeypatch.setattr('config.Config.AI_CONCURRENT_GENERATION', False)
+    monkeypatch.setattr('config.Config.AI_OUTPUT_TOKEN_CAPS', True)
+    mock_client = MagicMock()
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = '[]'
+    mock_client.chat.completions.create.return_value = mock_response
+    mock_openai_class.return_value = mock_client
+    
+    level_count = Config.LEVEL_SETTINGS['exam_prep']['questions_per_type']
+    free_limit = Config.get_plan_limit('free', 'max_questions_per_type')
+    assert resolve_generation_counts('exam_prep', 'free') == (free_limit, level_count * 2)
+    assert resolve_generation_counts('exam_prep', 'premium') == (level_count, level_count * 2)
+    
+    generator = AIGenerator(api_key='test-key')
+    generator.generate_all_content(text='test metin', level='exam_prep', user_plan='free', mode='fanout')
+    
+    calls = [call.kwargs for call in mock_client.chat.completions.create.call_args_list]
+    mcq_call = next(kwargs for kwargs in calls if 'çoktan seçmeli' in kwargs['messages'][1]['content'].lower())
+    assert f"{free_limit} adet" in mcq_call['messages'][1]['content']
+    assert mcq_call['max_tokens'] == math.ceil(
+        (OUTPUT_TOKENS_PER_ITEM['multiple_choice'] * free_limit + OUTPUT_TOKENS_OVERHEAD) * OUTPUT_TOKENS_SAFETY_MARGIN)
+    # Özet öğe sayısına bağlı değildir, tavan uygulanmaz
+    assert 'max_tokens' not in calls[0]
+
+
+@pytest.mark.unit
+@patch('services.ai_generator.OpenAI')
+def test_output_token_cap_clamped_to_model_limit(mock_openai_class, demo_mode_false, monkeypatch):
+    """Tavan modelin çıktı sınırını aşmamalı; sınır model adının önekinden belirlenmeli"""
+    from services.ai_generator import resolve_generation_counts
+    monkeypatch.setattr('config.Config.AI_OUTPUT_TOKEN_CAPS', True)
+    monkeypatch.setattr('config.Config.AI_MAX_OUTPUT_TOKENS', 0)
+    questions, flashcards = resolve_generation_counts('exam_prep', 'premium')
+    counts = {key: questions for key in ('multiple_choice', 'short_answer', 'fill_blank', 'true_false')}
+    
+    generator = AIGenerator(api_key='test-key', model='gpt-4.1-mini-2025-04-14')
+    assert generator._output_token_cap(counts, flashcards=flashcards, summary=True) <= 32768
+    assert generator._output_token_cap({'multiple_choice': 1}) < 1000
+    
+    assert AIGenerator(api_key='test-key', model='gpt-4o-mini')._model_output_limit() == 16384
+    assert AIGenerator(api_key='test-key', model='gpt-3.5-turbo')._model_output_limit() == 4096
+    monkeypatch.setattr('config.Config.AI_MAX_OUTPUT_TOKENS', 8000)
+    assert generator._output_token_cap(counts, flashcards=flashcards, summary=True) == 8000
+
+
+@pytest.mark.unit
+@patch('services.ai_generator.OpenAI')
+def test_truncated_response_retried_once_without_cap(mock_openai_class, demo_mode_false):
+    """Tavanda kesilen yanıt (finish_reason='length') bir kez tavansız yeniden istenmeli"""
+    truncated = MagicMock()
+    truncated.choices = [MagicMock(finish_reason='length')]
+    truncated.choices[0].message.content = '[{"front": "Ön"'
+    complete = MagicMock()
+    complete.choices = [MagicMock(finish_reason='stop')]
+    complete.choices[0].message.content = '[]'
+    mock_client = MagicMock()
+    mock_client.chat.completions.create.side_effect = [truncated, complete, truncated, truncated]
+    mock_openai_class.return_value = mock_client
+    generator = AIGenerator(api_key='test-key')
+    
+    assert generator._call_openai('prompt', max_tokens=500) == '[]'
+    calls = [call.kwargs for call in mock_client.chat.completions.create.call_args_list]
+    assert calls[0]['max_tokens'] == 500
+    assert 'max_tokens' not in calls[1]
+    
+    # İkinci deneme de kesilirse yeniden denenmez; kesik metin ayrıştırıcıya bırakılır
+    assert generator._call_openai('prompt', max_tokens=500) == '[{"front": "Ön"'
+    assert mock_client.chat.completions.create.call_count == 4
+
+
+@pytest.mark.unit
+@patch('services.ai_generator.OpenAI')
+def test_document_first_layout_shares_prompt_prefix(mock_openai_class, demo_mode_false, monkeypatch):
+    """document_first yerleşiminde tüm çağrılar aynı sistem + metin önekiyle başlamalı, önbellek token'ları sayılmalı"""
+    monkeypatch.setattr('config.Config.AI_CONCURRENT_GENERATION', False)
+    monkeypatch.setattr('config.Config.AI_PROMPT_LAYOUT', 'document_first')
+    mock_client = MagicMock()
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = '[]'
+    mock_response.usage.prompt_tokens = 1500
+    mock_response.usage.prompt_tokens_details.cached_tokens = 1024
+    mock_response.usage.completion_tokens = 200
+    mock_client.chat.completions.create.return_value = mock_response
+    mock_openai_class.return_value = mock_client
+    
+    generator = AIGenerator(api_key='test-key')
+    generator.generate_all_content(text='Doküman metni {süslü}', level='elementary', mode='fanout')
+    
+    calls = [call.kwargs['messages'] for call in mock_client.chat.completions.create.call_args_list]
+    assert len(calls) == 6
+    prefixes = {json.dumps(messages[:2], ensure_ascii=False) for messages in calls}
+    assert len(prefixes) == 1
+    assert calls[0][1]['content'].endswith('Doküman metni {süslü}')
+    # Talimatlar metni tekrar etmez, yukarıdaki mesaja atıf yapar
+    assert all('Doküman metni' not in messages[2]['content'] for messages in calls)
+    
+    usage = generator.get_usage_stats()
+    assert usage['layout'] == 'document_first'
+    assert usage['document_first']['calls'] == 6
+    assert usage['document_first']['cached_tokens'] == 6 * 1024
+    assert usage['document_first']['cached_ratio'] == round(1024 / 1500, 4)
+    assert usage['instructions_first']['calls'] == 0
+
+
+@pytest.mark.unit
+def test_merge_balanced_and_distribute_count():
+    """Dağıtım ve dengeli birleştirme yardımcıları"""
+    from services.ai_generator import _distribute_count, _merge_balanced
+    
+    counts = _distribute_count(10, [1, 1, 2])
+    assert sum(counts) == 10
+    assert counts[2] == 5
+    assert _distribute_count(5, [1, 1, 1, 1, 1, 1]).count(0) == 1
+    
+    merged = _merge_balanced([['a1', 'a2', 'a3', 'a4'], ['b1'], ['c1', 'c2']], 5)
+    # Her bölümden sırayla seçilir, sonuç doküman sırasındadır
+    assert merged == ['a1', 'a2', 'b1', 'c1', 'c2']
+
+
+@pytest.mark.unit
+def test_language_parameter_does_not_mutate_generator(demo_mode_true):
+    """language parametresi paylaşılan generator'ın varsayılan dilini değiştirmemeli"""
+    generator = AIGenerator(language='tr')
+    summary = generator.generate_summary(text='test', level='high_school', language='en')
+    
+    assert isinstance(summary, str)
+    assert generator.language == 'tr'
+    assert generator.prompts is PROMPT_TEMPLATES['tr']
+
+
+@pytest.mark.unit
+@patch('services.ai_generator.OpenAI')
+def test_call_openai_uses_requested_language_system_prompt(mock_openai_class, demo_mode_false):
+    """Sistem prompt'u örnek dilinden değil çağrı dilinden seçilmeli"""
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = 'ok'
+    mock_openai_class.return_value.chat.completions.create.return_value = mock_response
+    
+    generator = AIGenerator(language='tr')
+    generator._call_openai('prompt', language='en')
+    
+    messages = mock_openai_class.return_value.chat.completions.create.call_args.kwargs['messages']
+    assert messages[0]['content'] == PROMPT_TEMPLATES['en']['system']
+
+
+@pytest.mark.unit
+def test_get_shared_generator_reuses_instance(demo_mode_true, monkeypatch):
+    """Paylaşılan generator aynı ayarlarla tekrar oluşturulmamalı"""
+    monkeypatch.setattr('services.ai_generator._shared_generator', None)
+    first = get_shared_generator()
+    
+    assert get_shared_generator() is first
+    
+    monkeypatch.setattr('config.Config.OPENAI_MODEL', 'other-model')
+    assert get_shared_generator() is not first
+
+
+@pytest.mark.unit
+def test_connection_stats(demo_mode_true):
+    """Bağlantı istatistikleri havuz limitlerini ve yeniden kullanımı içermeli"""
+    generator = AIGenerator()
+    request = MagicMock()
+    request.extensions = {}
+    
+    generator._on_request(request)
+    request.extensions['trace']('connection.connect_tcp.complete', {})
+    generator._on_request(request)
+    
+    stats = generator.get_connection_stats()
+    assert stats['max_connections'] == Config.AI_HTTP_MAX_CONNECTIONS
+    assert stats['max_keepalive_connections'] == Config.AI_HTTP_MAX_KEEPALIVE
+    assert stats['requests'] == 2
+    assert stats['new_connections'] == 1
+    assert stats['reused_connections'] == 1
+    assert generator.warm_up() is True
@@ -2,9 +2,12 @@
 DocumentReader servis testleri
 """
 
+import codecs
 import pytest
 import os
 import tempfile
+import time
+from unittest.mock import patch
 from services.document_reader import DocumentReader
 
 
@@ -53,6 +56,135 @@ def test_extract_text_from_pptx(sample_pptx_path):
     assert 'Slayt' in text or 'test' in text.lower() or 'Test' in text or 'content' in text.lower()
 
 
+@pytest.mark.unit
+def test_extract_text_from_docx_document_order(tmp_path):
+    """DOCX akış okuyucusu tablo metnini doküman içindeki yerinde vermeli"""
+    from docx import Document
+    
+    docx_path = str(tmp_path / 'ordered.docx')
+    doc = Document()
+    doc.add_paragraph('Giriş paragrafı')
+    table = doc.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = 'Hücre A'
+    table.cell(0, 1).text = 'Hücre B'
+    doc.add_paragraph('Sonuç paragrafı')
+    doc.save(docx_path)
+    
+    assert DocumentReader.extract_text_from_docx(docx_path) == 'Giriş paragrafı\nHücre A\nHücre B\nSonuç paragrafı'
+    
+    info = {}
+    DocumentReader.extract_text_from_docx(docx_path, max_tokens=1, info=info)
+    assert info['stopped_early'] is True
+
+
+@pytest.mark.unit
+def test_extract_text_from_pptx_matches_object_model(sample_pptx_path):
+    """PPTX akış okuyucusu nesne modeliyle aynı metni ve slayt bilgisini vermeli"""
+    info = {}
+    text = DocumentReader.extract_text_from_pptx(sample_pptx_path, info=info)
+    
+    assert text == DocumentReader.extract_text_from_pptx_object_model(sample_pptx_path)
+    assert info['boilerplate']['lines_removed'] == 0
+    assert {key: info[key] for key in ('pages_total', 'pages_read', 'pages_skipped', 'stopped_early')} == \
+        {'pages_total': 1, 'pages_read': 1, 'pages_skipped': 0, 'stopped_early': False}
+
+
+@pytest.mark.unit
+def test_section_index_docx_and_pptx(tmp_path):
+    """Başlık stilleri ve slayt başlıkları son metindeki ofsetlerle bölüm dizinine yazılmalı"""
+    from docx import Document
+    from pptx import Presentation
+    
+    docx_path = str(tmp_path / 'outline.docx')
+    doc = Document()
+    doc.add_heading('Ünite 1 Hücre', 1)
+    doc.add_paragraph('Hücre canlıların yapı ve görev birimidir. ' * 2)
+    doc.add_heading('Hücre Zarı', 2)
+    doc.add_paragraph('Hücre zarı seçici geçirgendir.')
+    doc.add_heading('Ünite 2 Doku', 1)
+    doc.add_paragraph('Doku benzer hücrelerin oluşturduğu topluluktur.')
+    doc.save(docx_path)
+    
+    info = {}
+    text, error = DocumentReader.extract_text_from_file(docx_path, 'docx', info=info)
+    assert error is None
+    assert [(s['heading'], s['level'], s['page']) for s in info['sections']] == [
+        ('Ünite 1 Hücre', 1, None), ('Hücre Zarı', 2, None), ('Ünite 2 Doku', 1, None)
+    ]
+    unit_1, membrane, unit_2 = info['sections']
+    assert text[membrane['start']:membrane['end']] == 'Hücre Zarı Hücre zarı seçici geçirgendir.'
+    assert unit_1['end'] == membrane['end'] == unit_2['start'] - 1
+    assert text[unit_2['start']:unit_2['end']] == 'Ünite 2 Doku Doku benzer hücrelerin oluşturduğu topluluktur.'
+    
+    pptx_path = str(tmp_path / 'outline.pptx')
+    prs = Presentation()
+    for title, body in [('Mitoz', 'Mitoz bölünmede kromozom sayısı korunur.'),
+                        ('Mayoz', 'Mayoz bölünmede kromozom sayısı yarıya iner.')]:
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = title
+        slide.placeholders[1].text = body
+    prs.save(pptx_path)
+    
+    info = {}
+    text, error = DocumentReader.extract_text_from_file(pptx_path, 'pptx', info=info)
+    assert [(s['heading'], s['page']) for s in info['sections']] == [('Mitoz', 1), ('Mayoz', 2)]
+    assert text[info['sections'][1]['start']:info['sections'][1]['end']] == \
+        'Slayt 2: Mayoz Mayoz bölünmede kromozom sayısı yarıya iner.'
+
+
+@pytest.mark.unit
+def test_pptx_table_after_title_is_not_title(tmp_path):
+    """Başlıktan sonra gelen tablo ve grup şeklinin metni slayt başlığına karışmamalı"""
+    from pptx import Presentation
+    from pptx.util import Inches
+    
+    pptx_path = str(tmp_path / 'table.pptx')
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[5])
+    slide.shapes.title.text = 'Hücre Organelleri'
+    table = slide.shapes.add_table(2, 2, Inches(1), Inches(2), Inches(6), Inches(1)).table
+    for row, (organelle, task) in enumerate([('Organel', 'Görev'), ('Ribozom', 'Protein sentezi')]):
+        table.cell(row, 0).text = organelle
+        table.cell(row, 1).text = task
+    group = slide.shapes.add_group_shape()
+    group.shapes.add_textbox(Inches(1), Inches(4), Inches(4), Inches(1)).text_frame.text = 'Mitokondri enerji üretir.'
+    prs.save(pptx_path)
+    
+    info = {}
+    text, error = DocumentReader.extract_text_from_file(pptx_path, 'pptx', info=info)
+    assert error is None
+    assert [section['heading'] for section in info['sections']] == ['Hücre Organelleri']
+    assert text.startswith('Slayt 1: Hücre Organelleri Organel')
+    assert 'Ribozom' in text and 'Mitokondri enerji üretir.' in text
+
+
+@pytest.mark.unit
+def test_detect_heading_level():
+    """PDF satırları için başlık tahmini"""
+    assert DocumentReader.detect_heading_level('ÜNİTE 3 KALITIM') == 1
+    assert DocumentReader.detect_heading_level('Bölüm IV Ekosistem') == 1
+    assert DocumentReader.detect_heading_level('1.2 Hücre Zarı') == 2
+    assert DocumentReader.detect_heading_level('2. Sitoplazma') == 1
+    assert DocumentReader.detect_heading_level('1. Hücre zarı seçici geçirgendir.') is None
+    assert DocumentReader.detect_heading_level('Hücre zarı seçici geçirgendir') is None
+    assert DocumentReader.detect_heading_level('12') is None
+
+
+@pytest.mark.unit
+def test_benchmark_office_extraction(sample_docx_path, sample_pptx_path):
+    """Benchmark iki okuyucu için süre ve tepe bellek raporlamalı"""
+    from services.document_reader import benchmark_office_extraction
+    
+    report = benchmark_office_extraction([sample_docx_path, sample_pptx_path])
+    
+    assert set(report) == {'streaming', 'object_model'}
+    for row in report.values():
+        assert row['files'] == 2
+        assert row['errors'] == 0
+        assert row['peak_memory_mb'] >= 0
+    assert report['streaming']['chars'] == report['object_model']['chars']
+
+
 @pytest.mark.unit
 def test_extract_text_from_txt(sample_txt_path):
     """TXT okuma testi"""
@@ -80,6 +212,94 @@ def test_extract_text_from_txt_different_encodings(tmp_path):
     assert 'test' in text_latin1.lower() or 'content' in text_latin1.lower()
 
 
+@pytest.mark.unit
+def test_extract_text_from_txt_detects_turkish_encoding(tmp_path):
+    """UTF-8 olmayan Türkçe metin cp1254 olarak çözülmeli; BOM metne girmemeli"""
+    cp1254_path = tmp_path / 'cp1254.txt'
+    cp1254_path.write_bytes('Ağaç, şişe ve ılık çorba.'.encode('cp1254'))
+    info = {}
+    assert DocumentReader.extract_text_from_txt(str(cp1254_path), info=info) == 'Ağaç, şişe ve ılık çorba.'
+    assert info['encoding'] == 'cp1254'
+    
+    bom_path = tmp_path / 'bom.txt'
+    bom_path.write_bytes(codecs.BOM_UTF8 + 'Başlık'.encode('utf-8'))
+    assert DocumentReader.extract_text_from_txt(str(bom_path)) == 'Başlık'
+
+
+@pytest.mark.unit
+def test_extract_text_from_txt_streaming_normalization(tmp_path):
+    """Parça parça normalleştirme clean_text ile aynı sonucu vermeli; bütçe dolunca okuma durmalı"""
+    raw = ('Çevre   ve\r\n\r\n\tcanlılar   ilişkisi. ' * 500).encode('utf-8')
+    txt_path = tmp_path / 'notes.txt'
+    txt_path.write_bytes(raw)
+    expected = DocumentReader.clean_text(raw.decode('utf-8'))
+    
+    with patch.object(DocumentReader, 'TXT_CHUNK_BYTES', 7), patch.object(DocumentReader, 'TXT_MMAP_MIN_BYTES', 1):
+        assert DocumentReader.extract_text_from_txt(str(txt_path), normalize=True) == expected
+        
+        info = {}
+        partial = DocumentReader.extract_text_from_txt(str(txt_path), max_tokens=20, info=info, normalize=True)
+        assert info['stopped_early'] is True
+        assert len(partial) < len(expected)
+        assert DocumentReader.truncate_text(partial, 20) == DocumentReader.truncate_text(expected, 20)
+
+
+@pytest.mark.unit
+def test_iter_without_boilerplate_strips_repeated_edges():
+    """Her sayfada tekrarlanan üst/alt bilgi ve sayfa numarası atılmalı, gövde korunmalı"""
+    topics = ['hücre', 'doku', 'organ', 'sistem', 'enzim', 'gen', 'kromozom', 'mitoz', 'mayoz', 'ekoloji', 'evrim', 'protein']
+    pages = [f"Biyoloji 9 - Ders Notları\n{topic.title()} konusu anlatımı.\n{topic} örnekleri ve soruları.\n"
+             f"© 2024 Yayınevi\n{i + 1}" for i, topic in enumerate(topics)]
+    info = {}
+    cleaned = list(DocumentReader.iter_without_boilerplate(pages, info, enabled=True))
+    
+    assert len(cleaned) == 12
+    assert cleaned[3] == "Sistem konusu anlatımı.\nsistem örnekleri ve soruları."
+    assert info['boilerplate']['lines_removed'] == 36
+    assert info['boilerplate']['chars_saved'] > 0
+    assert info['boilerplate']['tokens_saved'] == info['boilerplate']['chars_saved'] // 4
+
+
+@pytest.mark.unit
+def test_iter_without_boilerplate_keeps_rare_lines():
+    """Az tekrarlanan satırlar ve kapalı ayar metni değiştirmemeli"""
+    pages = ["Özet\nBirinci bölümün özeti.", "Özet\nİkinci bölümün özeti.", "Giriş\nÜçüncü sayfa."]
+    assert list(DocumentReader.iter_without_boilerplate(pages, enabled=True)) == pages
+    
+    repeated = ["Başlık\nMetin"] * 5
+    assert list(DocumentReader.iter_without_boilerplate(repeated, enabled=False)) == repeated
+
+
+@pytest.mark.unit
+def test_extraction_limits(tmp_path):
+    """Sayfa sınırı ve çıkarma süresi aşımı açık bir hata mesajıyla reddedilmeli"""
+    pytest.importorskip('reportlab')
+    from reportlab.pdfgen import canvas
+    from config import Config
+    from services.document_reader import DocumentLimitError
+    
+    pdf_path = str(tmp_path / 'long.pdf')
+    c = canvas.Canvas(pdf_path)
+    for page in range(3):
+        c.drawString(50, 780, f"Sayfa {page}: uzun belge sınır kontrolü için örnek metin satırı.")
+        c.showPage()
+    c.save()
+    
+    with patch.object(Config, 'DOCUMENT_MAX_PAGES', 2):
+        text, error = DocumentReader.extract_text_from_file(pdf_path, 'pdf')
+    assert text == ''
+    assert error == 'Dosya çok fazla sayfa içeriyor (3, en fazla 2).'
+    
+    def slow_pages():
+        for page in range(3):
+            time.sleep(0.02)
+            yield f'sayfa {page}'
+    
+    with pytest.raises(DocumentLimitError):
+        list(DocumentReader._iter_with_deadline(slow_pages(), seconds=0.01))
+    assert len(list(DocumentReader._iter_with_deadline(slow_pages(), seconds=0))) == 3
+
+
 @pytest.mark.unit
 def test_clean_text():
     """Metin temizleme testi"""
@@ -99,6 +319,57 @@ def test_extract_text_from_file_pdf(sample_pdf_path):
     assert len(text) > 0
 
 
+@pytest.mark.unit
+def test_extract_text_from_file_in_memory(sample_pdf_path, sample_docx_path, sample_pptx_path, sample_txt_path):
+    """Bellekteki içerik (bytes/BytesIO) dosya yolu ile aynı metni vermeli"""
+    import io
+    for path, extension in [(sample_pdf_path, 'pdf'), (sample_docx_path, 'docx'),
+                            (sample_pptx_path, 'pptx'), (sample_txt_path, 'txt')]:
+        with open(path, 'rb') as f:
+            content = f.read()
+        
+        expected = DocumentReader.extract_text_from_file(path, extension)
+        assert DocumentReader.extract_text_from_file(content, extension) == expected
+        
+        stream = io.BytesIO(content)
+        stream.seek(len(content))  # Okuyucu akışı başa sarmalı
+        assert DocumentReader.extract_text_from_file(stream, extension) == expected
+
+
+@pytest.mark.unit
+def test_extract_text_from_pdf_stops_at_token_budget(tmp_path):
+    """Token bütçesi dolunca kalan sayfalar okunmamalı; kısaltılmış sonuç tamamını okumakla aynı olmalı"""
+    pytest.importorskip('reportlab')
+    from reportlab.pdfgen import canvas
+    
+    pdf_path = tmp_path / 'book.pdf'
+    c = canvas.Canvas(str(pdf_path))
+    for page in range(20):
+        for line in range(20):
+            c.drawString(50, 780 - line * 30, f"Sayfa {page} satir {line}. Bu cumle token butcesini doldurmak icindir.")
+        c.showPage()
+    c.save()
+    
+    info = {}
+    partial, error = DocumentReader.extract_text_from_file(str(pdf_path), 'pdf', max_tokens=500, info=info)
+    full, _ = DocumentReader.extract_text_from_file(str(pdf_path), 'pdf')
+    
+    assert error is None
+    assert info['pages_total'] == 20
+    assert info['stopped_early'] is True
+    assert info['pages_read'] < 20
+    assert info['pages_read'] + info['pages_skipped'] == 20
+    # Üst/alt bilgi ileri okuması ayrıştırılan sayfalara sayılır, atlanan sayfalara değil
+    assert info['pages_parsed'] == min(20, info['pages_read'] + DocumentReader.BOILERPLATE_LOOKAHEAD)
+    assert DocumentReader.truncate_text(partial, max_tokens=500) == DocumentReader.truncate_text(full, max_tokens=500)
+    
+    info = {}
+    DocumentReader.extract_text_from_file(str(pdf_path), 'pdf', info=info)
+    assert info['pages_read'] == 20
+    assert info['pages_parsed'] == 20
+    assert info['pages_skipped'] == 0
+
+
 @pytest.mark.unit
 def test_extract_text_from_file_unsupported_format(tmp_path):
     """Desteklenmeyen format testi"""
@@ -136,3 +407,22 @@ def test_truncate_text_short_text():
     truncated = DocumentReader.truncate_text(short_text)
     assert truncated == short_text  # Kısaltma yapılmamalı
 
+
+
+@pytest.mark.unit
+def test_split_text_into_chunks():
+    """Bölümlere ayırma testi: limit korunur ve metin kaybolmaz"""
+    long_text = ' '.join(f'Cümle numarası {i} burada bitiyor.' for i in range(2000))
+    chunks = DocumentReader.split_text_into_chunks(long_text, max_tokens=500)
+    
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 500 * 4 for chunk in chunks)
+    assert ' '.join(chunks) == long_text
+
+
+@pytest.mark.unit
+def test_split_text_into_chunks_long_sentence():
+    """Limitten uzun tek cümle karakter sınırından bölünür"""
+    chunks = DocumentReader.split_text_into_chunks('a' * 1000, max_tokens=100)
+    assert [len(chunk) for chunk in chunks] == [400, 400, 200]
+    assert DocumentReader.split_text_into_chunks('Kısa metin.', max_tokens=100) == ['Kısa metin.']
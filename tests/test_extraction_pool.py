@@ -0,0 +1,159 @@
+"""
+Metin çıkarma işlem havuzu testleri
+"""
+
+import time
+import pytest
+from unittest.mock import patch
+from services.document_reader import DocumentReader
+from services.extraction_pool import (
+    ExtractionPool, RESOURCE_LIMITS_AVAILABLE, CPU_LIMIT_ERROR, MEMORY_LIMIT_ERROR, TIMEOUT_ERROR
+)
+
+
+def _busy_loop():
+    """CPU sınırına takılana kadar döner"""
+    while True:
+        pass
+
+
+def _allocate(megabytes):
+    """Verilen boyutta bellek ayırır"""
+    return len(bytearray(megabytes * 1024 * 1024))
+
+
+def _current_vm_mb():
+    """Bu işlemin sanal bellek boyutu (MB, Linux)"""
+    with open('/proc/self/statm') as f:
+        pages = int(f.read().split()[0])
+    import resource
+    return pages * resource.getpagesize() // (1024 * 1024)
+
+
+@pytest.fixture
+def pool():
+    """Testlerde hızlı başlaması için fork kullanan küçük havuz"""
+    extraction_pool = ExtractionPool(max_workers=1, cpu_time_limit=1, memory_limit_mb=0,
+                                     timeout=30, start_method='fork')
+    yield extraction_pool
+    extraction_pool.shutdown(wait=False)
+
+
+@pytest.mark.unit
+def test_extract_in_pool_matches_in_process(pool, sample_txt_path):
+    """Havuzda çıkarılan metin aynı işlemde çıkarılanla aynı olmalı"""
+    text, error = pool.extract(sample_txt_path, 'txt', key='job-1')
+    
+    assert (text, error) == DocumentReader.extract_text_from_file(sample_txt_path, 'txt')
+    
+    stats = pool.get_stats()
+    assert stats['submitted'] == 1
+    assert stats['completed'] == 1
+    assert stats['in_flight'] == 0
+    assert stats['started'] is True
+
+
+@pytest.mark.unit
+def test_extract_missing_file_returns_error(pool, tmp_path):
+    """Eksik dosya havuzu çökertmeden hata mesajı döndürmeli"""
+    text, error = pool.extract(str(tmp_path / 'missing.pdf'), 'pdf')
+    
+    assert text == ''
+    assert error is not None
+    assert pool.get_stats()['reader_errors'] == 1
+
+
+@pytest.mark.unit
+@pytest.mark.skipif(not RESOURCE_LIMITS_AVAILABLE, reason='resource modülü yok')
+def test_cpu_time_limit_stops_runaway_job(pool):
+    """CPU sınırını aşan iş durdurulmalı, havuz sonraki işleri çalıştırmaya devam etmeli"""
+    outcome = pool.run(_busy_loop)
+    
+    assert outcome['error'] == CPU_LIMIT_ERROR
+    assert pool.get_stats()['cpu_limit_exceeded'] == 1
+    
+    # Aynı havuz işlemi yeni bir bütçeyle çalışmaya devam eder
+    assert pool.run(_allocate, 1) == {'value': 1024 * 1024, 'error': None}
+
+
+@pytest.mark.unit
+@pytest.mark.skipif(not RESOURCE_LIMITS_AVAILABLE, reason='resource modülü yok')
+def test_memory_limit_stops_large_allocation():
+    """Bellek sınırını aşan ayırma MemoryError ile durdurulmalı"""
+    extraction_pool = ExtractionPool(max_workers=1, cpu_time_limit=10,
+                                     memory_limit_mb=_current_vm_mb() + 256, start_method='fork')
+    try:
+        outcome = extraction_pool.run(_allocate, 2048)
+        assert outcome['error'] == MEMORY_LIMIT_ERROR
+        assert extraction_pool.get_stats()['memory_limit_exceeded'] == 1
+    finally:
+        extraction_pool.shutdown(wait=False)
+
+
+@pytest.mark.unit
+def test_wall_clock_timeout(pool):
+    """Zaman aşımında çağıran beklemeyi bırakmalı"""
+    started = time.time()
+    outcome = pool.run(time.sleep, 1, timeout=0.1)
+    
+    assert outcome['error'] == TIMEOUT_ERROR
+    assert time.time() - started < 1
+    assert pool.get_stats()['timeouts'] == 1
+
+
+@pytest.mark.unit
+def test_parallel_pdf_extraction_matches_serial(tmp_path):
+    """Sayfa aralıklarıyla paralel okunan PDF seri çıkarmayla aynı metni vermeli"""
+    pytest.importorskip('reportlab')
+    from reportlab.pdfgen import canvas
+    
+    pdf_path = str(tmp_path / 'book.pdf')
+    c = canvas.Canvas(pdf_path)
+    for page in range(12):
+        for line in range(10):
+            c.drawString(50, 780 - line * 30, f"Sayfa {page} satir {line}. Paralel cikarma sira kontrolu.")
+        c.showPage()
+    c.save()
+    
+    serial = DocumentReader.extract_text_from_file(pdf_path, 'pdf')
+    extraction_pool = ExtractionPool(max_workers=2, cpu_time_limit=30, memory_limit_mb=0, start_method='fork',
+                                     parallel_min_bytes=1, pages_per_task=3)
+    try:
+        with patch('services.extraction_pool.os.cpu_count', return_value=4):
+            info = {}
+            assert extraction_pool.extract(pdf_path, 'pdf', info=info) == serial
+            assert info['parallel_tasks'] == 4
+            assert info['pages_read'] == 12
+            
+            # Bütçe dolunca kalan aralıklar okunmaz; kısaltılmış sonuç aynı kalır
+            info = {}
+            partial, error = extraction_pool.extract(pdf_path, 'pdf', max_tokens=100, info=info)
+            assert error is None
+            assert info['stopped_early'] is True
+            assert info['pages_skipped'] > 0
+            assert info['pages_read'] + info['pages_skipped'] == 12
+            assert DocumentReader.truncate_text(partial, 100) == DocumentReader.truncate_text(serial[0], 100)
+        
+        assert extraction_pool.get_stats()['parallel_extractions'] == 2
+    finally:
+        extraction_pool.shutdown(wait=False)
+
+
+
+@pytest.mark.unit
+def test_failed_job_extraction_cancels_pool_tasks(app):
+    """Çıkarma hata verirse işe ait kuyruktaki havuz görevleri iptal edilmeli"""
+    from types import SimpleNamespace
+    from app import extract_job_text, extraction_pool
+    
+    app.config['EXTRACTION_POOL_ENABLED'] = True
+    app.config['EXTRACTED_TEXT_CACHE_ENABLED'] = False
+    job = SimpleNamespace(id='job-1', file_hash='a' * 32, file_type='pdf', payload_path='/tmp/job-1.pdf')
+    try:
+        with patch.object(extraction_pool, 'extract', return_value=('', TIMEOUT_ERROR)), \
+                patch.object(extraction_pool, 'cancel') as cancel:
+            assert extract_job_text(job) == ('', TIMEOUT_ERROR)
+        cancel.assert_called_once_with('job-1')
+    finally:
+        app.config['EXTRACTION_POOL_ENABLED'] = False
+        app.config['EXTRACTED_TEXT_CACHE_ENABLED'] = True
@@ -0,0 +1,257 @@
+"""
+Arka plan iş kuyruğu testleri
+"""
+
+import io
+import time
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from models import db, ProcessingJob
+from services.job_queue import JobQueue, claim_job, claim_next_job, requeue_stale_jobs, new_job_id, complete_claimed_job, fail_job
+
+
+def _create_job(user, **overrides):
+    """Test için kuyrukta bekleyen iş oluşturur"""
+    values = dict(
+        id=new_job_id(),
+        user_id=user.id,
+        status=ProcessingJob.STATUS_QUEUED,
+        original_filename='notes.txt',
+        file_type='txt',
+        file_size=10,
+        file_hash='a' * 32,
+        user_level='high_school',
+        user_type='student',
+        language='tr'
+    )
+    values.update(overrides)
+    job = ProcessingJob(**values)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+@pytest.mark.unit
+def test_claim_job_only_once(db_session, user):
+    """Bir iş yalnızca bir kez alınabilmeli"""
+    job = _create_job(user)
+    
+    assert claim_job(job.id) is True
+    assert claim_job(job.id) is False
+    
+    db_session.refresh(job)
+    assert job.status == ProcessingJob.STATUS_RUNNING
+    assert job.attempts == 1
+    assert job.worker_id
+
+
+@pytest.mark.unit
+def test_claim_next_job_oldest_first(db_session, user):
+    """Kuyruktaki en eski iş önce alınmalı"""
+    older = _create_job(user, created_at=datetime.utcnow() - timedelta(minutes=5))
+    _create_job(user)
+    
+    assert claim_next_job() == older.id
+
+
+@pytest.mark.unit
+def test_requeue_stale_jobs(db_session, user):
+    """Yarım kalan işler yeniden kuyruğa alınmalı, deneme hakkı bitenler başarısız olmalı"""
+    started = datetime.utcnow() - timedelta(hours=1)
+    retry = _create_job(user, status=ProcessingJob.STATUS_RUNNING, started_at=started, attempts=1, payload_path='/tmp/x.txt')
+    exhausted = _create_job(user, status=ProcessingJob.STATUS_RUNNING, started_at=started, attempts=2, payload_path='/tmp/y.txt')
+    fresh = _create_job(user, status=ProcessingJob.STATUS_RUNNING, started_at=datetime.utcnow(), attempts=1)
+    # Uzun süredir çalışan ama canlılık sinyali gönderen iş yarım kalmış sayılmaz
+    alive = _create_job(user, status=ProcessingJob.STATUS_RUNNING, started_at=started, heartbeat_at=datetime.utcnow(),
+                        attempts=1, payload_path='/tmp/z.txt')
+    
+    assert requeue_stale_jobs(stale_seconds=60, max_attempts=2) == 2
+    
+    assert db_session.get(ProcessingJob, retry.id).status == ProcessingJob.STATUS_QUEUED
+    assert db_session.get(ProcessingJob, exhausted.id).status == ProcessingJob.STATUS_FAILED
+    assert db_session.get(ProcessingJob, fresh.id).status == ProcessingJob.STATUS_RUNNING
+    assert db_session.get(ProcessingJob, alive.id).status == ProcessingJob.STATUS_RUNNING
+
+
+@pytest.mark.unit
+def test_requeued_job_cannot_be_completed_by_previous_worker(db_session, user):
+    """Yeniden kuyruğa alınıp tekrar alınan işi eski sahibi tamamlayamaz ve başarısız işaretleyemez"""
+    job = _create_job(user, payload_path='/tmp/x.txt')
+    assert claim_job(job.id)
+    first_claim = db_session.get(ProcessingJob, job.id).worker_id
+    
+    db_session.get(ProcessingJob, job.id).heartbeat_at = datetime.utcnow() - timedelta(hours=1)
+    db_session.commit()
+    assert requeue_stale_jobs(stale_seconds=60, max_attempts=3) == 1
+    assert claim_job(job.id)
+    second_claim = db_session.get(ProcessingJob, job.id).worker_id
+    assert second_claim != first_claim
+    
+    assert fail_job(db_session.get(ProcessingJob, job.id), 'eski worker hatası', first_claim) is False
+    assert db_session.get(ProcessingJob, job.id).status == ProcessingJob.STATUS_RUNNING
+    assert complete_claimed_job(job.id, first_claim) is False
+    assert complete_claimed_job(job.id, second_claim) is True
+    db_session.commit()
+    assert db_session.get(ProcessingJob, job.id).status == ProcessingJob.STATUS_COMPLETED
+
+
+@pytest.mark.unit
+def test_job_queue_runs_jobs_in_background(app, db_session, user):
+    """Worker thread'i kuyruğa eklenen işi çalıştırmalı ve istatistiklere yansıtmalı"""
+    def handler(job_id):
+        job = db.session.get(ProcessingJob, job_id)
+        job.status = ProcessingJob.STATUS_COMPLETED
+        db.session.commit()
+    
+    job = _create_job(user)
+    job_queue = JobQueue(app, handler, max_workers=1, poll_interval=0.05)
+    try:
+        job_queue.submit(job.id)
+        
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            db_session.expire_all()
+            if db_session.get(ProcessingJob, job.id).status == ProcessingJob.STATUS_COMPLETED:
+                break
+            time.sleep(0.05)
+        
+        assert db_session.get(ProcessingJob, job.id).status == ProcessingJob.STATUS_COMPLETED
+        assert job_queue.get_stats()['completed'] == 1
+    finally:
+        job_queue.stop()
+
+
+@pytest.mark.unit
+def test_job_queue_marks_failed_on_exception(app, db_session, user):
+    """Handler hatası işi başarısız olarak işaretlemeli"""
+    def handler(job_id):
+        raise RuntimeError('boom')
+    
+    job = _create_job(user)
+    job_queue = JobQueue(app, handler)
+    job_queue.submit(job.id, inline=True)
+    
+    db_session.expire_all()
+    failed = db_session.get(ProcessingJob, job.id)
+    assert failed.status == ProcessingJob.STATUS_FAILED
+    assert failed.error
+    assert job_queue.get_stats()['failed'] == 1
+
+
+@pytest.mark.integration
+@patch('app.emit_progress')
+def test_process_returns_job_id_for_json_clients(mock_emit, authenticated_client, user, demo_mode_true):
+    """JSON isteyen istemciye iş ID'si 202 ile dönmeli ve durum uç noktası sonucu göstermeli"""
+    from app import limiter
+    
+    limiter.reset()  # Önceki testlerin yükleme rate limit sayaçlarını temizle
+    data = {'file': (io.BytesIO(b'Ekosistem canlilar ve cevreden olusur. ' * 20), 'eco.txt'),
+            'level': 'high_school', 'user_type': 'student'}
+    response = authenticated_client.post('/process', data=data, content_type='multipart/form-data',
+                                         headers={'Accept': 'application/json'})
+    
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+    
+    status = authenticated_client.get(f'/jobs/{job_id}/status').get_json()
+    assert status['status'] == ProcessingJob.STATUS_COMPLETED
+    assert status['result_id'] is not None
+    
+    page = authenticated_client.get(status['result_url'])
+    assert page.status_code == 200
+    
+    # Yükleme dosyası iş bitince silinmeli
+    assert db.session.get(ProcessingJob, job_id).payload_path is None
+
+
+@pytest.mark.integration
+@patch('app.emit_progress')
+def test_job_not_completed_when_saving_result_fails(mock_emit, authenticated_client, user, demo_mode_true):
+    """Sonuç kaydı hata verirse iş tamamlanmış görünmemeli ve fiş düşülmemeli"""
+    from app import limiter
+    
+    limiter.reset()
+    user.last_token_refresh = datetime.utcnow()  # Aylık yenileme bakiyeyi değiştirmesin
+    db.session.commit()
+    tokens_before = user.tokens_remaining
+    data = {'file': (io.BytesIO(b'Fotosentez bitkilerde gerceklesir. ' * 20), 'bio.txt'),
+            'level': 'high_school', 'user_type': 'student'}
+    with patch('app.save_to_cache', side_effect=RuntimeError('disk dolu')):
+        response = authenticated_client.post('/process', data=data, content_type='multipart/form-data',
+                                             headers={'Accept': 'application/json'})
+    
+    job = db.session.get(ProcessingJob, response.get_json()['job_id'])
+    assert job.status == ProcessingJob.STATUS_FAILED
+    assert job.result_id is None
+    assert db.session.get(type(user), user.id).tokens_remaining == tokens_before
+
+
+@pytest.mark.integration
+@patch('app.emit_progress')
+def test_tokens_reserved_when_job_is_queued(mock_emit, authenticated_client, user, demo_mode_true):
+    """Bekleyen işler aynı bakiyeyle kuyruğa alınamamalı (fiş kuyruğa alınırken düşülür)"""
+    from app import limiter, job_queue
+    from utils import calculate_token_cost
+    
+    limiter.reset()
+    required = calculate_token_cost(user_plan=user.subscription_plan or 'free')
+    user.tokens_remaining = required
+    user.last_token_refresh = datetime.utcnow()  # Aylık yenileme bakiyeyi değiştirmesin
+    db.session.commit()
+    
+    def upload(name):
+        data = {'file': (io.BytesIO(f'{name} konusu hakkinda notlar. '.encode() * 20), f'{name}.txt'),
+                'level': 'high_school', 'user_type': 'student'}
+        return authenticated_client.post('/process', data=data, content_type='multipart/form-data')
+    
+    # İşler çalıştırılmadan kuyrukta bekler
+    with patch.object(job_queue, 'submit'):
+        first = upload('hucre')
+        second = upload('doku')
+    
+    assert '/jobs/' in first.headers['Location']
+    assert second.headers['Location'].endswith('/pricing')
+    job = ProcessingJob.query.filter_by(user_id=user.id).one()
+    assert job.tokens_reserved == required
+    assert db.session.get(type(user), user.id).tokens_remaining == 0
+    
+    # Başarısız iş ayrılan fişi iade eder
+    assert fail_job(job, 'hata') is True
+    assert db.session.get(type(user), user.id).tokens_remaining == required
+
+
+@pytest.mark.integration
+def test_completed_job_with_deleted_result_redirects_to_history(authenticated_client, db_session, user):
+    """Sonucu silinen tamamlanmış iş, durum sayfasına değil geçmişe yönlendirmeli"""
+    from utils import save_to_cache
+    
+    def save():
+        content = {'summary': 'Özet', 'multiple_choice': [], 'short_answer': [], 'fill_blank': [],
+                   'true_false': [], 'flashcards': []}
+        return save_to_cache('a' * 32, 'notes.txt', 'txt', 10, 'high_school', 'student', content,
+                             'gpt-test', 100, 1.0, user.id)
+    
+    job = _create_job(user, status=ProcessingJob.STATUS_COMPLETED, result_id=save().id)
+    # Aynı dosya tekrar yüklenince eski sonuç silinir, iş bağlantısı boşaltılır
+    save()
+    db_session.commit()
+    db_session.expire_all()
+    assert db_session.get(ProcessingJob, job.id).result_id is None
+    
+    response = authenticated_client.get(f'/jobs/{job.id}')
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/history')
+
+
+@pytest.mark.integration
+def test_job_status_other_user_not_found(client, user, premium_user):
+    """Kullanıcı başkasının işini göremez"""
+    job = _create_job(premium_user)
+    
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+    
+    assert client.get(f'/jobs/{job.id}/status').status_code == 404
+    assert client.get(f'/jobs/{job.id}').status_code == 404
@@ -0,0 +1,88 @@
+"""
+LLM yanıt önbelleği testleri
+"""
+
+import json
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from services.llm_cache import LLMResponseCache, build_cache_key
+
+
+def _key(prompt, temperature=0.7, **options):
+    return build_cache_key('gpt-test', 'sistem', prompt, temperature, 'v1', **options)
+
+
+@pytest.mark.unit
+def test_cache_layers_ttl_and_eviction(tmp_path, monkeypatch):
+    """Bellek LRU sınırı, diskten okuma, TTL ve boyut sınırı"""
+    path = str(tmp_path / 'llm.sqlite')
+    cache = LLMResponseCache(path, memory_entries=2, ttl=60, max_bytes=10 ** 6)
+    
+    # Anahtar her bileşene duyarlı, seçenekler (response_format, max_tokens) dahil
+    assert _key('a') != _key('a', temperature=0) != _key('a', max_tokens=100)
+    assert _key('a', max_tokens=None) == _key('a')
+    
+    for name in ('a', 'b', 'c'):
+        cache.set(_key(name), f'yanıt {name}')
+    assert cache.get(_key('c')) == 'yanıt c'
+    # 'a' bellekten atıldı ama SQLite katmanında duruyor
+    assert cache.get(_key('a')) == 'yanıt a'
+    assert cache.get(_key('yok')) is None
+    
+    stats = cache.get_stats()
+    assert (stats['memory_hits'], stats['disk_hits'], stats['misses']) == (1, 1, 1)
+    assert stats['memory_entries'] == 2
+    assert stats['disk_entries'] == 3
+    assert stats['hit_rate'] == round(2 / 3, 4)
+    
+    # Başka bir işlem (yeni örnek) aynı dosyadan okur; süresi dolan kayıt verilmez
+    other = LLMResponseCache(path, memory_entries=2, ttl=60)
+    assert other.get(_key('b')) == 'yanıt b'
+    now = time.time()
+    monkeypatch.setattr('services.llm_cache.time.time', lambda: now + 120)
+    assert other.get(_key('b')) is None
+    assert other.get_stats()['expired'] == 1
+    monkeypatch.undo()
+    
+    # Boyut sınırı aşılınca en uzun süredir okunmayan kayıtlar silinir
+    small = LLMResponseCache(str(tmp_path / 'small.sqlite'), memory_entries=1, ttl=0, max_bytes=100)
+    for index in range(40):
+        small.set(_key(str(index)), 'x' * 10)
+    stats = small.get_stats()
+    assert stats['evictions'] > 0
+    assert stats['disk_entries'] < 40
+
+
+@pytest.mark.unit
+@patch('services.ai_generator.OpenAI')
+def test_call_openai_uses_cache_only_when_opted_in(mock_openai_class, demo_mode_false, monkeypatch, tmp_path):
+    """Sıcaklığı 0'dan büyük çağrılar sadece açıkça izin verilirse önbellekten dönmeli"""
+    from services import llm_cache
+    from services.ai_generator import AIGenerator
+    monkeypatch.setattr('config.Config.LLM_CACHE_ENABLED', True)
+    monkeypatch.setattr('config.Config.LLM_CACHE_PATH', str(tmp_path / 'llm.sqlite'))
+    monkeypatch.setattr(llm_cache, '_shared_cache', None)
+    
+    mock_client = MagicMock()
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock(finish_reason='stop')]
+    mock_response.choices[0].message.content = json.dumps([{'front': 'Ön', 'back': 'Arka', 'topic': 'T'}])
+    mock_client.chat.completions.create.return_value = mock_response
+    mock_openai_class.return_value = mock_client
+    generator = AIGenerator(api_key='test-key')
+    
+    monkeypatch.setattr('config.Config.LLM_CACHE_SAMPLED_RESPONSES', False)
+    generator._call_openai('prompt', temperature=0.7)
+    generator._call_openai('prompt', temperature=0.7)
+    assert mock_client.chat.completions.create.call_count == 2
+    
+    monkeypatch.setattr('config.Config.LLM_CACHE_SAMPLED_RESPONSES', True)
+    first = generator._call_openai('prompt', temperature=0.7)
+    assert generator._call_openai('prompt', temperature=0.7) == first
+    assert mock_client.chat.completions.create.call_count == 3
+    
+    # Farklı dil (sistem prompt'u) farklı anahtar üretir
+    generator._call_openai('prompt', temperature=0.7, language='en')
+    assert mock_client.chat.completions.create.call_count == 4
+    assert llm_cache.get_llm_cache().get_stats()['memory_hits'] == 1
@@ -0,0 +1,173 @@
+"""
+Dayanıklı LLM çağrı katmanı testleri
+"""
+
+import threading
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from services.llm_resilience import (
+    CircuitBreaker, ResilientCaller, LLMCallError, CircuitOpenError, classify_error, backoff_delay,
+    ERROR_RATE_LIMIT, ERROR_SERVER, ERROR_CLIENT
+)
+
+
+class _StatusError(Exception):
+    """status_code taşıyan SDK hatası benzeri"""
+    
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f'HTTP {status_code}')
+        self.status_code = status_code
+        self.response = MagicMock(headers={'retry-after': retry_after} if retry_after else {})
+
+
+def _flaky(*outcomes):
+    """Sırayla verilen hataları yükselten, sonra 'ok' döndüren çağrı"""
+    remaining = list(outcomes)
+    
+    def call():
+        if remaining:
+            raise remaining.pop(0)
+        return 'ok'
+    return call
+
+
+@pytest.mark.unit
+def test_retries_classified_errors_with_backoff():
+    """429 / 5xx yeniden denenmeli, 4xx hemen yükseltilmeli; her deneme kaydedilmeli"""
+    assert classify_error(_StatusError(429)) == ERROR_RATE_LIMIT
+    assert classify_error(_StatusError(503)) == ERROR_SERVER
+    assert classify_error(_StatusError(400)) == ERROR_CLIENT
+    assert classify_error(TimeoutError()) == 'timeout'
+    assert all(0 <= backoff_delay(attempt, 1.0, 5.0) <= min(5.0, 2 ** attempt) for attempt in range(6))
+    assert backoff_delay(0, 1.0, 5.0, retry_after=3) >= 3
+    
+    caller = ResilientCaller(CircuitBreaker(failure_threshold=10), max_retries=3, base_delay=0.001, max_delay=0.01)
+    with patch('services.llm_resilience.time.sleep') as sleep:
+        assert caller.call(_flaky(_StatusError(429, retry_after='0.005'), _StatusError(502))) == 'ok'
+    assert sleep.call_count == 2
+    # Retry-After (üst sınır max_delay ile) ilk beklemenin alt sınırıdır
+    assert sleep.call_args_list[0].args[0] >= 0.005
+    
+    with pytest.raises(LLMCallError) as exc_info:
+        caller.call(_flaky(_StatusError(400)))
+    assert 'OpenAI API hatası' in str(exc_info.value)
+    assert exc_info.value.error_class == ERROR_CLIENT
+    assert len(exc_info.value.attempts) == 1
+    
+    stats = caller.get_stats()
+    assert (stats['calls'], stats['succeeded'], stats['failed']) == (2, 1, 1)
+    assert (stats['attempts'], stats['retries']) == (4, 2)
+    assert stats['errors'][ERROR_RATE_LIMIT] == 1 and stats['errors'][ERROR_CLIENT] == 1
+    assert all('seconds' in attempt for attempt in stats['recent_attempts'])
+    assert stats['latency_p95'] is not None
+
+
+@pytest.mark.unit
+def test_circuit_breaker_fails_fast_and_recovers(monkeypatch):
+    """Ardışık geçici hatalardan sonra devre açılmalı, süre dolunca tek deneme ile kapanmalı"""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    caller = ResilientCaller(breaker, max_retries=0)
+    
+    for _ in range(2):
+        with pytest.raises(LLMCallError):
+            caller.call(_flaky(_StatusError(500)))
+    assert breaker.get_stats()['state'] == 'open'
+    
+    provider = MagicMock(return_value='ok')
+    with pytest.raises(CircuitOpenError):
+        caller.call(provider)
+    provider.assert_not_called()
+    
+    now = time.monotonic()
+    monkeypatch.setattr('services.llm_resilience.time.monotonic', lambda: now + 31)
+    assert caller.call(provider) == 'ok'
+    assert breaker.get_stats() == {'state': 'closed', 'consecutive_failures': 0, 'opened': 1, 'rejected': 1}
+    assert caller.get_stats()['circuit_rejected'] == 1
+
+
+@pytest.mark.unit
+def test_half_open_trial_released_on_client_error_and_interrupt(monkeypatch):
+    """half_open deneme çağrısı 400 veya kesinti ile bitse de devre takılı kalmamalı"""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    caller = ResilientCaller(breaker, max_retries=0)
+    now = time.monotonic()
+    clock = [now]
+    monkeypatch.setattr('services.llm_resilience.time.monotonic', lambda: clock[0])
+    
+    with pytest.raises(LLMCallError):
+        caller.call(_flaky(_StatusError(500)))
+    assert breaker.get_stats()['state'] == 'open'
+    
+    # Deneme çağrısı istemci hatası aldı: sağlayıcı yanıt verdi, devre kapanır
+    clock[0] += 31
+    with pytest.raises(LLMCallError) as exc_info:
+        caller.call(_flaky(_StatusError(400)))
+    assert exc_info.value.error_class == ERROR_CLIENT
+    assert breaker.get_stats()['state'] == 'closed'
+    assert caller.call(MagicMock(return_value='ok')) == 'ok'
+    
+    # Deneme çağrısı yakalanmayan bir istisnayla kesildi: hak bırakılır, sonraki çağrı geçer
+    with pytest.raises(LLMCallError):
+        caller.call(_flaky(_StatusError(500)))
+    clock[0] += 31
+    with pytest.raises(KeyboardInterrupt):
+        caller.call(MagicMock(side_effect=KeyboardInterrupt))
+    assert caller.call(MagicMock(return_value='ok')) == 'ok'
+    
+    # Sonucu hiç kaydedilmeyen deneme reset_timeout sonra terk edilmiş sayılır
+    with pytest.raises(LLMCallError):
+        caller.call(_flaky(_StatusError(500)))
+    clock[0] += 31
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+    clock[0] += 31
+    assert breaker.allow() is True
+
+
+@pytest.mark.unit
+def test_hedged_request_returns_first_response():
+    """Yavaş deneme yedek istekle yarışmalı, ilk gelen yanıt kullanılmalı"""
+    calls = []
+    release = threading.Event()
+    
+    def slow_then_fast():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(2)
+            return 'slow'
+        return 'fast'
+    
+    caller = ResilientCaller(CircuitBreaker(), hedge_after=0.05)
+    started = time.time()
+    assert caller.call(slow_then_fast) == 'fast'
+    assert time.time() - started < 1
+    release.set()
+    
+    stats = caller.get_stats()
+    assert (stats['hedges'], stats['hedge_wins']) == (1, 1)
+    assert stats['recent_attempts'][-1]['hedged'] is True
+
+
+@pytest.mark.unit
+def test_rate_limit_wait_does_not_trigger_hedge():
+    """Hız sınırı beklemesi yedek istek süresine sayılmamalı; kapasite alınamazsa kesici açılmamalı"""
+    acquired = []
+    
+    def slow_acquire():
+        acquired.append(1)
+        time.sleep(0.2)
+    
+    caller = ResilientCaller(CircuitBreaker(failure_threshold=1), hedge_after=0.05)
+    assert caller.call(MagicMock(return_value='ok'), acquire=slow_acquire) == 'ok'
+    stats = caller.get_stats()
+    assert stats['hedges'] == 0
+    assert len(acquired) == 1
+    assert stats['recent_attempts'][-1]['seconds'] < 0.2
+    
+    provider = MagicMock(return_value='ok')
+    with pytest.raises(LLMCallError) as exc_info:
+        caller.call(provider, acquire=MagicMock(side_effect=RuntimeError('kapasite yok')))
+    assert 'kapasite yok' in str(exc_info.value)
+    provider.assert_not_called()
+    assert caller.get_stats()['circuit']['state'] == 'closed'
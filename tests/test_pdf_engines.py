@@ -0,0 +1,50 @@
+"""
+PDF motoru seçimi ve karşılaştırma testleri
+"""
+
+import pytest
+from unittest.mock import patch
+from services.document_reader import DocumentReader
+from services.pdf_engines import PDF_ENGINES, get_pdf_engine, available_engines, benchmark_engines
+
+
+@pytest.mark.unit
+def test_missing_engine_falls_back_to_pypdf():
+    """Kurulu olmayan veya bilinmeyen motor yerine pypdf kullanılmalı"""
+    with patch.object(PDF_ENGINES['pdfium'], 'available', False):
+        assert get_pdf_engine('pdfium').name == 'pypdf'
+    assert get_pdf_engine('unknown').name == 'pypdf'
+    assert 'pypdf' in available_engines()
+
+
+@pytest.mark.unit
+def test_configured_engine_is_used(sample_pdf_path):
+    """PDF_EXTRACTION_ENGINE ayarı varsayılan motoru belirlemeli"""
+    with patch('config.Config.PDF_EXTRACTION_ENGINE', 'unknown'):
+        info = {}
+        text, error = DocumentReader.extract_text_from_file(sample_pdf_path, 'pdf', info=info)
+        assert info['pdf_engine'] == 'pypdf'
+    
+    with patch('config.Config.PDF_EXTRACTION_ENGINE', 'pypdf'):
+        assert DocumentReader.get_extractor_version().endswith('+pypdf')
+
+
+@pytest.mark.unit
+def test_page_range_matches_full_iteration(sample_pdf_path):
+    """Sayfa aralığı okuma tüm sayfaları okumayla aynı metni vermeli"""
+    pages = list(DocumentReader.iter_pdf_pages(sample_pdf_path, engine='pypdf'))
+    
+    assert DocumentReader.count_pdf_pages(sample_pdf_path, engine='pypdf') == len(pages)
+    assert DocumentReader.extract_pdf_page_range(sample_pdf_path, 0, len(pages), engine='pypdf') == pages
+
+
+@pytest.mark.unit
+def test_benchmark_reports_throughput_and_similarity(sample_pdf_path):
+    """Karşılaştırma hız ve referansa benzerlik raporlamalı; eksik motor işaretlenmeli"""
+    with patch.object(PDF_ENGINES['pdfminer'], 'available', False):
+        report = benchmark_engines([sample_pdf_path], engines=['pypdf', 'pdfminer'])
+    
+    assert report['pdfminer'] == {'available': False}
+    assert report['pypdf']['pages'] >= 1
+    assert report['pypdf']['errors'] == 0
+    assert report['pypdf']['similarity'] == 1.0
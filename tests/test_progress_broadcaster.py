@@ -0,0 +1,77 @@
+"""
+SocketIO ilerleme yayıncısı testleri
+"""
+
+import pytest
+from unittest.mock import MagicMock
+from services.progress_broadcaster import ProgressBroadcaster, user_room, job_room
+
+
+@pytest.mark.unit
+def test_publish_coalesces_pending_events():
+    """Aynı oda ve olay için bekleyen eski olay yenisiyle değiştirilmeli"""
+    socketio = MagicMock()
+    broadcaster = ProgressBroadcaster(socketio)
+    
+    broadcaster.publish('progress', {'progress': 40}, job_room('abc'))
+    broadcaster.publish('progress', {'progress': 50}, job_room('abc'))
+    broadcaster.publish('job_status', {'status': 'completed'}, job_room('abc'))
+    broadcaster.publish('progress', {'progress': 5}, user_room(7))
+    broadcaster.flush()
+    
+    socketio.start_background_task.assert_called_once()
+    assert socketio.emit.call_count == 3
+    socketio.emit.assert_any_call('progress', {'progress': 50}, to='job:abc')
+    socketio.emit.assert_any_call('progress', {'progress': 5}, to='user:7')
+    
+    stats = broadcaster.get_stats()
+    assert stats['published'] == 4
+    assert stats['coalesced'] == 1
+    assert stats['emitted'] == 3
+    assert stats['pending'] == 0
+
+
+@pytest.mark.unit
+def test_flush_counts_emit_errors():
+    """Gönderim hatası yayıncıyı durdurmamalı"""
+    socketio = MagicMock()
+    socketio.emit.side_effect = RuntimeError('disconnected')
+    broadcaster = ProgressBroadcaster(socketio)
+    
+    broadcaster.publish('progress', {'progress': 10}, user_room(1))
+    broadcaster.flush()
+    
+    assert broadcaster.get_stats()['errors'] == 1
+
+
+@pytest.mark.integration
+def test_socket_joins_only_own_user_room(app, client, user, premium_user):
+    """Soket bağlantısı sadece giriş yapan kullanıcının odasına katılmalı"""
+    from app import socketio
+    from flask import g
+    
+    # Test app context'i bağlantılar arasında paylaşıldığından önbelleğe alınmış kullanıcıyı temizle
+    g.pop('_login_user', None)
+    with client.session_transaction() as sess:
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+    own_socket = socketio.test_client(app, flask_test_client=client)
+    
+    other_client = app.test_client()
+    with other_client.session_transaction() as sess:
+        sess['_user_id'] = str(premium_user.id)
+        sess['_fresh'] = True
+    g.pop('_login_user', None)
+    other_socket = socketio.test_client(app, flask_test_client=other_client)
+    
+    try:
+        rooms = socketio.server.manager.rooms['/']
+        own_members = set(rooms.get(user_room(user.id), {}).values())
+        other_members = set(rooms.get(user_room(premium_user.id), {}).values())
+        
+        assert own_socket.eio_sid in own_members
+        assert other_socket.eio_sid not in own_members
+        assert other_socket.eio_sid in other_members
+    finally:
+        own_socket.disconnect()
+        other_socket.disconnect()
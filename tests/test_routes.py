@@ -902,4 +902,98 @@ def test_process_rate_limit_reset(authenticated_client, monkeypatch):
     """Rate limit reset sonrası istek başarıyla işlenebilir."""
     # Simulate rate limit reset by mocking time if app uses it; otherwise just ensure request still works
     r = authenticated_client.post('/process', data={}, follow_redirects=False)
-    assert r.status_code in [200, 302]
\ No newline at end of file
+    assert r.status_code in [200, 302]
+
+@pytest.mark.integration
+def test_internal_stats_requires_token(client, app, monkeypatch, demo_mode_true):
+    """İstatistik uç noktası token olmadan erişilemez olmalı"""
+    monkeypatch.setitem(app.config, 'STATS_ACCESS_TOKEN', 'secret-token')
+    
+    assert client.get('/internal/stats').status_code == 404
+    assert client.get('/internal/stats', headers={'X-Stats-Token': 'wrong'}).status_code == 404
+    
+    response = client.get('/internal/stats', headers={'X-Stats-Token': 'secret-token'})
+    assert response.status_code == 200
+    assert 'openai_connection_pool' in response.get_json()
+
+
+@pytest.mark.integration
+@patch('app.emit_progress')
+def test_process_shared_cache_across_users(mock_emit, client, user, db_session, demo_mode_true):
+    """Aynı dosyayı yükleyen ikinci kullanıcı için model çağrılmadan sonuç kopyalanmalı"""
+    import io
+    from flask import g
+    from models import User, Document, UsageStats
+    from app import limiter
+    
+    limiter.reset()  # Önceki testlerin yükleme rate limit sayaçlarını temizle
+    other = User(email='other@example.com', username='otheruser', subscription_plan='free', tokens_remaining=10)
+    other.set_password('Test123!')
+    db_session.add(other)
+    db_session.commit()
+    
+    content = b'Fotosentez bitkilerin isik enerjisini kimyasal enerjiye donusturmesidir. ' * 20
+    
+    def upload(user_id, filename, **extra):
+        # Test app context'i istekler arasında paylaşıldığından önbelleğe alınmış kullanıcıyı temizle
+        g.pop('_login_user', None)
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user_id)
+            sess['_fresh'] = True
+        data = {'file': (io.BytesIO(content), filename), 'level': 'high_school', 'user_type': 'student', **extra}
+        return client.post('/process', data=data, content_type='multipart/form-data', follow_redirects=True)
+    
+    assert upload(user.id, 'chapter.txt').status_code == 200
+    
+    with patch('app.get_shared_generator') as mock_generator:
+        response = upload(other.id, 'same_chapter.txt')
+        assert response.status_code == 200
+        mock_generator.assert_not_called()
+    
+    other_doc = Document.query.filter_by(user_id=other.id).first()
+    assert other_doc is not None and len(other_doc.results) == 1
+    assert UsageStats.get_or_create().shared_cache_hits == 1
+
+
+@pytest.mark.integration
+@patch('app.emit_progress')
+def test_process_private_upload_not_shared(mock_emit, authenticated_client, user, demo_mode_true):
+    """Özel işaretlenen yüklemenin sonucu paylaşılan önbelleğe eklenmemeli"""
+    import io
+    from models import Document, SharedResultCache
+    from app import limiter
+    
+    limiter.reset()  # Önceki testlerin yükleme rate limit sayaçlarını temizle
+    data = {'file': (io.BytesIO(b'Gizli ders notlari. ' * 20), 'private.txt'), 'level': 'high_school',
+            'user_type': 'student', 'private_upload': '1'}
+    response = authenticated_client.post('/process', data=data, content_type='multipart/form-data', follow_redirects=True)
+    
+    assert response.status_code == 200
+    assert Document.query.filter_by(user_id=user.id).first().is_private is True
+    assert SharedResultCache.query.count() == 0
+
+
+@pytest.mark.integration
+@patch('app.emit_progress')
+@patch('app.check_user_tokens', return_value=(True, None, 100))
+def test_process_reuses_extracted_text_across_levels(mock_tokens, mock_emit, authenticated_client, user, demo_mode_true):
+    """Aynı dosya farklı seviyeyle yüklendiğinde yeniden ayrıştırılmamalı"""
+    import io
+    from services.document_reader import DocumentReader
+    from models import ExtractedTextCache, Document
+    from app import limiter
+    
+    limiter.reset()  # Önceki testlerin yükleme rate limit sayaçlarını temizle
+    content = b'Hucre zari secici gecirgen bir yapidir ve madde alisverisini duzenler. ' * 20
+    real_extract = DocumentReader.extract_text_from_file
+    
+    with patch('app.DocumentReader.extract_text_from_file', side_effect=real_extract) as mock_extract:
+        for level in ('middle_school', 'high_school'):
+            data = {'file': (io.BytesIO(content), 'cell.txt'), 'level': level, 'user_type': 'teacher'}
+            response = authenticated_client.post('/process', data=data, content_type='multipart/form-data', follow_redirects=True)
+            assert response.status_code == 200
+    
+    assert Document.query.filter_by(user_id=user.id).count() == 2
+    assert mock_extract.call_count == 1
+    assert ExtractedTextCache.query.one().hit_count == 1
+
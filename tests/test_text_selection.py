@@ -0,0 +1,60 @@
+"""
+Temsili metin seçimi testleri
+"""
+
+import pytest
+from services.text_selection import select_text, SELECTION_NOTE
+
+
+def _book(units=6, sentences=120):
+    """Her ünitesi farklı konuyu işleyen uzun metin ve bölüm dizini"""
+    topics = ['hücre zarı', 'fotosentez', 'kalıtım', 'ekosistem', 'sinir sistemi', 'sindirim']
+    parts = []
+    sections = []
+    offset = 0
+    for unit in range(units):
+        heading = f"Ünite {unit + 1} {topics[unit].title()}"
+        body = " ".join(f"{topics[unit].capitalize()} konusunun {index}. açıklaması örneklerle verilir."
+                        for index in range(sentences))
+        part = f"{heading} {body}"
+        sections.append({'heading': heading, 'level': 1, 'start': offset, 'end': offset + len(part), 'page': unit + 1})
+        parts.append(part)
+        offset += len(part) + 1
+    return " ".join(parts), sections
+
+
+@pytest.mark.unit
+def test_balanced_selection_covers_every_section():
+    """Dengeli seçim bütçeyi aşmadan her üniteden metin almalı; baştan kesme sadece ilk üniteleri görür"""
+    text, sections = _book()
+    
+    selected, info = select_text(text, 500, sections)
+    
+    assert info['strategy'] == 'balanced'
+    assert info['partition'] == 'sections'
+    assert info['sections_covered'] == info['sections_total'] == 6
+    assert info['coverage'] == 1.0
+    assert selected.endswith(SELECTION_NOTE)
+    assert len(selected) - len(SELECTION_NOTE) <= 500 * 4
+    for section in sections:
+        assert section['heading'] in selected
+    
+    head, head_info = select_text(text, 500, sections, strategy='head')
+    assert head_info['strategy'] == 'head'
+    assert head_info['coverage'] < 1.0
+    assert sections[-1]['heading'] not in head
+
+
+@pytest.mark.unit
+def test_selection_without_sections_and_short_text():
+    """Bölüm dizini yoksa eşit bloklar kapsanmalı; bütçeye sığan metin aynen dönmeli"""
+    text, _ = _book()
+    
+    selected, info = select_text(text, 500)
+    assert info['partition'] == 'blocks'
+    assert info['coverage'] == 1.0
+    assert 'Sindirim' in selected
+    
+    short = "Kısa bir metin."
+    assert select_text(short, 500) == (short, {'strategy': 'full', 'source_chars': len(short),
+                                                'selected_chars': len(short), 'coverage': 1.0})
@@ -10,11 +10,13 @@ from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock
 from utils import (
     get_file_hash, check_cache, save_to_cache, parse_cached_result, estimate_tokens,
-    validate_email_address, generate_username_from_email, validate_file_signature,
+    validate_email_address, generate_username_from_email, validate_file_signature, spool_upload,
     initialize_user_tokens, is_trial_active, refresh_monthly_tokens, calculate_token_cost,
     check_user_tokens, deduct_tokens, add_tokens, can_user_export, get_user_token_info,
     get_user_documents, increment_user_upload,
-    increment_user_cache_hit
+    increment_user_cache_hit, get_text_hash, build_shared_cache_key,
+    check_shared_cache, register_shared_cache, get_extracted_text, store_extracted_text,
+    evict_extracted_text_cache
 )
 import utils
 from models import User, Document, Result, UserUsageStats
@@ -97,6 +99,51 @@ def test_save_to_cache(db_session, user):
     assert result.document.user_id == user.id
 
 
+@pytest.mark.unit
+def test_get_text_hash_normalizes_whitespace():
+    """Metin hash'i boşluk farklarından etkilenmemeli"""
+    assert get_text_hash('Hücre  zarı\n\nseçici geçirgendir.') == get_text_hash(' Hücre zarı seçici geçirgendir. ')
+    assert get_text_hash('Hücre zarı') != get_text_hash('Hücre duvarı')
+
+
+@pytest.mark.unit
+def test_build_shared_cache_key(monkeypatch):
+    """Paylaşılan önbellek anahtarı tüm bileşenlere duyarlı olmalı"""
+    base = build_shared_cache_key('file:abc', 'high_school', 'student', 'tr', 'gpt-4.1-mini', 5)
+    
+    assert len(base) == 64
+    assert base == build_shared_cache_key('file:abc', 'high_school', 'student', 'tr', 'gpt-4.1-mini', 5)
+    assert base != build_shared_cache_key('file:abc', 'high_school', 'student', 'en', 'gpt-4.1-mini', 5)
+    assert base != build_shared_cache_key('file:abc', 'university', 'student', 'tr', 'gpt-4.1-mini', 5)
+    assert base != build_shared_cache_key('file:abc', 'high_school', 'student', 'tr', 'gpt-4.1', 5)
+    assert base != build_shared_cache_key('file:abc', 'high_school', 'student', 'tr', 'gpt-4.1-mini', None)
+    
+    # Metin seçim ayarları ve prompt sürümü değişince eski sonuçlar kullanılmamalı
+    for name, value in (('TEXT_SELECTION_STRATEGY', 'head'), ('AI_MAX_INPUT_TOKENS', 4000),
+                        ('TEXT_SELECTION_SOURCE_FACTOR', 2)):
+        with monkeypatch.context() as patched:
+            patched.setattr(Config, name, value)
+            assert base != build_shared_cache_key('file:abc', 'high_school', 'student', 'tr', 'gpt-4.1-mini', 5)
+    with monkeypatch.context() as patched:
+        patched.setattr('services.ai_generator.PROMPT_VERSION', 'changed')
+        assert base != build_shared_cache_key('file:abc', 'high_school', 'student', 'tr', 'gpt-4.1-mini', 5)
+
+
+@pytest.mark.unit
+def test_register_and_check_shared_cache(db_session, sample_result):
+    """Kaydedilen sonuç paylaşılan önbellekten bulunmalı ve hit sayılmalı"""
+    key = build_shared_cache_key('file:abc', 'high_school', 'student', 'tr', 'gpt-4.1-mini')
+    
+    assert check_shared_cache([key]) is None
+    
+    register_shared_cache(sample_result, [key])
+    db_session.commit()
+    
+    result = check_shared_cache(['unknown', key])
+    assert result.id == sample_result.id
+    assert result.shared_cache_entries[0].hit_count == 1
+
+
 @pytest.mark.unit
 def test_parse_cached_result(sample_result):
     """Cache parse testi"""
@@ -228,6 +275,142 @@ def test_validate_file_signature_docx():
     assert error is not None
 
 
+@pytest.mark.unit
+def test_validate_file_signature_rejects_zip_bomb():
+    """Aşırı sıkıştırılmış veya çok dosyalı arşiv açılmadan reddedilmeli"""
+    import zipfile
+    import io
+    
+    bomb = io.BytesIO()
+    with zipfile.ZipFile(bomb, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('word/document.xml', b'<w:document>' + b'0' * (8 * 1024 * 1024) + b'</w:document>')
+    is_valid, error = validate_file_signature(bomb.getvalue(), 'docx')
+    assert is_valid is False
+    assert 'sıkıştırılmış' in error
+    
+    crowded = io.BytesIO()
+    with zipfile.ZipFile(crowded, 'w') as z:
+        z.writestr('ppt/presentation.xml', '<p:presentation/>')
+        for index in range(1, 6):
+            z.writestr(f'ppt/slides/slide{index}.xml', '<p:sld/>')
+    with patch.object(Config, 'DOCUMENT_MAX_ARCHIVE_ENTRIES', 3):
+        is_valid, error = validate_file_signature(crowded.getvalue(), 'pptx')
+        assert is_valid is False
+        assert '(6, en fazla 3)' in error
+    with patch.object(Config, 'DOCUMENT_MAX_PAGES', 4):
+        is_valid, error = validate_file_signature(crowded.getvalue(), 'pptx')
+        assert is_valid is False
+        assert 'slayt' in error
+    assert validate_file_signature(crowded.getvalue(), 'pptx') == (True, None)
+
+
+@pytest.mark.unit
+def test_store_and_get_extracted_text(db_session):
+    """Çıkarılmış metin hash ile bulunmalı; bütçeli istek tam metni de kullanabilmeli"""
+    assert get_extracted_text('abc', 'pdf') is None
+    
+    store_extracted_text('abc', 'pdf', 'tam metin', info={'pages_read': 3})
+    assert get_extracted_text('abc', 'pdf') == ('tam metin', {'pages_read': 3})
+    assert get_extracted_text('abc', 'pdf', max_tokens=100) == ('tam metin', {'pages_read': 3})
+    assert get_extracted_text('abc', 'docx') is None
+    
+    store_extracted_text('abc', 'pdf', 'kısa metin', max_tokens=100)
+    assert get_extracted_text('abc', 'pdf', max_tokens=100)[0] == 'kısa metin'
+    assert get_extracted_text('abc', 'pdf')[0] == 'tam metin'
+    
+    # Çıkarıcı sürümü değişince eski kayıtlar kullanılmaz
+    with patch('services.document_reader.DocumentReader.EXTRACTOR_VERSION', 'next'):
+        assert get_extracted_text('abc', 'pdf') is None
+
+
+@pytest.mark.unit
+def test_extracted_text_keeps_section_index(db_session):
+    """Bölüm dizini çıkarılmış metinle birlikte saklanıp geri verilmeli"""
+    sections = [{'heading': 'Ünite 1', 'level': 1, 'start': 0, 'end': 40, 'page': 1}]
+    info = {'pages_read': 2, 'sections': sections}
+    store_extracted_text('outline', 'pdf', 'Ünite 1 ' + 'metin ' * 6, info=info)
+    
+    assert info['sections'] == sections
+    text, cached_info = get_extracted_text('outline', 'pdf')
+    assert cached_info == {'pages_read': 2, 'sections': sections}
+
+
+@pytest.mark.unit
+def test_evict_extracted_text_cache(db_session):
+    """Boyut sınırı aşılınca en uzun süredir kullanılmayan kayıtlar silinmeli"""
+    from models import ExtractedTextCache
+    
+    for file_hash in ('old', 'used', 'new'):
+        store_extracted_text(file_hash, 'txt', 'x' * 100)
+    get_extracted_text('used', 'txt')
+    
+    assert evict_extracted_text_cache(250) == 1
+    assert sorted(entry.file_hash for entry in ExtractedTextCache.query.all()) == ['new', 'used']
+    assert evict_extracted_text_cache(250) == 0
+
+
+class _ChunkedStream:
+    """Her read() çağrısında en fazla birkaç byte döndüren akış (ağ akışını taklit eder)"""
+    
+    def __init__(self, data, step=3):
+        self.data = data
+        self.step = step
+        self.reads = 0
+    
+    def read(self, size=-1):
+        self.reads += 1
+        chunk, self.data = self.data[:self.step], self.data[self.step:]
+        return chunk
+
+
+@pytest.mark.unit
+def test_spool_upload_hashes_while_writing(tmp_path):
+    """Akıtılan dosyanın hash'i ve boyutu get_file_hash ile aynı olmalı"""
+    content = b'%PDF-1.4\n' + b'x' * 1000
+    dest = tmp_path / 'upload.pdf.part'
+    
+    file_hash, file_size, error = spool_upload(_ChunkedStream(content), str(dest), 'pdf')
+    
+    assert error is None
+    assert file_hash == get_file_hash(content)
+    assert file_size == len(content)
+    assert dest.read_bytes() == content
+
+
+@pytest.mark.unit
+def test_spool_upload_rejects_bad_signature_early(tmp_path):
+    """İmza uyuşmazlığında okuma erken durmalı ve geçici dosya silinmeli"""
+    stream = _ChunkedStream(b'plain text ' * 1000)
+    dest = tmp_path / 'upload.pdf.part'
+    
+    file_hash, _, error = spool_upload(stream, str(dest), 'pdf')
+    
+    assert file_hash is None
+    assert error is not None
+    assert stream.reads <= 2
+    assert not dest.exists()
+
+
+@pytest.mark.unit
+def test_spool_upload_checks_office_contents(tmp_path):
+    """DOCX uzantılı PPTX içeriği diskteki ZIP'ten tespit edilmeli"""
+    import zipfile
+    import io
+    
+    pptx = io.BytesIO()
+    with zipfile.ZipFile(pptx, 'w') as z:
+        z.writestr('ppt/presentation.xml', '<presentation/>')
+    
+    dest = tmp_path / 'upload.docx.part'
+    file_hash, _, error = spool_upload(io.BytesIO(pptx.getvalue()), str(dest), 'docx')
+    assert file_hash is None
+    assert 'Word' in error
+    
+    file_hash, _, error = spool_upload(io.BytesIO(pptx.getvalue()), str(tmp_path / 'ok.pptx.part'), 'pptx')
+    assert error is None
+    assert file_hash == get_file_hash(pptx.getvalue())
+
+
 @pytest.mark.unit
 def test_initialize_user_tokens(db_session):
     """Token başlatma testi"""
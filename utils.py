@@ -12,7 +12,7 @@ import os
 from typing import Tuple, Optional
 import logging
 from datetime import datetime
-from models import Document, Result, UsageStats, User, UserUsageStats, Subscription, Payment, db
+from models import Document, Result, SharedResultCache, ExtractedTextCache, UsageStats, User, UserUsageStats, Subscription, Payment, ProcessingJob, db
 from config import Config
 from flask import render_template, url_for
 
@@ -73,8 +73,24 @@ def check_cache(file_hash, user_level, user_type, user_id=None):
     return None
 
 
+def detach_jobs_from_results(result_ids):
+    """
+    Silinecek sonuclara bagli islerin result_id'sini bosaltir (commit yapmaz)
+    
+    Veritabani ondelete='SET NULL' ile ayni isi yapar; SQLite'ta foreign key
+    zorlamasi kapali oldugu icin burada da acikca yapilir.
+    
+    Args:
+        result_ids: Silinecek Result ID'leri
+    """
+    if result_ids:
+        ProcessingJob.query.filter(ProcessingJob.result_id.in_(result_ids)).update(
+            {'result_id': None}, synchronize_session=False
+        )
+
+
 def save_to_cache(file_hash, filename, file_type, file_size, user_level, user_type, 
-                  results_data, ai_model, token_used, processing_time, user_id):
+                  results_data, ai_model, token_used, processing_time, user_id, is_private=False):
     """
     Sonuclari cache'e (veritabanina) kaydeder
     
@@ -90,6 +106,7 @@ def save_to_cache(file_hash, filename, file_type, file_size, user_level, user_ty
         token_used: Harcanan token
         processing_time: Islem suresi (saniye)
         user_id: Kullanici ID'si
+        is_private: True ise dokuman ozel yukleme olarak isaretlenir (paylasilan onbellege eklenmez)
         
     Returns:
         Result object
@@ -105,9 +122,11 @@ def save_to_cache(file_hash, filename, file_type, file_size, user_level, user_ty
     if existing_document:
         # Mevcut document varsa, eski result'u sil ve yenisini olustur
         # (Kullanici ayni dosyayi tekrar yuklerse guncel sonuc almali)
+        detach_jobs_from_results([old_result.id for old_result in existing_document.results])
         for old_result in existing_document.results:
             db.session.delete(old_result)
         document = existing_document
+        document.is_private = is_private
         # Son erisim zamanini guncelle
         from datetime import datetime
         document.last_accessed = datetime.utcnow()
@@ -120,7 +139,8 @@ def save_to_cache(file_hash, filename, file_type, file_size, user_level, user_ty
             file_size=file_size,
             user_level=user_level,
             user_type=user_type,
-            user_id=user_id
+            user_id=user_id,
+            is_private=is_private
         )
         db.session.add(document)
     
@@ -145,6 +165,210 @@ def save_to_cache(file_hash, filename, file_type, file_size, user_level, user_ty
     return result
 
 
+def get_text_hash(text):
+    """
+    Cikarilan metnin bosluklari normalize edilmis SHA-256 hash'ini dondurur
+    Farkli dosyalardan (orn. PDF ve DOCX) ayni metin cikarsa ayni hash uretilir
+    
+    Args:
+        text: Dokumandan cikarilan metin
+        
+    Returns:
+        64 karakterlik hex hash
+    """
+    normalized = ' '.join(text.split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def build_shared_cache_key(content_hash, user_level, user_type, language, ai_model, question_limit=None):
+    """
+    Paylasilan (kullanicilar arasi) onbellek anahtarini olusturur
+    
+    Anahtar ayrica prompt surumunu ve modele gidecek metni belirleyen ayarlari (bolumlu uretim,
+    girdi token butcesi, metin secim stratejisi ve kaynak carpani, prompt duzeni) icerir; bunlar
+    degisince eski ayarlarla uretilmis sonuclar kullanilmaz.
+    
+    Args:
+        content_hash: 'file:<md5>' veya 'text:<sha256>' bicimindeki icerik hash'i
+        user_level: Kullanici seviyesi
+        user_type: Kullanici tipi
+        language: Uretim dili
+        ai_model: Kullanilan AI modeli
+        question_limit: Plan bazli soru limiti (kaydedilen sonuclar bu limite gore kisaltilir)
+        
+    Returns:
+        64 karakterlik hex anahtar
+    """
+    from services.ai_generator import PROMPT_VERSION
+    
+    text_settings = [Config.AI_CHUNKED_GENERATION, Config.AI_MAX_INPUT_TOKENS, Config.TEXT_SELECTION_STRATEGY,
+                     Config.TEXT_SELECTION_SOURCE_FACTOR, Config.AI_PROMPT_LAYOUT]
+    parts = [content_hash, user_level, user_type, language, ai_model, PROMPT_VERSION, str(question_limit)]
+    parts.extend(str(setting) for setting in text_settings)
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def check_shared_cache(cache_keys):
+    """
+    Paylasilan onbellekte verilen anahtarlardan biri var mi kontrol eder
+    
+    Args:
+        cache_keys: build_shared_cache_key ile olusturulmus anahtar listesi
+        
+    Returns:
+        Result object veya None
+    """
+    entry = SharedResultCache.query.filter(
+        SharedResultCache.cache_key.in_(list(cache_keys))
+    ).first()
+    
+    if entry is None:
+        return None
+    
+    entry.hit_count = (entry.hit_count or 0) + 1
+    entry.last_hit_at = datetime.utcnow()
+    db.session.commit()
+    
+    return entry.result
+
+
+def register_shared_cache(result, cache_keys):
+    """
+    Sonucu paylasilan onbellege verilen anahtarlarla ekler (commit cagiran tarafta yapilir)
+    
+    Args:
+        result: Paylasilacak Result nesnesi
+        cache_keys: build_shared_cache_key ile olusturulmus anahtar listesi
+    """
+    for cache_key in cache_keys:
+        entry = SharedResultCache.query.filter_by(cache_key=cache_key).first()
+        if entry is None:
+            db.session.add(SharedResultCache(cache_key=cache_key, result_id=result.id))
+        else:
+            # Ayni anahtar icin daha yeni sonuc varsa onu goster
+            entry.result_id = result.id
+
+
+def get_extracted_text(file_hash, file_type, max_tokens=None):
+    """
+    Daha once cikarilmis metni depodan getirir (seviye ve kullanici tipinden bagimsiz)
+    
+    Ayni token butcesiyle kaydedilmis metin yoksa tamami kaydedilmis metin kullanilir;
+    truncate_text sonucu iki durumda da aynidir.
+    
+    Args:
+        file_hash: Dosyanin MD5 hash'i
+        file_type: Dosya uzantisi
+        max_tokens: Cikarma sirasinda kullanilan token butcesi (None = tamami)
+        
+    Returns:
+        Tuple[str, dict] (metin, cikarma bilgisi; bolum dizini varsa 'sections' anahtarinda) veya None
+    """
+    from services.document_reader import DocumentReader
+    
+    budgets = [max_tokens or 0, 0] if max_tokens else [0]
+    entries = ExtractedTextCache.query.filter(
+        ExtractedTextCache.file_hash == file_hash,
+        ExtractedTextCache.file_type == file_type,
+        ExtractedTextCache.extractor_version == DocumentReader.get_extractor_version(),
+        ExtractedTextCache.token_budget.in_(budgets)
+    ).all()
+    if not entries:
+        return None
+    
+    # Butceye ozel (daha kisa) kayit tercih edilir
+    entry = min(entries, key=lambda item: budgets.index(item.token_budget))
+    entry.hit_count = (entry.hit_count or 0) + 1
+    entry.last_hit_at = datetime.utcnow()
+    db.session.commit()
+    
+    info = json.loads(entry.extraction_info) if entry.extraction_info else {}
+    if entry.section_index is not None:
+        info['sections'] = json.loads(entry.section_index)
+    return entry.text, info
+
+
+def store_extracted_text(file_hash, file_type, text, max_tokens=None, info=None):
+    """
+    Cikarilan metni depoya kaydeder ve boyut sinirini asan eski kayitlari siler
+    
+    Args:
+        file_hash: Dosyanin MD5 hash'i
+        file_type: Dosya uzantisi
+        text: Temizlenmis metin
+        max_tokens: Cikarma sirasinda kullanilan token butcesi (None = tamami)
+        info: Cikarma bilgisi (okunan/atlanan sayfa vb.); 'sections' bolum dizini ayri sutunda saklanir
+    """
+    from services.document_reader import DocumentReader
+    
+    info = dict(info or {})
+    sections = info.pop('sections', None)
+    values = {
+        'text': text,
+        'text_size': len(text.encode('utf-8')),
+        'extraction_info': json.dumps(info, ensure_ascii=False),
+        'section_index': json.dumps(sections, ensure_ascii=False) if sections is not None else None
+    }
+    entry = ExtractedTextCache.query.filter_by(
+        file_hash=file_hash,
+        file_type=file_type,
+        extractor_version=DocumentReader.get_extractor_version(),
+        token_budget=max_tokens or 0
+    ).first()
+    
+    if entry is None:
+        db.session.add(ExtractedTextCache(
+            file_hash=file_hash,
+            file_type=file_type,
+            extractor_version=DocumentReader.get_extractor_version(),
+            token_budget=max_tokens or 0,
+            **values
+        ))
+    else:
+        for key, value in values.items():
+            setattr(entry, key, value)
+    
+    try:
+        db.session.commit()
+    except Exception as e:
+        # Ayni dosya baska bir worker tarafindan ayni anda kaydedilmis olabilir
+        db.session.rollback()
+        logger.info(f"[TEXT CACHE] Kayit atlandi ({file_hash[:12]}): {str(e)}")
+        return
+    
+    evict_extracted_text_cache(Config.EXTRACTED_TEXT_CACHE_MAX_MB * 1024 * 1024)
+
+
+def evict_extracted_text_cache(max_bytes):
+    """
+    Cikarilmis metin deposunu boyut sinirina indirir (en uzun suredir kullanilmayan kayitlar silinir)
+    
+    Args:
+        max_bytes: Toplam metin boyutu siniri (byte)
+        
+    Returns:
+        int: Silinen kayit sayisi
+    """
+    total = db.session.query(db.func.coalesce(db.func.sum(ExtractedTextCache.text_size), 0)).scalar()
+    if total <= max_bytes:
+        return 0
+    
+    last_used = db.func.coalesce(ExtractedTextCache.last_hit_at, ExtractedTextCache.created_at)
+    candidates = db.session.query(ExtractedTextCache.id, ExtractedTextCache.text_size).order_by(last_used).all()
+    
+    evicted_ids = []
+    for entry_id, text_size in candidates:
+        if total <= max_bytes:
+            break
+        evicted_ids.append(entry_id)
+        total -= text_size
+    
+    ExtractedTextCache.query.filter(ExtractedTextCache.id.in_(evicted_ids)).delete(synchronize_session=False)
+    db.session.commit()
+    logger.info(f"[TEXT CACHE] {len(evicted_ids)} kayit silindi (boyut siniri)")
+    return len(evicted_ids)
+
+
 def parse_cached_result(result):
     """
     Cache'den gelen Result nesnesini parse eder
@@ -228,6 +452,7 @@ def cleanup_old_cache(days=30):
     old_documents = Document.query.filter(Document.last_accessed < cutoff_date).all()
     
     count = len(old_documents)
+    detach_jobs_from_results([result.id for doc in old_documents for result in doc.results])
     for doc in old_documents:
         db.session.delete(doc)
     
@@ -422,18 +647,20 @@ def _is_pdf(head: bytes) -> bool:
     return head.startswith(b'%PDF-')
 
 
-def _detect_office_zip(file_content: bytes) -> Optional[str]:
+def _detect_office_zip(file_content) -> Optional[str]:
     """
     ZIP dosyasının DOCX mi PPTX mi olduğunu tespit eder
     
     Args:
-        file_content: Dosya içeriği (bytes)
+        file_content: Dosya içeriği (bytes) veya diskteki dosyanın yolu
         
     Returns:
         str: 'docx', 'pptx' veya None
     """
     try:
-        with zipfile.ZipFile(io.BytesIO(file_content), 'r') as zip_file:
+        # Yol verilirse ZipFile sadece merkezi dizini okur; dosyanın tamamı belleğe alınmaz
+        source = io.BytesIO(file_content) if isinstance(file_content, (bytes, bytearray)) else file_content
+        with zipfile.ZipFile(source, 'r') as zip_file:
             file_list = zip_file.namelist()
             
             # DOCX kontrolü: word/document.xml dosyası var mı?
@@ -449,22 +676,50 @@ def _detect_office_zip(file_content: bytes) -> Optional[str]:
         return None
 
 
-def validate_file_signature(file_content: bytes, claimed_extension: str) -> Tuple[bool, Optional[str]]:
+def _check_office_archive(source) -> Optional[str]:
     """
-    Dosya içeriğinin uzantısıyla eşleşip eşleşmediğini kontrol eder (Magic Number Validation)
+    ZIP arsivini acmadan zip bombasi ve asiri icerik kontrolu yapar (DocumentReader.check_archive)
     
     Args:
-        file_content: Dosya içeriği (bytes)
-        claimed_extension: Dosya uzantısı (örn: 'pdf', 'docx', 'pptx', 'txt')
+        source: Dosya icerigi (bytes) veya diskteki dosyanin yolu
+        
+    Returns:
+        Sinir asildiysa hata mesaji, aksi halde None (bozuk arsiv _detect_office_zip'te yakalanir)
+    """
+    from services.document_reader import DocumentReader, DocumentLimitError
+    
+    try:
+        archive_source = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+        with zipfile.ZipFile(archive_source, 'r') as zip_file:
+            DocumentReader.check_archive(zip_file)
+    except DocumentLimitError as e:
+        return str(e)
+    except Exception:
+        return None
+    return None
+
+
+def _office_mismatch_message(claimed_extension: str) -> str:
+    """DOCX/PPTX imza uyuşmazlığı için hata mesajı"""
+    if claimed_extension == 'docx':
+        return "Dosya içeriği uzantısıyla eşleşmiyor. Word belgesi bekleniyor."
+    return "Dosya içeriği uzantısıyla eşleşmiyor. PowerPoint sunumu bekleniyor."
+
+
+def _validate_signature_head(head: bytes, claimed_extension: str) -> Tuple[bool, Optional[str]]:
+    """
+    Dosyanın ilk byte'larına göre imza kontrolü yapar (ZIP içeriği hariç)
+    
+    Args:
+        head: Dosyanın en az ilk 5 byte'ı (dosya daha kısaysa tamamı)
+        claimed_extension: Küçük harfli dosya uzantısı
         
     Returns:
         Tuple[bool, Optional[str]]: (True, None) geçerliyse, (False, error_message) geçersizse
     """
-    if not file_content:
+    if not head:
         return False, "Dosya boş veya geçersiz formatta."
     
-    claimed_extension = claimed_extension.lower().lstrip('.')
-    
     # TXT dosyaları için magic number kontrolü yok
     if claimed_extension == 'txt':
         return True, None
@@ -475,40 +730,136 @@ def validate_file_signature(file_content: bytes, claimed_extension: str) -> Tupl
     
     # PDF kontrolü
     if claimed_extension == 'pdf':
-        head = _read_head(file_content, 5)
-        if not _is_pdf(head):
+        if not _is_pdf(_read_head(head, 5)):
             return False, "Dosya içeriği uzantısıyla eşleşmiyor. PDF dosyası bekleniyor."
         return True, None
     
-    # DOCX ve PPTX kontrolü (ZIP dosyaları)
+    # DOCX ve PPTX kontrolü (ZIP signature)
     if claimed_extension in ('docx', 'pptx'):
-        head = _read_head(file_content, 4)
-        
-        # ZIP signature kontrolü
-        if not head.startswith(b'PK\x03\x04'):
-            if claimed_extension == 'docx':
-                return False, "Dosya içeriği uzantısıyla eşleşmiyor. Word belgesi bekleniyor."
-            else:  # pptx
-                return False, "Dosya içeriği uzantısıyla eşleşmiyor. PowerPoint sunumu bekleniyor."
-        
-        # ZIP içeriğini kontrol et
-        detected_type = _detect_office_zip(file_content)
-        
-        if detected_type is None:
-            return False, "Dosya bozuk veya geçersiz formatta."
-        
-        if detected_type != claimed_extension:
-            if claimed_extension == 'docx':
-                return False, "Dosya içeriği uzantısıyla eşleşmiyor. Word belgesi bekleniyor."
-            else:  # pptx
-                return False, "Dosya içeriği uzantısıyla eşleşmiyor. PowerPoint sunumu bekleniyor."
-        
+        if not _read_head(head, 4).startswith(b'PK\x03\x04'):
+            return False, _office_mismatch_message(claimed_extension)
         return True, None
     
     # Desteklenmeyen uzantı
     return False, f"Desteklenmeyen dosya formatı: .{claimed_extension}"
 
 
+def _validate_office_contents(source, claimed_extension: str) -> Tuple[bool, Optional[str]]:
+    """
+    DOCX/PPTX için ZIP içeriğinin uzantıyla eşleştiğini kontrol eder
+    
+    Args:
+        source: Dosya içeriği (bytes) veya diskteki dosyanın yolu
+        claimed_extension: 'docx' veya 'pptx'
+        
+    Returns:
+        Tuple[bool, Optional[str]]: (True, None) geçerliyse, (False, error_message) geçersizse
+    """
+    limit_error = _check_office_archive(source)
+    if limit_error:
+        return False, limit_error
+    
+    detected_type = _detect_office_zip(source)
+    
+    if detected_type is None:
+        return False, "Dosya bozuk veya geçersiz formatta."
+    
+    if detected_type != claimed_extension:
+        return False, _office_mismatch_message(claimed_extension)
+    
+    return True, None
+
+
+def validate_file_signature(file_content: bytes, claimed_extension: str) -> Tuple[bool, Optional[str]]:
+    """
+    Dosya içeriğinin uzantısıyla eşleşip eşleşmediğini kontrol eder (Magic Number Validation)
+    
+    Args:
+        file_content: Dosya içeriği (bytes)
+        claimed_extension: Dosya uzantısı (örn: 'pdf', 'docx', 'pptx', 'txt')
+        
+    Returns:
+        Tuple[bool, Optional[str]]: (True, None) geçerliyse, (False, error_message) geçersizse
+    """
+    claimed_extension = claimed_extension.lower().lstrip('.')
+    
+    is_valid, error_msg = _validate_signature_head(file_content, claimed_extension)
+    if not is_valid or claimed_extension not in ('docx', 'pptx'):
+        return is_valid, error_msg
+    
+    # ZIP içeriğini kontrol et
+    return _validate_office_contents(file_content, claimed_extension)
+
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def spool_upload(stream, dest_path: str, claimed_extension: str, validate_signature: bool = True,
+                 chunk_size: int = UPLOAD_CHUNK_SIZE) -> Tuple[Optional[str], int, Optional[str]]:
+    """
+    Yüklenen dosyayı parça parça diske yazar; hash ve imza kontrolünü aynı geçişte yapar
+    
+    Dosya hiçbir zaman tamamen belleğe alınmaz (istek başına bellek kullanımı chunk_size
+    ile sınırlıdır). İmza ilk byte'lar gelir gelmez kontrol edilir; uyuşmazlıkta okuma durur.
+    DOCX/PPTX için ZIP içeriği yazma bittikten sonra diskteki dosyadan kontrol edilir.
+    Geçersiz dosyada dest_path silinir.
+    
+    Args:
+        stream: Okunabilir ikili akış (ör. FileStorage.stream)
+        dest_path: Dosyanın yazılacağı yol
+        claimed_extension: Dosya uzantısı (örn: 'pdf', 'docx')
+        validate_signature: False ise imza kontrolü yapılmaz
+        chunk_size: Tek seferde okunan byte sayısı
+        
+    Returns:
+        Tuple[Optional[str], int, Optional[str]]: (MD5 hash, boyut, None) veya hata durumunda (None, boyut, error_message)
+    """
+    claimed_extension = claimed_extension.lower().lstrip('.')
+    hasher = hashlib.md5()
+    file_size = 0
+    head = b''
+    error_msg = None
+    
+    with open(dest_path, 'wb') as f:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            
+            # İmza için ilk 5 byte biriktirilir (akış çok küçük parçalar döndürebilir)
+            if validate_signature and len(head) < 5:
+                head += chunk[:5 - len(head)]
+                if len(head) >= 5:
+                    is_valid, error_msg = _validate_signature_head(head, claimed_extension)
+                    if not is_valid:
+                        break
+            
+            hasher.update(chunk)
+            f.write(chunk)
+            file_size += len(chunk)
+    
+    if validate_signature and error_msg is None:
+        # 5 byte'tan kısa dosyalar döngüde kontrol edilmemiş olabilir
+        is_valid, error_msg = _validate_signature_head(head, claimed_extension)
+        if is_valid and claimed_extension in ('docx', 'pptx'):
+            is_valid, error_msg = _validate_office_contents(dest_path, claimed_extension)
+    
+    if error_msg is not None:
+        remove_spooled_file(dest_path)
+        return None, file_size, error_msg
+    
+    return hasher.hexdigest(), file_size, None
+
+
+def remove_spooled_file(path: Optional[str]) -> None:
+    """spool_upload ile yazılmış geçici dosyayı siler (yoksa bir şey yapmaz)"""
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"[UPLOAD] Geçici dosya silinemedi ({path}): {str(e)}")
+
+
 def get_current_month_stats(user_id):
     """Kullanıcının bu ayki kullanım istatistiklerini getir veya oluştur"""
     now = datetime.utcnow()